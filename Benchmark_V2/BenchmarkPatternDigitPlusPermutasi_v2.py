@@ -10,11 +10,19 @@ Alur kerja utama adalah sebagai berikut:
 4. Melakukan ekspansi kombinatorial pada kandidat yang ada hingga mencapai target jumlah.
 5. Menyimpan hasil akhir ke dalam file teks untuk analisis lebih lanjut.
 """
-import pyodbc
 import pandas as pd
+import numpy as np
 import os
+import sys
 from tqdm import tqdm
-import itertools
+
+# Modul bersama (ekspansi_kandidat, dll.) berada di root repo
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from akses_data import DatabaseError, get_database
+from histori_massal import load_histories_bulk
+from ekspansi_kandidat import expand_chebyshev
+from himpunan_kandidat import ALL_PERMUTATIONS, CandidateSet, add_digit_permutations
+from sumber_kandidat import TAHAP_EKSPANSI_KOMBINATORIAL, TAHAP_PERMUTASI, pack_codes
 
 # --- Konfigurasi Utama ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
@@ -31,78 +39,39 @@ OUTPUT_DIR = "Data_Analisa"
 TARGET_CANDIDATE_COUNT = 9450 
  
 # --- FUNGSI-FUNGSI UTILITAS & PEMROSESAN ---
-def generate_permutations(number_str):
-    """
-    Langkah 3.1: Menghasilkan semua permutasi unik dari sebuah string angka.
-    Contoh: '123' -> {'123', '132', '213', '231', '312', '321'}
-
-    Args:
-        number_str (str): String angka 4 digit yang akan dipermutasi.
-
-    Returns:
-        set: Sebuah set berisi semua hasil permutasi yang unik.
-    """
-    perms = set(itertools.permutations(number_str))
-    return {"".join(p) for p in perms}
-
-def expand_candidates_iteratively(base_dict, target_count):
+def expand_candidates_iteratively(base_candidates, target_count):
     """
     Langkah 4: Melakukan ekspansi kombinatorial pada kandidat angka yang ada.
     
-    Proses ini berjalan secara iteratif per level. Di setiap level, setiap digit
-    dari angka sumber akan dimodifikasi dengan menambah atau mengurangi nilai
-    sebesar `level`. Kombinasi baru yang valid (0-9) dan belum ada akan
-    ditambahkan ke dalam daftar kandidat hingga `target_count` tercapai.
+    Proses ini berjalan per level. Di level N setiap digit dari angka sumber boleh
+    bergeser -N hingga +N (jarak Chebyshev N di ruang 4 digit). Level dan sumber
+    pertama untuk seluruh 10.000 nomor dihitung sekaligus oleh `expand_chebyshev`,
+    lalu kandidat baru ditambahkan sesuai urutan level dan sumber hingga
+    `target_count` tercapai (tepat di target).
 
     Args:
-        base_dict (dict): Dictionary awal berisi kandidat angka (key) dan 
-                          sumbernya (value).
+        base_candidates (CandidateSet): Kandidat awal beserta sumbernya.
         target_count (int): Jumlah total kandidat yang ingin dicapai.
 
     Returns:
-        dict: Dictionary final yang telah diperluas hingga mendekati target.
+        CandidateSet: Himpunan kandidat final yang telah diperluas hingga mendekati target.
     """
-    final_dict = base_dict.copy()
-    if len(final_dict) >= target_count:
-        return final_dict
+    final_candidates = base_candidates.copy()
+    if len(final_candidates) >= target_count:
+        return final_candidates
         
-    source_keys = list(base_dict.keys())
-    level = 1
-    while len(final_dict) < target_count:
+    source_values = base_candidates.values
+    new_values, new_levels, new_sources = expand_chebyshev(source_values, target_count, truncate='exact')
+    for level in np.unique(new_levels).tolist():
         print(f"  Ekspansi Kombinatorial Level {level} dimulai...")
-        newly_gen_in_level = {}
-        
-        for num_str in source_keys:
-            if len(final_dict) + len(newly_gen_in_level) >= target_count:
-                break
-            num_list = [int(d) for d in num_str]
-            all_digit_possibilities = []
-            for digit_char in num_str:
-                original_digit = int(digit_char)
-                single_digit_options = {original_digit}
-                for mod in range(1, level + 1):
-                    single_digit_options.add(original_digit + mod)
-                    single_digit_options.add(original_digit - mod)
-                
-                valid_options = sorted([opt for opt in single_digit_options if 0 <= opt <= 9])
-                all_digit_possibilities.append(valid_options)
-
-            for combo_tuple in itertools.product(*all_digit_possibilities):
-                new_num = "".join(map(str, combo_tuple))
-                if new_num == num_str:
-                    continue
-                if new_num not in final_dict and new_num not in newly_gen_in_level:
-                    mods = [new_digit - old_digit for new_digit, old_digit in zip(combo_tuple, num_list)]
-                    mods_str = ",".join(f"{m:+d}" for m in mods)
-                    newly_gen_in_level[new_num] = f"ekspansi kombinatorial level {level} dari {num_str} ({mods_str})"
-                    if len(final_dict) + len(newly_gen_in_level) >= target_count:
-                        break
-        if not newly_gen_in_level:
-            print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses.")
-            break
-        final_dict.update(newly_gen_in_level)
-        level += 1
-    return final_dict
+        in_level = new_levels == level
+        level_values = new_values[in_level]
+        # Vektor modifikasi per digit (contoh +1,-1,+0,+2) ikut disimpan di kode sumber
+        sources = source_values[new_sources[in_level]]
+        final_candidates.add_many(level_values, pack_codes(TAHAP_EKSPANSI_KOMBINATORIAL, sources, level, values=level_values))
+    if len(final_candidates) < target_count:
+        print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses.")
+    return final_candidates
 
 # --- FUNGSI-FUNGSI DATABASE ---
 
@@ -111,7 +80,7 @@ def get_game_codes(cnxn):
     Mengambil semua GameCode unik dari tabel MasterGame di database.
 
     Args:
-        cnxn: Koneksi database pyodbc yang aktif.
+        cnxn: Koneksi database yang aktif (dari pool `akses_data`).
 
     Returns:
         list: Sebuah list berisi string GameCode. Mengembalikan list kosong jika gagal.
@@ -127,25 +96,25 @@ def get_game_codes(cnxn):
         print(f"Error saat mengambil GameCode: {e}")
         return []
 
-def get_log_data_for_game(cnxn, game_code):
+def get_log_data_for_game(histories, game_code):
     """
-    Mengambil data log historis untuk sebuah GameCode spesifik dari tabel LogGameBenchmark.
+    Mengambil data log historis untuk sebuah GameCode spesifik dari histori LogGameBenchmark
+    yang sudah diambil sekaligus untuk semua GameCode (`load_histories_bulk`).
     
-    Data yang diambil diurutkan berdasarkan periode, dan LogResult diformat menjadi
+    Data diurutkan berdasarkan periode, dan LogResult diformat menjadi
     string 4 digit dengan zero-padding.
 
     Args:
-        cnxn: Koneksi database pyodbc yang aktif.
+        histories (BulkHistory): Histori semua GameCode.
         game_code (str): Kode game yang datanya akan diambil.
 
     Returns:
         pd.DataFrame: DataFrame berisi data log dengan Periode sebagai index, atau None jika gagal/tidak ada data.
     """
     try:
-        query = f"SELECT Periode, LogResult FROM LogGameBenchmark WHERE GameCode='{game_code}' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
-        if df.empty:
+        if game_code not in histories:
             return None
+        df = histories.frame(game_code)
         df['LogResult'] = df['LogResult'].astype(str).str.zfill(4)
         df.set_index('Periode', inplace=True)
         return df
@@ -189,8 +158,8 @@ def process_game_data(df, game_code):
     historical_data = df.iloc[:-1]
     
     # Langkah 1: Mengumpulkan hasil temuan awal (LogResult)
-    # Variabel ini menggunakan `set` untuk memastikan semua LogResult yang terkumpul unik.
-    initial_found_results = set()
+    # Variabel ini menggunakan `CandidateSet` untuk memastikan semua LogResult yang terkumpul unik.
+    initial_found_results = CandidateSet()
     print("Langkah 1: Mengumpulkan hasil temuan awal (LogResult)...")
     for pattern_name, pattern_value in patterns.items():
         matches = historical_data[historical_data['LogResult'].str.contains(pattern_value, na=False)]
@@ -199,10 +168,10 @@ def process_game_data(df, game_code):
             
             # Ambil LogResult dari data sebelum, data yang cocok, dan data sesudah.
             if loc > 0:
-                initial_found_results.add(df.iloc[loc - 1]['LogResult'])
-            initial_found_results.add(matched_row['LogResult'])
+                initial_found_results.add(df.iloc[loc - 1]['LogResult'], "temuan awal")
+            initial_found_results.add(matched_row['LogResult'], "temuan awal")
             if loc < len(df) - 1:
-                initial_found_results.add(df.iloc[loc + 1]['LogResult'])
+                initial_found_results.add(df.iloc[loc + 1]['LogResult'], "temuan awal")
     
     # Jika tidak ada temuan sama sekali, lewati game ini.
     if not initial_found_results:
@@ -211,19 +180,15 @@ def process_game_data(df, game_code):
     print(f"Ditemukan {len(initial_found_results)} hasil temuan awal (LogResult) yang unik.")
 
     # Langkah 2 & 3: Membuat kandidat dari temuan awal dan permutasinya.
-    # Penggabungan ini memastikan tidak ada duplikasi antara temuan awal dan hasil permutasinya.
-    # Penggunaan dictionary comprehension memastikan keunikan secara otomatis.
-    base_candidates = {num: "temuan awal" for num in initial_found_results}
+    # CandidateSet memastikan tidak ada duplikasi antara temuan awal dan hasil permutasinya.
+    # Temuan awal diurutkan agar sumber permutasi (dan ekspansi) konsisten.
+    base_candidates = CandidateSet()
+    base_candidates.add_many(np.sort(initial_found_results.values), "temuan awal")
 
-    # Langkah 3: Tambahkan permutasi unik dari setiap temuan awal.
-    # Iterasi melalui temuan awal untuk menghasilkan dan menambahkan permutasi baru.
-    for num in sorted(list(initial_found_results)): # Diurutkan agar sumber permutasi konsisten
-        permutations = generate_permutations(num)
-        for p in permutations:
-            # Hanya tambahkan permutasi jika ia adalah angka yang benar-benar baru
-            # (tidak ada di temuan awal atau permutasi dari angka lain).
-            if p not in base_candidates:
-                base_candidates[p] = f"permutasi dari {num}"
+    # Langkah 3: Tambahkan permutasi unik dari setiap temuan awal (semua posisi digit sekaligus).
+    # Hanya angka yang benar-benar baru (tidak ada di temuan awal atau permutasi
+    # dari angka lain) yang ditambahkan.
+    add_digit_permutations(base_candidates, ALL_PERMUTATIONS, TAHAP_PERMUTASI)
     print(f"Total {len(base_candidates)} kandidat setelah digabung dengan permutasi.")
 
     # Langkah 4: Menjalankan ekspansi kombinatorial untuk mencapai target jumlah kandidat.
@@ -269,29 +234,33 @@ def main():
     Mengelola koneksi database, iterasi game, dan penanganan error.
     """
     print("Memulai program analisis pola...")
-    cnxn = None
+    db = get_database(CONNECTION_STRING)
     try:
-        cnxn = pyodbc.connect(CONNECTION_STRING)
-        print("Koneksi ke database berhasil.")
-        
-        game_codes = get_game_codes(cnxn)
-        if not game_codes:
-            return
+        # Koneksi dipinjam dari pool hanya selama query, lalu dikembalikan sebelum proses per game
+        with db.connection() as cnxn:
+            print("Koneksi ke database berhasil.")
+            
+            game_codes = get_game_codes(cnxn)
+            if not game_codes:
+                return
+
+            # Satu query terurut (GameCode, Periode) untuk semua game, bukan satu query per GameCode
+            histories = load_histories_bulk(cnxn, "LogGameBenchmark", game_codes)
+        print(f"Histori {len(histories)} GameCode diambil ({histories.stats}).")
 
         for code in tqdm(game_codes, desc="Memproses semua GameCode"):
-            df_game = get_log_data_for_game(cnxn, code)
+            df_game = get_log_data_for_game(histories, code)
             if df_game is not None:
                 process_game_data(df_game, code)
 
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         sqlstate = ex.args[0]
         print(f"Error koneksi database: {sqlstate}\n{ex}")
     except Exception as e:
         print(f"Terjadi error yang tidak terduga: {e}")
     finally:
-        if cnxn:
-            cnxn.close()
-            print("\nKoneksi ke database ditutup.")
+        db.close()
+        print("\nKoneksi ke database ditutup.")
         print("Program selesai.")
 
 if __name__ == '__main__':
@@ -1,14 +1,26 @@
-import pyodbc
-import pandas as pd
-from collections import Counter
-from tqdm import tqdm
+import argparse
+import numpy as np
 import json
 import os
-import itertools # Pustaka untuk menangani kombinasi
+import sys
+
+# Modul bersama (mesin_backtest, dll.) berada di root repo
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from akses_data import DatabaseError, get_database
+from indeks_pola import PatternIndex
+from mesin_backtest import RankResult, WalkForwardBacktest
+from backtest_paralel import run_backtest
+from buku_besar_backtest import BacktestLedger
+from ekspansi_kandidat import expand_chebyshev, rank_chebyshev
+from himpunan_kandidat import CandidateSet, MIX_PERMUTATIONS, add_digit_permutations
+from keluaran_prediksi import prioritize
+from sumber_kandidat import TAHAP_EKSPANSI_KOMBINATORIAL, TAHAP_MIX, near_log_code, pack_code, pack_codes, pattern_type_of
 
 # --- Konfigurasi Utama ---
 GAME_CODE = 'NCD'
 BENCHMARK_FILENAME = f"{GAME_CODE}_benchmark_patterns.json"
+COVERAGE_FILENAME = f"{GAME_CODE}_coverage_curve"  # Kurva hit rate vs K (.npy & .csv)
+LEDGER_FILENAME = f"{GAME_CODE}_backtest_ledger.sqlite"  # Buku besar backtest per periode
 
 # --- Konfigurasi Koneksi SQL Server ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
@@ -26,24 +38,21 @@ CONNECTION_STRING = (
 NUM_RESULTS_TO_OUTPUT = 8900
 BACKTEST_TARGET_COUNT = 9400
 NUM_BENCHMARK_PATTERNS = 15
-INCREMENTAL_BACKTEST_DAYS = 14
-PERIODS_PER_DAY = 1
-INCREMENTAL_BACKTEST_PERIODS = INCREMENTAL_BACKTEST_DAYS * PERIODS_PER_DAY
+LEDGER_VARIANT = "ekspansi_kombinatorial/per_source"  # Ganti jika logika kandidat berubah (buku besar dikosongkan)
 
 # --- Fungsi Manajemen Data & Benchmark ---
-def get_log_game_data(server, database, table, conn_str, game_code):
+def get_log_game_data(server, database, table, conn_str, game_code, refresh_cache=False):
     try:
         print(f"Mencoba mengambil data untuk GameCode '{game_code}'...")
-        cnxn = pyodbc.connect(conn_str)
-        query = f"SELECT Periode, LogResult FROM {table} WHERE GameCode='{game_code}' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
+        # Koneksi dari pool bersama; histori lewat cache lokal (hanya Periode baru yang diambil dari server)
+        df = get_database(conn_str).history(table, game_code, ["Periode", "LogResult"], force_refresh=refresh_cache)
         if df.empty:
             print(f"Peringatan: Tidak ada data untuk GameCode '{game_code}'.")
             return None
         df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
         print(f"Data berhasil diambil! Total {len(df)} periode.")
         return df
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         print(f"Kesalahan SQL: {ex.args[1]}")
         return None
 
@@ -54,18 +63,9 @@ def save_benchmark_patterns(filename, patterns):
     except Exception as e:
         print(f"Gagal menyimpan benchmark: {e}")
 
-def load_benchmark_patterns(filename):
-    if not os.path.exists(filename): return None
-    try:
-        with open(filename, 'r') as f:
-            patterns = json.load(f)
-            return patterns if isinstance(patterns, list) and patterns else None
-    except Exception as e:
-        print(f"Gagal memuat benchmark: {e}")
-        return None
-
 # --- Fungsi Analisis dan Generasi ---
 def extract_pattern_type(source_string):
+    if isinstance(source_string, int): return pattern_type_of(source_string)  # kode provenance: baca field, tanpa string
     if not isinstance(source_string, str): return "Sumber Tidak Diketahui"
     parts = source_string.split()
     # Logika ini tetap berfungsi karena kita masih mencari kata kunci yang sama
@@ -74,116 +74,79 @@ def extract_pattern_type(source_string):
     if source_string.startswith("mix dari"): return "Mix"
     return source_string
 
-def add_near_log_candidates(predictions_dict, df, last_log, search_type, num_digits, window=1):
-    source_prefix = f"dari analisa {num_digits} Digit"
+def add_near_log_candidates(candidates, df, last_log, search_type, num_digits, window=1, pattern_index=None):
     if search_type == 'depan':
-        pattern = last_log[:num_digits]; matching_rows = df[df['LogResult_Str'].str.startswith(pattern)]; source_prefix += f" Depan {pattern}"
+        pattern = last_log[:num_digits]
     elif search_type == 'tengah':
-        pattern = last_log[1:1+num_digits]; matching_rows = df[df['LogResult_Str'].str[1:1+num_digits] == pattern]; source_prefix += f" Tengah {pattern}"
+        pattern = last_log[1:1+num_digits]
     elif search_type == 'belakang':
-        pattern = last_log[4-num_digits:]; matching_rows = df[df['LogResult_Str'].str.endswith(pattern)]; source_prefix += f" Belakang {pattern}"
+        pattern = last_log[4-num_digits:]
     else: return
-    for _, row in matching_rows.iterrows():
-        start_idx = max(0, row.name - window); end_idx = min(len(df) - 1, row.name + window)
-        for i in range(start_idx, end_idx + 1):
-            log_result = df.iloc[i]['LogResult_Str']
-            if log_result not in predictions_dict: predictions_dict[log_result] = source_prefix
+    # Posisi cocok dari indeks pola, jendela NearLog diambil sekaligus dari histori integer.
+    # `df` harus prefix dari histori terindeks.
+    if pattern_index is None: pattern_index = PatternIndex.from_results(df['LogResult_Str'])
+    candidates.add_many(pattern_index.near_log_values(search_type, num_digits, pattern, window, limit=len(df)), near_log_code(num_digits, search_type, pattern))
 
 ### [KODE DIPERBARUI] ###
-def expand_candidates_iteratively(base_dict, target_count):
-    final_dict = base_dict.copy()
-    source_keys = list(base_dict.keys())
-    level = 1
-    
-    while len(final_dict) < target_count:
+def expand_candidates_iteratively(base_candidates, target_count):
+    """
+    Ekspansi kombinatorial: level N = setiap digit bergeser paling banyak N (jarak Chebyshev N).
+    Level dan sumber pertama untuk seluruh 10.000 nomor dihitung sekaligus oleh `expand_chebyshev`.
+    """
+    final_candidates = base_candidates.copy()
+    source_values = base_candidates.values
+
+    new_values, new_levels, new_sources = expand_chebyshev(source_values, target_count, truncate='per_source')
+    for level in np.unique(new_levels).tolist():
         print(f"  Ekspansi Kombinatorial Level {level} dimulai...")
-        newly_gen_in_level = {}
-        
-        for num_str in source_keys:
-            if len(final_dict) + len(newly_gen_in_level) >= target_count:
-                break
-
-            num_list = [int(d) for d in num_str]
-            all_digit_possibilities = []
-            
-            for digit_char in num_str:
-                original_digit = int(digit_char)
-                single_digit_options = {original_digit}
-                for mod in range(1, level + 1):
-                    single_digit_options.add(original_digit + mod)
-                    single_digit_options.add(original_digit - mod)
-                
-                valid_options = sorted([opt for opt in single_digit_options if 0 <= opt <= 9])
-                all_digit_possibilities.append(valid_options)
+        in_level = new_levels == level
+        level_values = new_values[in_level]
+        # Vektor modifikasi per digit (contoh +1,-1,+0,+2) ikut disimpan di kode sumber
+        sources = source_values[new_sources[in_level]]
+        final_candidates.add_many(level_values, pack_codes(TAHAP_EKSPANSI_KOMBINATORIAL, sources, level, values=level_values))
 
-            for combo_tuple in itertools.product(*all_digit_possibilities):
-                new_num = "".join(map(str, combo_tuple))
-                
-                if new_num == num_str:
-                    continue
-                if new_num not in final_dict and new_num not in newly_gen_in_level:
-                    
-                    # --- [LOGIKA BARU] Membuat string sumber yang detail ---
-                    # Hitung modifikasi untuk setiap digit
-                    mods = [new_digit - old_digit for new_digit, old_digit in zip(combo_tuple, num_list)]
-                    # Format string modifikasi, contoh: (+1,-1,0,+2)
-                    mods_str = ",".join(f"{m:+d}" for m in mods)
-                    
-                    newly_gen_in_level[new_num] = f"ekspansi kombinatorial level {level} dari {num_str} ({mods_str})"
-                    # --- [AKHIR LOGIKA BARU] ---
+    if len(final_candidates) < target_count:
+        print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses.")
 
-        if not newly_gen_in_level:
-            print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses.")
-            break
-            
-        final_dict.update(newly_gen_in_level)
-        level += 1
-        
-    return final_dict
+    return final_candidates
 
-def generate_full_prediction_set(historical_df, last_log_result_str, target_count):
-    predictions = {}
-    for nd in [2, 3]:
-        for st in ['depan', 'tengah', 'belakang']:
-            add_near_log_candidates(predictions, historical_df, last_log_result_str, st, nd)
-    if len(predictions) < target_count:
-        predictions = expand_candidates_iteratively(predictions, target_count)
-    return predictions
-
-def generate_mixed_candidates(number_str):
-    if len(number_str) != 4: return []
-    variations = set()
-    n = number_str
-    variations.add(n[2:] + n[:2]); variations.add(n[1:] + n[0]); variations.add(n[:2] + n[3] + n[2])
-    variations.add(n[3] + n[2] + n[:2]); variations.add(n[1] + n[0] + n[2:])
-    variations.discard(number_str)
-    return list(variations)
+def rank_in_expansion(base_candidates, number):
+    """Peringkat & sumber `number` di aliran expand_candidates_iteratively tanpa membangun set (untuk backtest)."""
+    found = rank_chebyshev(base_candidates.values, number, truncate='per_source')
+    if found is None: return None
+    rank, admit_rank, level, source = found
+    return RankResult(rank, admit_rank, pack_code(TAHAP_EKSPANSI_KOMBINATORIAL, base_candidates.values[source], level, value=number))
 
 # --- Program Utama ---
 if __name__ == "__main__":
-    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, GAME_CODE)
+    parser = argparse.ArgumentParser(description="Backtest pola benchmark lalu buat prediksi final.")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses backtest paralel (1 = serial, 0 = semua core)")
+    parser.add_argument("--refresh-cache", action="store_true", help="Abaikan cache histori lokal dan ambil ulang seluruh histori")
+    args = parser.parse_args()
+    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, GAME_CODE, refresh_cache=args.refresh_cache)
 
     if df_log is not None and len(df_log) > 1:
         # FASE 1: BACKTESTING & MANAJEMEN BENCHMARK
         print(f"\n--- FASE 1: Memeriksa dan Menjalankan Backtesting untuk '{GAME_CODE}' ---")
-        existing_patterns = load_benchmark_patterns(BENCHMARK_FILENAME)
-        pattern_benchmark_counter = Counter()
-        backtest_start_index = 1
-        if existing_patterns:
-            print(f"File benchmark '{BENCHMARK_FILENAME}' ditemukan. Memuat {len(existing_patterns)} pola.")
-            pattern_benchmark_counter.update(existing_patterns)
-            backtest_start_index = max(1, len(df_log) - INCREMENTAL_BACKTEST_PERIODS)
-            print(f"Akan menjalankan backtest inkremental untuk ~{INCREMENTAL_BACKTEST_DAYS} hari terakhir (mulai dari indeks {backtest_start_index})...")
-        else:
-            print(f"File benchmark '{BENCHMARK_FILENAME}' tidak ditemukan. Menjalankan backtest penuh...")
-
-        for i in tqdm(range(backtest_start_index, len(df_log) - 1), desc=f"Backtesting {GAME_CODE}"):
-            historical_data_for_test = df_log.iloc[:i]
-            predictions_for_test = generate_full_prediction_set(historical_data_for_test, df_log.iloc[i-1]['LogResult_Str'], BACKTEST_TARGET_COUNT)
-            actual_result = df_log.iloc[i]['LogResult_Str']
-            if actual_result in predictions_for_test:
-                pattern_type = extract_pattern_type(predictions_for_test[actual_result])
-                pattern_benchmark_counter[pattern_type] += 1
+        # Buku besar per periode (SQLite): hanya periode yang belum tercatat yang di-backtest,
+        # lalu ranking benchmark & kurva cakupan dihitung dari seluruh periode yang tercatat.
+        # Mesin walk-forward: state NearLog diperbarui per periode, tanpa scan ulang histori
+        backtest_engine = WalkForwardBacktest(df_log['LogResult_Str'], expand_fn=expand_candidates_iteratively, rank_fn=rank_in_expansion)
+        periodes = df_log['Periode'].to_numpy()
+        ledger = BacktestLedger(LEDGER_FILENAME, LEDGER_VARIANT)
+        backtest_start_index = ledger.resume_index(periodes, backtest_engine.results, 1, len(df_log) - 1)
+        print(f"Buku besar '{LEDGER_FILENAME}': {ledger.count()} periode tercatat. "
+              f"Backtest {len(df_log) - 1 - backtest_start_index} periode baru (mulai dari indeks {backtest_start_index})...")
+        # Backtest serial atau paralel (--workers); hasil identik, peringkat per periode
+        backtest_run = run_backtest(backtest_engine, backtest_start_index, len(df_log) - 1, BACKTEST_TARGET_COUNT, extract_pattern_type,
+                                    workers=args.workers, desc=f"Backtesting {GAME_CODE}")
+        ledger.record_run(periodes, backtest_engine.results, backtest_run)
+        pattern_benchmark_counter = ledger.pattern_counter(BACKTEST_TARGET_COUNT)
+        coverage = ledger.coverage(GAME_CODE)
+        ledger.close()
+        coverage.print_summary()
+        npy_path, csv_path = coverage.save(COVERAGE_FILENAME)
+        print(f"Kurva cakupan disimpan ke '{npy_path}' dan '{csv_path}'.")
         
         print("\n--- Hasil Backtesting & Pembaruan Benchmark ---")
         if not pattern_benchmark_counter:
@@ -201,41 +164,27 @@ if __name__ == "__main__":
         print(f"LogResult terakhir untuk prediksi: {final_last_log}")
 
         # 1. Hasilkan prediksi awal
-        final_predictions_dict = {}
+        final_candidates = CandidateSet()
         for nd in [2, 3]:
-            for st in ['depan', 'tengah', 'belakang']: add_near_log_candidates(final_predictions_dict, df_log, final_last_log, st, nd)
-        print(f"Dihasilkan {len(final_predictions_dict)} kandidat awal dari NearLog.")
-
-        # 2. Terapkan logika MIX
-        mixed_predictions = {}
-        for number, source in list(final_predictions_dict.items()):
-            for variation in generate_mixed_candidates(number):
-                if variation not in final_predictions_dict and variation not in mixed_predictions:
-                    mixed_predictions[variation] = f"mix dari {number}"
-        
-        # 3. Gabungkan hasil
-        final_predictions_dict.update(mixed_predictions)
-        print(f"Total kandidat setelah di-mix: {len(final_predictions_dict)}")
-
-        # 4. Terapkan Ekspansi Kombinatorial jika perlu
-        if len(final_predictions_dict) < NUM_RESULTS_TO_OUTPUT:
-            print(f"Jumlah kandidat ({len(final_predictions_dict)}) kurang dari target. Menjalankan ekspansi kombinatorial...")
-            final_predictions_dict = expand_candidates_iteratively(final_predictions_dict, NUM_RESULTS_TO_OUTPUT)
-            print(f"Total kandidat setelah ekspansi: {len(final_predictions_dict)}")
+            for st in ['depan', 'tengah', 'belakang']: add_near_log_candidates(final_candidates, df_log, final_last_log, st, nd, pattern_index=backtest_engine.index)
+        print(f"Dihasilkan {len(final_candidates)} kandidat awal dari NearLog.")
+
+        # 2. Terapkan logika MIX: variasi posisi digit seluruh kandidat NearLog sekaligus
+        add_digit_permutations(final_candidates, MIX_PERMUTATIONS, TAHAP_MIX)
+        print(f"Total kandidat setelah di-mix: {len(final_candidates)}")
+
+        # 3. Terapkan Ekspansi Kombinatorial jika perlu
+        if len(final_candidates) < NUM_RESULTS_TO_OUTPUT:
+            print(f"Jumlah kandidat ({len(final_candidates)}) kurang dari target. Menjalankan ekspansi kombinatorial...")
+            final_candidates = expand_candidates_iteratively(final_candidates, NUM_RESULTS_TO_OUTPUT)
+            print(f"Total kandidat setelah ekspansi: {len(final_candidates)}")
         
-        # 5. Urutkan hasil berdasarkan benchmark
-        prioritized_results = []; other_results = []
-        final_output_list_temp = list(final_predictions_dict.items())[:NUM_RESULTS_TO_OUTPUT]
-        for number, source in final_output_list_temp:
-            if extract_pattern_type(source) in benchmark_patterns:
-                prioritized_results.append((number, source))
-            else:
-                other_results.append((number, source))
-        final_output_list = prioritized_results + other_results
+        # 4. Urutkan hasil berdasarkan benchmark (partisi stabil satu pass, teks sumber dirender saat ditulis)
+        final_output = prioritize(final_candidates, benchmark_patterns, NUM_RESULTS_TO_OUTPUT)
 
         # FASE 3: MENYIMPAN HASIL
         print(f"\n--- FASE 3: Menyimpan Hasil Akhir ---")
-        if final_output_list:
+        if len(final_output):
             # [LOGIKA BARU] Tentukan folder output dan buat jika belum ada
             output_dir = "Data_Result"
             if not os.path.exists(output_dir):
@@ -243,17 +192,10 @@ if __name__ == "__main__":
                 print(f"Folder '{output_dir}' berhasil dibuat.")
 
             # Buat nama file dan gabungkan dengan path folder
-            base_filename = f'pnm_benchmarked_{GAME_CODE}_{len(final_output_list)}.txt'
+            base_filename = f'pnm_benchmarked_{GAME_CODE}_{len(final_output)}.txt'
             output_filename = os.path.join(output_dir, base_filename)
-            with open(output_filename, 'w') as f:
-                f.write(f"--- HASIL PREDIKSI (MIX & BENCHMARKED) UNTUK {GAME_CODE} ---\n\n")
-                f.write("--- HASIL DENGAN PRIORITAS BENCHMARK ---\n")
-                for number, source in prioritized_results:
-                     if (number, source) in final_output_list: f.write(f"{number} --> {source} [BENCHMARK]\n")
-                f.write(f"\n--- HASIL LAINNYA ---\n")
-                for number, source in other_results:
-                    if (number, source) in final_output_list: f.write(f"{number} --> {source}\n")
-            print(f"✅ Semua {len(final_output_list)} nomor telah disimpan ke '{output_filename}'.")
+            final_output.write(output_filename, f"--- HASIL PREDIKSI (MIX & BENCHMARKED) UNTUK {GAME_CODE} ---")
+            print(f"✅ Semua {len(final_output)} nomor telah disimpan ke '{output_filename}'.")
         else: print("Tidak ada nomor yang berhasil diprediksi/dihasilkan.")
         print("\nProses selesai!")
     else: print("\nProses dihentikan karena tidak ada data yang valid.")
\ No newline at end of file
@@ -1,11 +1,24 @@
-import pyodbc
-import pandas as pd
-from collections import Counter
-from tqdm import tqdm
+import argparse
+import functools
+import numpy as np
 import json
 import os
-import itertools
-import datetime
+import sys
+
+# Modul bersama (mesin_backtest, dll.) berada di root repo
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from akses_data import DatabaseError, get_database
+from histori_massal import load_histories_bulk
+from penampung_hasil import ResultSink
+from pipa_proses import run_pipeline
+from indeks_pola import PatternIndex
+from mesin_backtest import RankResult, WalkForwardBacktest
+from backtest_paralel import run_backtest
+from buku_besar_backtest import BacktestLedger
+from ekspansi_kandidat import expand_chebyshev, rank_chebyshev
+from himpunan_kandidat import CandidateSet, MIX_PERMUTATIONS, add_digit_permutations
+from keluaran_prediksi import prioritize
+from sumber_kandidat import TAHAP_EKSPANSI_KOMBINATORIAL, TAHAP_MIX, near_log_code, pack_code, pack_codes, pattern_type_of
 
 # --- Konfigurasi Koneksi SQL Server ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
@@ -25,9 +38,7 @@ CONNECTION_STRING = (
 NUM_RESULTS_TO_OUTPUT = 9340
 BACKTEST_TARGET_COUNT = 9400
 NUM_BENCHMARK_PATTERNS = 15
-INCREMENTAL_BACKTEST_DAYS = 7
-PERIODS_PER_DAY = 1
-INCREMENTAL_BACKTEST_PERIODS = INCREMENTAL_BACKTEST_DAYS * PERIODS_PER_DAY
+LEDGER_VARIANT = "ekspansi_kombinatorial/per_source"  # Ganti jika logika kandidat berubah (buku besar dikosongkan)
 
 # --- Fungsi-Fungsi ---
 
@@ -35,46 +46,42 @@ INCREMENTAL_BACKTEST_PERIODS = INCREMENTAL_BACKTEST_DAYS * PERIODS_PER_DAY
 def get_game_codes_from_master(conn_str):
     """Mengambil daftar GameCode dari tabel MasterGame."""
     print("Mengambil daftar GameCode dari tabel MasterGame...")
-    query = f"SELECT GameCode FROM {MASTER_GAME_TABLE} WHERE LastResult <> 'XXXX';"
-    cnxn = None
     try:
-        cnxn = pyodbc.connect(conn_str)
-        cursor = cnxn.cursor()
-        cursor.execute(query)
-        # Ambil semua baris dan buat menjadi list of strings
-        game_codes = [row.GameCode for row in cursor.fetchall()]
+        # Koneksi dari pool bersama, dipakai ulang untuk histori & penyimpanan hasil
+        game_codes = get_database(conn_str).game_codes(active_only=True, table=MASTER_GAME_TABLE)
         if not game_codes:
             print("Peringatan: Tidak ada GameCode yang ditemukan di tabel MasterGame.")
             return []
         print(f"✅ Ditemukan {len(game_codes)} GameCode untuk diproses: {game_codes}")
         return game_codes
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         print(f"❌ Gagal mengambil daftar GameCode dari database.")
         print(f"Pesan Error: {ex.args[1]}")
         return []
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if cnxn:
-            cnxn.close()
 
-# ... (Semua fungsi lain seperti get_log_game_data, save_benchmark_patterns, dll. tetap sama) ...
-def get_log_game_data(server, database, table, conn_str, game_code):
+def get_all_log_game_data(conn_str, table, game_codes):
+    """Histori semua GameCode dengan satu koneksi dan satu query terurut (GameCode, Periode)."""
     try:
-        print(f"Mencoba mengambil data untuk GameCode '{game_code}'...")
-        cnxn = pyodbc.connect(conn_str)
-        query = f"SELECT Periode, LogResult FROM {table} WHERE GameCode='{game_code}' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
-        if df.empty:
-            print(f"Peringatan: Tidak ada data untuk GameCode '{game_code}'.")
-            return None
-        df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
-        print(f"Data berhasil diambil! Total {len(df)} periode.")
-        return df
-    except pyodbc.Error as ex:
+        print(f"Mengambil histori {len(game_codes)} GameCode sekaligus dari '{table}'...")
+        with get_database(conn_str).connection() as cnxn:
+            histories = load_histories_bulk(cnxn, table, game_codes)
+        print(f"Data berhasil diambil! {len(histories)} GameCode, {histories.stats}.")
+        return histories
+    except DatabaseError as ex:
         print(f"Kesalahan SQL: {ex.args[1]}")
         return None
 
+# ... (Semua fungsi lain seperti save_benchmark_patterns, dll. tetap sama) ...
+def get_log_game_data(histories, game_code):
+    """DataFrame Periode/LogResult/LogResult_Str satu GameCode dari hasil `get_all_log_game_data`."""
+    if game_code not in histories:
+        print(f"Peringatan: Tidak ada data untuk GameCode '{game_code}'.")
+        return None
+    df = histories.frame(game_code)
+    df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
+    print(f"Data '{game_code}': {len(df)} periode.")
+    return df
+
 def save_benchmark_patterns(filename, patterns):
     try:
         with open(filename, 'w') as f: json.dump(patterns, f, indent=4)
@@ -82,55 +89,8 @@ def save_benchmark_patterns(filename, patterns):
     except Exception as e:
         print(f"Gagal menyimpan benchmark: {e}")
 
-def load_benchmark_patterns(filename):
-    if not os.path.exists(filename): return None
-    try:
-        with open(filename, 'r') as f:
-            patterns = json.load(f)
-            return patterns if isinstance(patterns, list) and patterns else None
-    except Exception as e:
-        print(f"Gagal memuat benchmark: {e}")
-        return None
-
-def insert_results_to_db(game_code, next_periode, results_list, conn_str):
-    print(f"\nMencoba menyimpan/memperbarui hasil prediksi di database untuk Periode {next_periode}...")
-    numbers_only = [item[0] for item in results_list]
-    hasil_string = ",".join(numbers_only) + "#"
-    benchmark_time = datetime.datetime.now()
-    cnxn = None
-    try:
-        cnxn = pyodbc.connect(conn_str)
-        cursor = cnxn.cursor()
-        check_query = f"SELECT COUNT(*) FROM {TARGET_TABLE_NAME} WHERE GameCode = ? AND Periode = ?"
-        cursor.execute(check_query, game_code, int(next_periode))
-        record_exists = cursor.fetchval() > 0
-        if record_exists:
-            print(f"Data untuk Periode {next_periode} sudah ada. Melakukan UPDATE...")
-            query = f"""
-                UPDATE {TARGET_TABLE_NAME}
-                SET Hasil = ?, TanggalBenchmark = ?
-                WHERE GameCode = ? AND Periode = ?
-            """
-            cursor.execute(query, hasil_string, benchmark_time, game_code, int(next_periode))
-        else:
-            print(f"Data untuk Periode {next_periode} belum ada. Melakukan INSERT...")
-            query = f"""
-                INSERT INTO {TARGET_TABLE_NAME} (GameCode, Periode, Hasil, TanggalBenchmark)
-                VALUES (?, ?, ?, ?)
-            """
-            cursor.execute(query, game_code, int(next_periode), hasil_string, benchmark_time)
-        cnxn.commit()
-        print("✅ Data hasil prediksi berhasil disimpan/diperbarui di database.")
-    except pyodbc.Error as ex:
-        print(f"❌ Gagal menyimpan/memperbarui data di database.")
-        print(f"Pesan Error: {ex.args[1]}")
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if cnxn:
-            cnxn.close()
-
 def extract_pattern_type(source_string):
+    if isinstance(source_string, int): return pattern_type_of(source_string)  # kode provenance: baca field, tanpa string
     if not isinstance(source_string, str): return "Sumber Tidak Diketahui"
     parts = source_string.split()
     if source_string.startswith("ekspansi kombinatorial level"): return f"Ekspansi Level {parts[3]}"
@@ -138,163 +98,185 @@ def extract_pattern_type(source_string):
     if source_string.startswith("mix dari"): return "Mix"
     return source_string
 
-def add_near_log_candidates(predictions_dict, df, last_log, search_type, num_digits, window=1):
-    source_prefix = f"dari analisa {num_digits} Digit"
+def add_near_log_candidates(candidates, df, last_log, search_type, num_digits, window=1, pattern_index=None):
     if search_type == 'depan':
-        pattern = last_log[:num_digits]; matching_rows = df[df['LogResult_Str'].str.startswith(pattern)]; source_prefix += f" Depan {pattern}"
+        pattern = last_log[:num_digits]
     elif search_type == 'tengah':
-        pattern = last_log[1:1+num_digits]; matching_rows = df[df['LogResult_Str'].str[1:1+num_digits] == pattern]; source_prefix += f" Tengah {pattern}"
+        pattern = last_log[1:1+num_digits]
     elif search_type == 'belakang':
-        pattern = last_log[4-num_digits:]; matching_rows = df[df['LogResult_Str'].str.endswith(pattern)]; source_prefix += f" Belakang {pattern}"
+        pattern = last_log[4-num_digits:]
     else: return
-    for _, row in matching_rows.iterrows():
-        start_idx = max(0, row.name - window); end_idx = min(len(df) - 1, row.name + window)
-        for i in range(start_idx, end_idx + 1):
-            log_result = df.iloc[i]['LogResult_Str']
-            if log_result not in predictions_dict: predictions_dict[log_result] = source_prefix
+    # Posisi cocok dari indeks pola, jendela NearLog diambil sekaligus dari histori integer.
+    # `df` harus prefix dari histori terindeks.
+    if pattern_index is None: pattern_index = PatternIndex.from_results(df['LogResult_Str'])
+    candidates.add_many(pattern_index.near_log_values(search_type, num_digits, pattern, window, limit=len(df)), near_log_code(num_digits, search_type, pattern))
 
-def expand_candidates_iteratively(base_dict, target_count):
-    final_dict = base_dict.copy(); source_keys = list(base_dict.keys()); level = 1
-    while len(final_dict) < target_count:
+def expand_candidates_iteratively(base_candidates, target_count):
+    # Level (jarak Chebyshev) & sumber pertama untuk seluruh 10.000 nomor dihitung sekaligus
+    final_candidates = base_candidates.copy(); source_values = base_candidates.values
+    new_values, new_levels, new_sources = expand_chebyshev(source_values, target_count, truncate='per_source')
+    for level in np.unique(new_levels).tolist():
         print(f"  Ekspansi Kombinatorial Level {level} dimulai...")
-        newly_gen_in_level = {}
-        for num_str in source_keys:
-            if len(final_dict) + len(newly_gen_in_level) >= target_count: break
-            num_list = [int(d) for d in num_str]; all_digit_possibilities = []
-            for digit_char in num_str:
-                original_digit = int(digit_char); single_digit_options = {original_digit}
-                for mod in range(1, level + 1):
-                    single_digit_options.add(original_digit + mod); single_digit_options.add(original_digit - mod)
-                valid_options = sorted([opt for opt in single_digit_options if 0 <= opt <= 9])
-                all_digit_possibilities.append(valid_options)
-            for combo_tuple in itertools.product(*all_digit_possibilities):
-                new_num = "".join(map(str, combo_tuple))
-                if new_num == num_str: continue
-                if new_num not in final_dict and new_num not in newly_gen_in_level:
-                    mods = [new - old for new, old in zip(combo_tuple, num_list)]
-                    mods_str = ",".join(f"{m:+d}" for m in mods)
-                    newly_gen_in_level[new_num] = f"ekspansi kombinatorial level {level} dari {num_str} ({mods_str})"
-        if not newly_gen_in_level:
-            print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses."); break
-        final_dict.update(newly_gen_in_level); level += 1
-    return final_dict
+        in_level = new_levels == level; level_values = new_values[in_level]
+        # Vektor modifikasi per digit (contoh +1,-1,+0,+2) ikut disimpan di kode sumber
+        sources = source_values[new_sources[in_level]]
+        final_candidates.add_many(level_values, pack_codes(TAHAP_EKSPANSI_KOMBINATORIAL, sources, level, values=level_values))
+    if len(final_candidates) < target_count:
+        print("  Ekspansi level ini tidak menghasilkan kandidat baru. Menghentikan proses.")
+    return final_candidates
+
+def rank_in_expansion(base_candidates, number):
+    """Peringkat & sumber `number` di aliran expand_candidates_iteratively tanpa membangun set (untuk backtest)."""
+    found = rank_chebyshev(base_candidates.values, number, truncate='per_source')
+    if found is None: return None
+    rank, admit_rank, level, source = found
+    return RankResult(rank, admit_rank, pack_code(TAHAP_EKSPANSI_KOMBINATORIAL, base_candidates.values[source], level, value=number))
+
+def fetch_game_data(game_code):
+    """Tahap ambil (pipeline): histori satu GameCode lewat pool koneksi + cache lokal."""
+    try:
+        df = get_database(CONNECTION_STRING).history(TABLE_NAME, game_code, ["Periode", "LogResult"])
+    except DatabaseError as ex:
+        print(f"Kesalahan SQL '{game_code}': {ex.args[1]}")
+        return None
+    if df.empty:
+        print(f"Peringatan: Tidak ada data untuk GameCode '{game_code}'.")
+        return None
+    df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
+    return df
+
+def compute_game(game_code, df_log, workers=1):
+    """
+    FASE 1 (backtest + benchmark) dan FASE 2 (prediksi final) untuk satu GameCode.
 
-def generate_full_prediction_set(historical_df, last_log_result_str, target_count):
-    predictions = {};
+    Returns:
+        (next_periode, final_output_list), atau None jika histori tidak valid.
+    """
+    print(f"\n{'='*25} MEMULAI PROSES UNTUK GAMECODE: {game_code.upper()} {'='*25}\n")
+    if df_log is None or len(df_log) <= 1:
+        print(f"\nProses untuk GameCode '{game_code}' dihentikan karena tidak ada data yang valid.")
+        return None
+
+    # Definisikan nama file benchmark dinamis berdasarkan game_code saat ini
+    BENCHMARK_FILENAME = f"{game_code}_benchmark_patterns.json"
+    COVERAGE_FILENAME = f"{game_code}_coverage_curve"
+    LEDGER_FILENAME = f"{game_code}_backtest_ledger.sqlite"
+
+    # FASE 1: BACKTESTING & MANAJEMEN BENCHMARK
+    print(f"\n--- FASE 1: Memeriksa dan Menjalankan Backtesting untuk '{game_code}' ---")
+    # Buku besar per periode (SQLite): hanya periode yang belum tercatat yang di-backtest,
+    # lalu ranking benchmark & kurva cakupan dihitung dari seluruh periode yang tercatat.
+    # Mesin walk-forward: state NearLog diperbarui per periode, tanpa scan ulang histori
+    backtest_engine = WalkForwardBacktest(df_log['LogResult_Str'], expand_fn=expand_candidates_iteratively, rank_fn=rank_in_expansion)
+    periodes = df_log['Periode'].to_numpy()
+    ledger = BacktestLedger(LEDGER_FILENAME, LEDGER_VARIANT)
+    backtest_start_index = ledger.resume_index(periodes, backtest_engine.results, 1, len(df_log) - 1)
+    print(f"Buku besar '{LEDGER_FILENAME}': {ledger.count()} periode tercatat. "
+          f"Backtest {len(df_log) - 1 - backtest_start_index} periode baru (mulai dari indeks {backtest_start_index})...")
+    # Backtest serial atau paralel (--workers); hasil identik, peringkat per periode
+    backtest_run = run_backtest(backtest_engine, backtest_start_index, len(df_log) - 1, BACKTEST_TARGET_COUNT, extract_pattern_type,
+                                workers=workers, desc=f"Backtesting {game_code}")
+    ledger.record_run(periodes, backtest_engine.results, backtest_run)
+    pattern_benchmark_counter = ledger.pattern_counter(BACKTEST_TARGET_COUNT)
+    coverage = ledger.coverage(game_code)
+    ledger.close()
+    coverage.print_summary()
+    npy_path, csv_path = coverage.save(COVERAGE_FILENAME)
+    print(f"Kurva cakupan disimpan ke '{npy_path}' dan '{csv_path}'.")
+    
+    if not pattern_benchmark_counter:
+        benchmark_patterns = []
+    else:
+        benchmark_patterns = [p for p, c in pattern_benchmark_counter.most_common(NUM_BENCHMARK_PATTERNS)]
+        print(f"\n{len(benchmark_patterns)} Pola Benchmark Teratas untuk '{game_code}':")
+        for i, pattern in enumerate(benchmark_patterns): print(f"{i+1}. '{pattern}' (Poin: {pattern_benchmark_counter[pattern]})")
+        save_benchmark_patterns(BENCHMARK_FILENAME, benchmark_patterns)
+
+    # FASE 2: PREDIKSI FINAL
+    print(f"\n--- FASE 2: Membuat Prediksi Final untuk '{game_code}'---")
+    last_periode = df_log.iloc[-1]['Periode']
+    final_last_log = df_log.iloc[-1]['LogResult_Str']
+    print(f"LogResult terakhir untuk prediksi: {final_last_log} (dari Periode {last_periode})")
+    
+    final_candidates = CandidateSet()
     for nd in [2, 3]:
-        for st in ['depan', 'tengah', 'belakang']: add_near_log_candidates(predictions, historical_df, last_log_result_str, st, nd)
-    if len(predictions) < target_count:
-        predictions = expand_candidates_iteratively(predictions, target_count)
-    return predictions
+        for st in ['depan', 'tengah', 'belakang']: add_near_log_candidates(final_candidates, df_log, final_last_log, st, nd, pattern_index=backtest_engine.index)
+    
+    # Variasi MIX untuk seluruh kandidat NearLog sekaligus (urutan variasi tetap)
+    add_digit_permutations(final_candidates, MIX_PERMUTATIONS, TAHAP_MIX)
+    
+    if len(final_candidates) < NUM_RESULTS_TO_OUTPUT:
+        final_candidates = expand_candidates_iteratively(final_candidates, NUM_RESULTS_TO_OUTPUT)
+    
+    # Partisi benchmark stabil satu pass; pasangan (nomor, teks sumber) dikirim ke tahap tulis
+    return int(last_periode) + 1, prioritize(final_candidates, benchmark_patterns, NUM_RESULTS_TO_OUTPUT).items()
 
-def generate_mixed_candidates(number_str):
-    if len(number_str) != 4: return []
-    variations = set(); n = number_str
-    variations.add(n[2:] + n[:2]); variations.add(n[1:] + n[0]); variations.add(n[:2] + n[3] + n[2])
-    variations.add(n[3] + n[2] + n[:2]); variations.add(n[1] + n[0] + n[2:])
-    variations.discard(number_str)
-    return list(variations)
+def write_results(batch, sink):
+    """
+    FASE 3 untuk satu batch [(game_code, (next_periode, final_output_list))]: file txt per game,
+    baris DB ditampung di `sink` (ResultSink) dan di-upsert per batch dalam satu transaksi.
+    """
+    for game_code, (next_periode, final_output_list) in batch:
+        print(f"\n--- FASE 3: Menyimpan Hasil Akhir untuk '{game_code}' ---")
+        if not final_output_list:
+            print("Tidak ada nomor yang berhasil diprediksi/dihasilkan untuk game ini.")
+            continue
+        # [LOGIKA BARU] Tentukan folder output dan buat jika belum ada
+        output_dir = "Data_Result"
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+            print(f"Folder '{output_dir}' berhasil dibuat.")
 
+        # Buat nama file dan gabungkan dengan path folder
+        base_filename = f'predicted_numbers_mix_benchmarked_{game_code}_{len(final_output_list)}.txt'
+        output_filename = os.path.join(output_dir, base_filename)
+        # Satu string, satu write (bukan satu f.write per baris)
+        lines = "".join(f"{number} --> {source}\n" for number, source in final_output_list)
+        with open(output_filename, 'w') as f:
+            f.write(f"--- HASIL PREDIKSI UNTUK {game_code} ---\n\n" + lines)
+        print(f"✅ Hasil disimpan ke file '{output_filename}'.")
+        numbers_only = [item[0] for item in final_output_list]
+        sink.add(game_code, next_periode, numbers_only)
 
 # --- Program Utama ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest pola benchmark lalu buat prediksi final.")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses backtest paralel (1 = serial, 0 = semua core)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Ambil/hitung/tulis antar GameCode secara bersamaan (asyncio + antrean terbatas)")
+    parser.add_argument("--fetch-concurrency", type=int, default=2, help="[--pipeline] Pengambilan histori bersamaan (thread)")
+    parser.add_argument("--compute-workers", type=int, default=1, help="[--pipeline] Proses backtest+prediksi bersamaan (0 = semua core)")
+    parser.add_argument("--write-concurrency", type=int, default=1, help="[--pipeline] Batch tulis file + DB bersamaan (thread)")
+    parser.add_argument("--write-batch", type=int, default=8, help="[--pipeline] Jumlah GameCode per batch tulis file + DB")
+    parser.add_argument("--db-batch", type=int, default=50, help="Jumlah baris HasilBenchmarkMix per upsert (satu transaksi)")
+    parser.add_argument("--binary-results", action="store_true",
+                        help="Simpan prediksi sebagai VARBINARY ringkas di kolom HasilBiner (lihat penampung_hasil.py)")
+    args = parser.parse_args()
     
     # Ambil semua GameCode yang akan diproses
     all_game_codes = get_game_codes_from_master(CONNECTION_STRING)
     
     if not all_game_codes:
         print("Tidak ada GameCode untuk diproses. Program berhenti.")
+    elif args.pipeline:
+        # Paralelisme di level GameCode; backtest di dalam setiap proses berjalan serial
+        with ResultSink(get_database(CONNECTION_STRING), TARGET_TABLE_NAME, args.db_batch, args.binary_results) as sink:
+            report = run_pipeline(all_game_codes, fetch_game_data, compute_game, functools.partial(write_results, sink=sink),
+                                  fetch_concurrency=args.fetch_concurrency, compute_workers=args.compute_workers,
+                                  write_concurrency=args.write_concurrency, write_batch=args.write_batch)
+        report.print_summary()
+        print(f"\n{'='*20} SEMUA PROSES SELESAI {'='*20}\n")
     else:
-        # Loop utama untuk setiap GameCode (proses estafet)
-        for game_code in all_game_codes:
-            print(f"\n{'='*25} MEMULAI PROSES UNTUK GAMECODE: {game_code.upper()} {'='*25}\n")
-            
-            # Definisikan nama file benchmark dinamis berdasarkan game_code saat ini
-            BENCHMARK_FILENAME = f"{game_code}_benchmark_patterns.json"
-
-            df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, game_code)
-
-            if df_log is not None and len(df_log) > 1:
-                # FASE 1: BACKTESTING & MANAJEMEN BENCHMARK
-                print(f"\n--- FASE 1: Memeriksa dan Menjalankan Backtesting untuk '{game_code}' ---")
-                existing_patterns = load_benchmark_patterns(BENCHMARK_FILENAME)
-                pattern_benchmark_counter = Counter()
-                backtest_start_index = 1
-                if existing_patterns:
-                    print(f"File benchmark '{BENCHMARK_FILENAME}' ditemukan.")
-                    pattern_benchmark_counter.update(existing_patterns)
-                    backtest_start_index = max(1, len(df_log) - INCREMENTAL_BACKTEST_PERIODS)
-                    print(f"Akan menjalankan backtest inkremental untuk ~{INCREMENTAL_BACKTEST_DAYS} hari terakhir...")
-                else:
-                    print(f"File benchmark '{BENCHMARK_FILENAME}' tidak ditemukan. Menjalankan backtest penuh...")
-
-                for i in tqdm(range(backtest_start_index, len(df_log) - 1), desc=f"Backtesting {game_code}"):
-                    predictions_for_test = generate_full_prediction_set(df_log.iloc[:i], df_log.iloc[i-1]['LogResult_Str'], BACKTEST_TARGET_COUNT)
-                    actual_result = df_log.iloc[i]['LogResult_Str']
-                    if actual_result in predictions_for_test:
-                        pattern_type = extract_pattern_type(predictions_for_test[actual_result])
-                        pattern_benchmark_counter[pattern_type] += 1
-                
-                if not pattern_benchmark_counter:
-                    benchmark_patterns = []
-                else:
-                    benchmark_patterns = [p for p, c in pattern_benchmark_counter.most_common(NUM_BENCHMARK_PATTERNS)]
-                    print(f"\n{len(benchmark_patterns)} Pola Benchmark Teratas untuk '{game_code}':")
-                    for i, pattern in enumerate(benchmark_patterns): print(f"{i+1}. '{pattern}' (Poin: {pattern_benchmark_counter[pattern]})")
-                    save_benchmark_patterns(BENCHMARK_FILENAME, benchmark_patterns)
-
-                # FASE 2: PREDIKSI FINAL
-                print(f"\n--- FASE 2: Membuat Prediksi Final untuk '{game_code}'---")
-                last_periode = df_log.iloc[-1]['Periode']
-                final_last_log = df_log.iloc[-1]['LogResult_Str']
-                print(f"LogResult terakhir untuk prediksi: {final_last_log} (dari Periode {last_periode})")
-                
-                final_predictions_dict = {}
-                for nd in [2, 3]:
-                    for st in ['depan', 'tengah', 'belakang']: add_near_log_candidates(final_predictions_dict, df_log, final_last_log, st, nd)
-                
-                mixed_predictions = {}
-                for number, source in list(final_predictions_dict.items()):
-                    for variation in generate_mixed_candidates(number):
-                        if variation not in final_predictions_dict and variation not in mixed_predictions:
-                            mixed_predictions[variation] = f"mix dari {number}"
-                final_predictions_dict.update(mixed_predictions)
-                
-                if len(final_predictions_dict) < NUM_RESULTS_TO_OUTPUT:
-                    final_predictions_dict = expand_candidates_iteratively(final_predictions_dict, NUM_RESULTS_TO_OUTPUT)
-                
-                prioritized_results = []; other_results = []
-                final_output_list_temp = list(final_predictions_dict.items())[:NUM_RESULTS_TO_OUTPUT]
-                for number, source in final_output_list_temp:
-                    if extract_pattern_type(source) in benchmark_patterns:
-                        prioritized_results.append((number, source))
-                    else:
-                        other_results.append((number, source))
-                final_output_list = prioritized_results + other_results
-
-                # FASE 3: MENYIMPAN HASIL
-                print(f"\n--- FASE 3: Menyimpan Hasil Akhir untuk '{game_code}' ---")
-                if final_output_list:
-                    # [LOGIKA BARU] Tentukan folder output dan buat jika belum ada
-                    output_dir = "Data_Result"
-                    if not os.path.exists(output_dir):
-                        os.makedirs(output_dir)
-                        print(f"Folder '{output_dir}' berhasil dibuat.")
-
-                    # Buat nama file dan gabungkan dengan path folder
-                    base_filename = f'predicted_numbers_mix_benchmarked_{game_code}_{len(final_output_list)}.txt'
-                    output_filename = os.path.join(output_dir, base_filename)
-                    with open(output_filename, 'w') as f:
-                        f.write(f"--- HASIL PREDIKSI UNTUK {game_code} ---\n\n")
-                        for number, source in final_output_list: f.write(f"{number} --> {source}\n")
-                    print(f"✅ Hasil disimpan ke file '{output_filename}'.")
-                    
-                    next_periode = last_periode + 1
-                    insert_results_to_db(game_code, next_periode, final_output_list, CONNECTION_STRING)
-                else: 
-                    print("Tidak ada nomor yang berhasil diprediksi/dihasilkan untuk game ini.")
-                
-            else: 
-                print(f"\nProses untuk GameCode '{game_code}' dihentikan karena tidak ada data yang valid.")
+        # Histori semua GameCode diambil sekali di awal, bukan satu koneksi + query per GameCode
+        all_histories = get_all_log_game_data(CONNECTION_STRING, TABLE_NAME, all_game_codes)
+        if all_histories is None:
+            print("Tidak ada GameCode untuk diproses. Program berhenti.")
+        else:
+            # Loop utama untuk setiap GameCode (proses estafet); hasil DB di-upsert per --db-batch game
+            with ResultSink(get_database(CONNECTION_STRING), TARGET_TABLE_NAME, args.db_batch, args.binary_results) as sink:
+                for game_code in all_game_codes:
+                    result = compute_game(game_code, get_log_game_data(all_histories, game_code), workers=args.workers)
+                    if result is not None:
+                        write_results([(game_code, result)], sink)
 
-        print(f"\n{'='*20} SEMUA PROSES SELESAI {'='*20}\n")
\ No newline at end of file
+            print(f"\n{'='*20} SEMUA PROSES SELESAI {'='*20}\n")
@@ -0,0 +1,491 @@
+"""
+Lapisan akses data: pool koneksi terbatas + backend SQL Server (pyodbc) atau SQLite.
+
+Setiap skrip dulu memanggil `pyodbc.connect(CONNECTION_STRING)` di setiap fungsi
+(ambil histori, daftar GameCode, simpan hasil) lalu langsung menutupnya; runner
+multi-game membayar 2+ handshake ODBC per GameCode. `get_database(conn_str)`
+mengembalikan satu `DataAccess` per connection string untuk seluruh run, dengan
+koneksi yang dipinjam dari pool (`with db.connection() as cnxn:`) dan dikembalikan
+setelah dipakai. Koneksi yang error dibuang dari pool, bukan dipakai ulang.
+
+Semua statement memakai parameter `?` (bukan nilai yang disisipkan ke string SQL),
+sehingga SQL Server bisa memakai ulang plan yang sudah di-cache; hanya nama tabel
+(konstanta) yang disisipkan.
+
+Mode offline: jika environment variable `GAMES_DB_SQLITE` berisi path file
+SQLite, `get_database` memakai `SqliteBackend` dengan skema yang sama
+(MasterGame, LogGame, LogGameBenchmark, HasilBenchmarkMix) untuk connection
+string apa pun, sehingga semua skrip bisa dijalankan dan di-benchmark tanpa SQL Server.
+
+Benchmark koneksi-per-panggilan vs pool (SQLite, latensi handshake disimulasikan):
+
+    python akses_data.py --games 40 --latency-ms 5
+"""
+import argparse
+import atexit
+import contextlib
+import datetime
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_histori import load_history
+from kodek_prediksi import read_prediction
+
+SQLITE_ENV_VAR = "GAMES_DB_SQLITE"
+DEFAULT_POOL_SIZE = 4
+POOL_TIMEOUT = 30  # detik menunggu koneksi bebas saat pool penuh
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS MasterGame (
+    GameCode   TEXT PRIMARY KEY,
+    LastResult TEXT
+);
+CREATE TABLE IF NOT EXISTS LogGame (
+    GameCode  TEXT NOT NULL,
+    Periode   INTEGER NOT NULL,
+    LogResult INTEGER,
+    [As]      INTEGER,
+    Kop       INTEGER,
+    Kepala    INTEGER,
+    Ekor      INTEGER,
+    PRIMARY KEY (GameCode, Periode)
+);
+CREATE TABLE IF NOT EXISTS LogGameBenchmark (
+    GameCode  TEXT NOT NULL,
+    Periode   INTEGER NOT NULL,
+    LogResult INTEGER,
+    [As]      INTEGER,
+    Kop       INTEGER,
+    Kepala    INTEGER,
+    Ekor      INTEGER,
+    PRIMARY KEY (GameCode, Periode)
+);
+CREATE TABLE IF NOT EXISTS HasilBenchmarkMix (
+    GameCode         TEXT NOT NULL,
+    Periode          INTEGER NOT NULL,
+    Hasil            TEXT,
+    HasilBiner       BLOB,
+    TanggalBenchmark TIMESTAMP,
+    PRIMARY KEY (GameCode, Periode)
+);
+"""
+
+
+class DatabaseError(Exception):
+    """
+    Error database dari backend mana pun.
+
+    `args` selalu (sqlstate, pesan) seperti `pyodbc.Error`, sehingga kode lama
+    yang mencetak `ex.args[1]` tetap berjalan.
+    """
+
+
+def _as_database_error(error):
+    if isinstance(error, DatabaseError):
+        return error
+    # pd.read_sql membungkus error DB-API dengan pandas.errors.DatabaseError
+    cause = error.__cause__ if error.__cause__ is not None else error
+    args = getattr(cause, 'args', ())
+    if len(args) >= 2:
+        return DatabaseError(str(args[0]), str(args[1]))
+    return DatabaseError('HY000', str(cause))
+
+
+class SqlServerBackend:
+    """Backend SQL Server lewat pyodbc (diimpor saat koneksi pertama dibuat)."""
+
+    dialect = 'mssql'
+
+    def __init__(self, connection_string):
+        self.connection_string = connection_string
+
+    @property
+    def errors(self):
+        import pyodbc
+        return (pyodbc.Error, pd.errors.DatabaseError)
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def top_query(self, table, n):
+        return f"SELECT TOP {int(n)} * FROM [{table}]"
+
+    def upsert_query(self, table, binary=False):
+        # HOLDLOCK: cek-lalu-tulis MERGE atomik terhadap writer lain
+        if binary:
+            return (f"MERGE [{table}] WITH (HOLDLOCK) AS target "
+                    "USING (SELECT ? AS GameCode, ? AS Periode, ? AS HasilBiner, ? AS TanggalBenchmark) AS source "
+                    "ON target.GameCode = source.GameCode AND target.Periode = source.Periode "
+                    "WHEN MATCHED THEN UPDATE SET Hasil = N'', HasilBiner = source.HasilBiner, TanggalBenchmark = source.TanggalBenchmark "
+                    "WHEN NOT MATCHED THEN INSERT (GameCode, Periode, Hasil, HasilBiner, TanggalBenchmark) "
+                    "VALUES (source.GameCode, source.Periode, N'', source.HasilBiner, source.TanggalBenchmark);")
+        return (f"MERGE [{table}] WITH (HOLDLOCK) AS target "
+                "USING (SELECT ? AS GameCode, ? AS Periode, ? AS Hasil, ? AS TanggalBenchmark) AS source "
+                "ON target.GameCode = source.GameCode AND target.Periode = source.Periode "
+                "WHEN MATCHED THEN UPDATE SET Hasil = source.Hasil, TanggalBenchmark = source.TanggalBenchmark "
+                "WHEN NOT MATCHED THEN INSERT (GameCode, Periode, Hasil, TanggalBenchmark) "
+                "VALUES (source.GameCode, source.Periode, source.Hasil, source.TanggalBenchmark);")
+
+
+class SqliteBackend:
+    """Backend SQLite dengan skema yang sama; dibuat otomatis jika file belum ada."""
+
+    dialect = 'sqlite'
+    errors = (sqlite3.Error, pd.errors.DatabaseError)
+
+    def __init__(self, path):
+        self.path = path
+        # Kolom TanggalBenchmark (datetime) disimpan sebagai teks ISO
+        sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+        cnxn = sqlite3.connect(path)
+        try:
+            cnxn.executescript(SQLITE_SCHEMA)
+            # File dari versi sebelum kolom HasilBiner ada
+            if 'HasilBiner' not in [row[1] for row in cnxn.execute("PRAGMA table_info(HasilBenchmarkMix)")]:
+                cnxn.execute("ALTER TABLE HasilBenchmarkMix ADD COLUMN HasilBiner BLOB")
+        finally:
+            cnxn.close()
+
+    def connect(self):
+        # Koneksi dipinjam bergantian oleh thread lain lewat pool
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def top_query(self, table, n):
+        return f"SELECT * FROM [{table}] LIMIT {int(n)}"
+
+    def upsert_query(self, table, binary=False):
+        if binary:
+            return (f"INSERT INTO [{table}] (GameCode, Periode, Hasil, HasilBiner, TanggalBenchmark) VALUES (?, ?, '', ?, ?) "
+                    "ON CONFLICT (GameCode, Periode) DO UPDATE SET Hasil = '', HasilBiner = excluded.HasilBiner, "
+                    "TanggalBenchmark = excluded.TanggalBenchmark")
+        return (f"INSERT INTO [{table}] (GameCode, Periode, Hasil, TanggalBenchmark) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (GameCode, Periode) DO UPDATE SET Hasil = excluded.Hasil, TanggalBenchmark = excluded.TanggalBenchmark")
+
+
+class ConnectionPool:
+    """
+    Pool koneksi terbatas (maksimal `max_size` koneksi terbuka sekaligus).
+
+    Koneksi idle disimpan LIFO agar yang paling baru dipakai (paling kecil
+    kemungkinannya sudah diputus server) keluar duluan.
+    """
+
+    def __init__(self, backend, max_size=DEFAULT_POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.backend = backend
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self):
+        try:
+            cnxn = self._idle.get_nowait()
+            self.reused += 1
+            return cnxn
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._open < self.max_size
+            if can_create:
+                self._open += 1
+        if can_create:
+            try:
+                cnxn = self.backend.connect()
+            except BaseException:
+                with self._lock:
+                    self._open -= 1
+                raise
+            self.created += 1
+            return cnxn
+        try:
+            cnxn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise DatabaseError('HYT00', f"Tidak ada koneksi bebas di pool setelah {self.timeout} detik (maks {self.max_size}).")
+        self.reused += 1
+        return cnxn
+
+    def release(self, cnxn, broken=False):
+        if not broken:
+            try:
+                cnxn.rollback()  # transaksi yang tidak di-commit tidak ikut ke peminjam berikutnya
+            except Exception:
+                broken = True
+        if broken:
+            with self._lock:
+                self._open -= 1
+            with contextlib.suppress(Exception):
+                cnxn.close()
+            return
+        self._idle.put(cnxn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Meminjam koneksi; error backend diteruskan sebagai `DatabaseError`."""
+        try:
+            cnxn = self.acquire()
+        except self.backend.errors as e:
+            raise _as_database_error(e) from e
+        try:
+            yield cnxn
+        except self.backend.errors as e:
+            self.release(cnxn, broken=True)
+            raise _as_database_error(e) from e
+        except BaseException:
+            self.release(cnxn)
+            raise
+        else:
+            self.release(cnxn)
+
+    def close(self):
+        while True:
+            try:
+                cnxn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._open -= 1
+            with contextlib.suppress(Exception):
+                cnxn.close()
+
+
+class DataAccess:
+    """
+    Operasi database yang dipakai skrip-skrip analisa dan benchmark.
+
+    Args:
+        backend: `SqlServerBackend` atau `SqliteBackend`.
+        pool_size (int): Maksimal koneksi terbuka sekaligus.
+    """
+
+    def __init__(self, backend, pool_size=DEFAULT_POOL_SIZE):
+        self.backend = backend
+        self.pool = ConnectionPool(backend, pool_size)
+        self._columns = {}
+
+    def connection(self):
+        return self.pool.connection()
+
+    def close(self):
+        self.pool.close()
+
+    def read_frame(self, query, params=None):
+        with self.connection() as cnxn:
+            return pd.read_sql(query, cnxn, params=params)
+
+    def sample(self, table, n=10):
+        """`n` baris pertama sebuah tabel (TOP/LIMIT sesuai dialek)."""
+        return self.read_frame(self.backend.top_query(table, n))
+
+    def game_codes(self, active_only=True, table='MasterGame'):
+        """GameCode di MasterGame; `active_only` = hanya yang LastResult-nya bukan 'XXXX'."""
+        if active_only:
+            query, params = f"SELECT GameCode FROM [{table}] WHERE LastResult <> ?", ('XXXX',)
+        else:
+            query, params = f"SELECT DISTINCT GameCode FROM [{table}]", ()
+        with self.connection() as cnxn:
+            cursor = cnxn.cursor()
+            try:
+                return [row[0] for row in cursor.execute(query, params).fetchall()]
+            finally:
+                cursor.close()
+
+    def history(self, table, game_code, columns=("Periode", "LogResult"), force_refresh=False):
+        """Histori satu GameCode lewat cache lokal (`cache_histori.load_history`)."""
+        with self.connection() as cnxn:
+            return load_history(cnxn, table, game_code, columns, force_refresh=force_refresh)
+
+    def columns(self, table):
+        """Nama kolom sebuah tabel (dari `cursor.description` query TOP 0 / LIMIT 0, di-cache)."""
+        if table not in self._columns:
+            with self.connection() as cnxn:
+                cursor = cnxn.cursor()
+                try:
+                    cursor.execute(self.backend.top_query(table, 0))
+                    self._columns[table] = [d[0] for d in cursor.description]
+                finally:
+                    cursor.close()
+        return self._columns[table]
+
+    def upsert_benchmark_results(self, table, rows, binary=False):
+        """
+        Upsert baris (GameCode, Periode, Hasil, TanggalBenchmark) dengan satu statement
+        `MERGE` / `INSERT ... ON CONFLICT` lewat executemany, dalam satu transaksi.
+        Untuk pyodbc, `fast_executemany` mengirim semua parameter sebagai satu array.
+
+        Jika `binary`, nilai ketiga adalah bytes `kodek_prediksi.encode_prediction`
+        yang ditulis ke kolom HasilBiner (VARBINARY), dan Hasil dikosongkan.
+
+        Returns:
+            int: Jumlah baris yang dikirim.
+        """
+        rows = [(game_code, int(periode), hasil, tanggal) for game_code, periode, hasil, tanggal in rows]
+        if not rows:
+            return 0
+        with self.connection() as cnxn:
+            cursor = cnxn.cursor()
+            try:
+                if hasattr(cursor, 'fast_executemany'):
+                    cursor.fast_executemany = True
+                cursor.executemany(self.backend.upsert_query(table, binary), rows)
+                cnxn.commit()
+            finally:
+                cursor.close()
+        return len(rows)
+
+    def read_predictions(self, table, game_code, periode_from=None):
+        """
+        Prediksi tersimpan satu GameCode: dict Periode -> array uint16 (urutan prediksi).
+
+        Membaca kedua format: string lama di kolom Hasil ("0123,...#") dan bytes di
+        kolom HasilBiner (jika kolom itu ada). Hasil yang tidak kosong menang, karena
+        penulisan biner selalu mengosongkan Hasil.
+        """
+        select = "Periode, Hasil, HasilBiner" if 'HasilBiner' in self.columns(table) else "Periode, Hasil, NULL"
+        query, params = f"SELECT {select} FROM [{table}] WHERE GameCode = ?", [game_code]
+        if periode_from is not None:
+            query += " AND Periode >= ?"
+            params.append(int(periode_from))
+        with self.connection() as cnxn:
+            cursor = cnxn.cursor()
+            try:
+                rows = cursor.execute(query + " ORDER BY Periode", params).fetchall()
+            finally:
+                cursor.close()
+        predictions = {}
+        for periode, hasil, biner in rows:
+            numbers = read_prediction(hasil) if hasil and hasil.strip() else read_prediction(biner)
+            if numbers is not None:
+                predictions[int(periode)] = numbers
+        return predictions
+
+
+_DATABASES = {}
+_DATABASES_LOCK = threading.Lock()
+
+
+def get_database(connection_string, pool_size=DEFAULT_POOL_SIZE):
+    """
+    `DataAccess` bersama untuk connection string ini (dibuat sekali per proses).
+    Jika `GAMES_DB_SQLITE` diset, yang dipakai adalah file SQLite tersebut.
+    """
+    sqlite_path = os.environ.get(SQLITE_ENV_VAR)
+    key = ('sqlite', sqlite_path) if sqlite_path else ('mssql', connection_string)
+    with _DATABASES_LOCK:
+        if key not in _DATABASES:
+            if sqlite_path:
+                print(f"Mode offline: memakai database SQLite '{sqlite_path}'.")
+                backend = SqliteBackend(sqlite_path)
+            else:
+                backend = SqlServerBackend(connection_string)
+            _DATABASES[key] = DataAccess(backend, pool_size)
+        return _DATABASES[key]
+
+
+@atexit.register
+def close_all():
+    """Menutup semua koneksi idle di semua pool."""
+    with _DATABASES_LOCK:
+        for db in _DATABASES.values():
+            db.close()
+        _DATABASES.clear()
+
+
+# --- Benchmark dengan SQLite ---
+
+def fill_sqlite_sample(path, num_games, num_periods, table='LogGame', seed=0):
+    """Mengisi database SQLite (skema `SQLITE_SCHEMA`) dengan MasterGame + histori acak."""
+    SqliteBackend(path)
+    cnxn = sqlite3.connect(path)
+    rng = np.random.default_rng(seed)
+    with cnxn:
+        for g in range(num_games):
+            game_code = f"G{g:03d}"
+            values = rng.integers(0, 10000, num_periods)
+            # Satu game nonaktif agar filter LastResult ikut teruji
+            last_result = 'XXXX' if g == num_games - 1 else f"{values[-1]:04d}"
+            cnxn.execute("INSERT OR REPLACE INTO MasterGame VALUES (?, ?)", (game_code, last_result))
+            cnxn.executemany(f"INSERT OR REPLACE INTO [{table}] VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             ((game_code, p, int(v), int(v) // 1000, int(v) // 100 % 10, int(v) // 10 % 10, int(v) % 10)
+                              for p, v in zip(range(1, num_periods + 1), values)))
+    cnxn.close()
+
+
+def _run_unpooled(path, game_codes, latency):
+    """Pola lama: connect + query f-string + close untuk setiap panggilan."""
+    for game_code in game_codes:
+        for query in (f"SELECT Periode, LogResult FROM LogGame WHERE GameCode = '{game_code}' ORDER BY Periode ASC",
+                      f"SELECT COUNT(*) FROM HasilBenchmarkMix WHERE GameCode = '{game_code}' AND Periode = 0"):
+            time.sleep(latency)  # handshake koneksi
+            cnxn = sqlite3.connect(path)
+            cnxn.execute(query).fetchall()
+            cnxn.close()
+
+
+def _run_pooled(db, game_codes):
+    """DAL: koneksi dari pool + query berparameter."""
+    for game_code in game_codes:
+        with db.connection() as cnxn:
+            cnxn.execute("SELECT Periode, LogResult FROM LogGame WHERE GameCode = ? ORDER BY Periode ASC", (game_code,)).fetchall()
+        with db.connection() as cnxn:
+            cnxn.execute("SELECT COUNT(*) FROM HasilBenchmarkMix WHERE GameCode = ? AND Periode = ?", (game_code, 0)).fetchall()
+
+
+class _SlowConnectBackend(SqliteBackend):
+    """SQLite dengan jeda simulasi saat membuka koneksi (handshake ODBC ke server)."""
+
+    def __init__(self, path, latency):
+        super().__init__(path)
+        self.latency = latency
+
+    def connect(self):
+        time.sleep(self.latency)
+        return super().connect()
+
+
+def run_benchmark(num_games, num_periods, latency_ms, repeat=3):
+    latency = latency_ms / 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "standin.sqlite")
+        fill_sqlite_sample(path, num_games, num_periods)
+        db = DataAccess(_SlowConnectBackend(path, latency))
+        game_codes = db.game_codes()
+        db.pool.created = db.pool.reused = 0  # hitung hanya panggilan benchmark
+
+        unpooled, pooled = [], []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            _run_unpooled(path, game_codes, latency)
+            unpooled.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            _run_pooled(db, game_codes)
+            pooled.append(time.perf_counter() - t)
+        created, reused = db.pool.created, db.pool.reused // repeat
+        db.close()
+
+    calls = 2 * len(game_codes)
+    print(f"{len(game_codes)} GameCode x 2 panggilan DB = {calls} panggilan per run "
+          f"(SQLite, handshake simulasi {latency_ms:g} ms, terbaik dari {repeat}x)")
+    print(f"  connect per panggilan + f-string : {min(unpooled):.3f} s  ({calls} handshake)")
+    print(f"  pool + parameter                 : {min(pooled):.3f} s  ({created} handshake baru, {reused} pinjaman ulang per run), "
+          f"{min(unpooled) / min(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark koneksi-per-panggilan vs pool koneksi (SQLite).")
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--periods", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Jeda simulasi per handshake koneksi (0 = SQLite murni).")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.games, args.periods, args.latency_ms, args.repeat)
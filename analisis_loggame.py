@@ -1,12 +1,15 @@
-import pyodbc
 import pandas as pd
 import numpy as np # Import numpy juga
+from akses_data import DatabaseError, get_database
+from fitur_lag import LagFeatureStore
 
 # --- Konfigurasi Koneksi SQL Server Anda ---
 # Ganti nilai-nilai di bawah ini dengan informasi SQL Server Anda yang sudah berhasil kemarin
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'  # Contoh: 'DESKTOP-ABCDE\SQLEXPRESS' atau 'localhost'
 DATABASE_NAME = 'GamesMatrix' # Contoh: 'DataPenjualan'
 TABLE_NAME = 'LogGame' # Contoh: 'Customers' atau 'Products'
+GAME_CODE = 'MQ18'
+REFRESH_HISTORY_CACHE = False # True = abaikan cache histori lokal dan ambil ulang seluruh histori
 
 CONNECTION_STRING = (
     f"DRIVER={{ODBC Driver 17 for SQL Server}};"
@@ -16,28 +19,24 @@ CONNECTION_STRING = (
 )
 
 # --- Fungsi untuk Mengambil Data ---
-def get_log_game_data(server, database, table, conn_str):
+def get_log_game_data(server, database, table, conn_str, refresh_cache=False):
     try:
         print(f"Mencoba mengambil data dari tabel '{table}'...")
-        cnxn = pyodbc.connect(conn_str)
         # Mengurutkan berdasarkan Periode sangat penting untuk time series
-        query = f"SELECT Periode, LogResult, [As], Kop, Kepala, Ekor FROM {table} WHERE GameCode='MQ18' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
+        # Koneksi dari pool bersama; histori lewat cache lokal (hanya Periode baru yang diambil dari server)
+        df = get_database(conn_str).history(table, GAME_CODE, ["Periode", "LogResult", "As", "Kop", "Kepala", "Ekor"], force_refresh=refresh_cache)
         print("Data berhasil diambil!")
         return df
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         sqlstate = ex.args[0]
         print(f"Terjadi kesalahan saat mengambil data:")
         print(f"SQLSTATE: {sqlstate}")
         print(f"Pesan Error: {ex.args[1]}")
         return None
-    finally:
-        if 'cnxn' in locals() and cnxn:
-            cnxn.close()
 
 # --- Main Program ---
 if __name__ == "__main__":
-    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING)
+    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, refresh_cache=REFRESH_HISTORY_CACHE)
 
     if df_log is not None:
         print("\n--- Pra-pemrosesan Data dan Pembuatan Fitur ---")
@@ -55,21 +54,18 @@ if __name__ == "__main__":
             print("Baris dengan LogResult non-numerik telah dihapus.")
 
         # 2. Membuat Fitur Lag (nilai dari periode sebelumnya)
-        # Kita akan membuat lag untuk setiap digit (A, B, C, D)
+        # Kita akan membuat lag untuk setiap digit (As, Kop, Kepala, Ekor)
         # Jumlah lag bisa disesuaikan, kita coba 3 periode sebelumnya dulu
+        # Lag dibaca dari view int8 tanpa salinan (fitur_lag.py), bukan shift per kolom
         num_lags = 3
-        for col in ['As', 'Kop', 'Kepala', 'Ekor']:
-            for i in range(1, num_lags + 1):
-                df_log[f'{col}_lag{i}'] = df_log[col].shift(i)
+        lag_store = LagFeatureStore.from_frame(df_log, num_lags=num_lags)
         
-        # Setelah membuat lag, baris pertama (num_lags) akan memiliki nilai NaN
-        # Kita perlu menghapusnya karena tidak ada data historis untuk memprediksi mereka
-        df_log.dropna(inplace=True)
-        
-        # Konversi kolom lag ke integer (karena hasil shift bisa menjadi float)
-        for col in ['As', 'Kop', 'Kepala', 'Ekor']:
-            for i in range(1, num_lags + 1):
-                df_log[f'{col}_lag{i}'] = df_log[f'{col}_lag{i}'].astype(int)
+        # Baris pertama (num_lags) tidak punya data historis untuk lag-nya, dan baris dengan
+        # digit kosong di periode itu atau di lag-nya juga dibuang (sama seperti dropna)
+        complete = lag_store.complete_rows()
+        df_lags = pd.DataFrame(lag_store.matrix(complete), columns=lag_store.feature_names(),
+                               index=df_log.index[num_lags:][complete])
+        df_log = df_log.iloc[num_lags:][complete].join(df_lags)
 
         print(f"\nDataFrame setelah membuat {num_lags} fitur lag dan menghapus baris NaN:")
         print(df_log.head())
@@ -0,0 +1,171 @@
+"""
+Arsip histori biner append-only per GameCode, dibaca lewat `np.memmap`.
+
+Histori dulu hidup di DataFrame dengan kolom object `LogResult_Str`
+(`astype(str).str.zfill(4)`, ~60 byte per baris). Di sini setiap kolom adalah
+satu file biner mentah dengan dtype tetap:
+
+    {path}/Periode.int64     Periode (int64)
+    {path}/LogResult.uint16  LogResult 0-9999 (uint16, 2 byte per periode)
+    {path}/{kolom}.{dtype}   kolom lain (mis. As, Kop, Kepala, Ekor)
+    {path}/manifest.json     dtype per kolom, jumlah baris yang sah, Periode awal/akhir
+
+Periode baru ditambahkan di tempat (append di akhir file, tanpa menulis ulang),
+lalu jumlah baris di manifest diperbarui secara atomik; byte sisa dari append
+yang terputus diabaikan dan dipotong pada append berikutnya. Proses mana pun
+(worker backtest, prediksi live, skrip analisis) bisa membuka kolom tanpa salinan
+dengan `HistoryStore(path).column('LogResult')`, sehingga memuat jutaan periode
+hanya butuh beberapa milidetik dan hampir tanpa memori resident.
+
+Kolom teks (mis. LogResult nvarchar) disimpan sebagai integer dan dikembalikan
+sebagai string dengan zero-padding selebar nilai terpanjang aslinya.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+
+# dtype tetap untuk kolom utama; kolom lain memakai dtype hasil query
+COLUMN_DTYPES = {'Periode': np.int64, 'LogResult': np.uint16}
+
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class HistoryStore:
+    """
+    Args:
+        path (str): Direktori arsip untuk satu GameCode.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = None
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+
+    def __len__(self):
+        return self.manifest['rows'] if self.manifest else 0
+
+    @property
+    def exists(self):
+        return self.manifest is not None
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns']) if self.manifest else []
+
+    def _file(self, column):
+        return os.path.join(self.path, f"{column}.{self.manifest['columns'][column]['dtype']}")
+
+    def column(self, column):
+        """Kolom sebagai `np.memmap` read-only (tanpa salinan), sepanjang baris yang sah."""
+        dtype = np.dtype(self.manifest['columns'][column]['dtype'])
+        if len(self) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(column), dtype=dtype, mode='r', shape=(len(self),))
+
+    @property
+    def periodes(self):
+        return self.column('Periode')
+
+    @property
+    def results(self):
+        return self.column('LogResult')
+
+    def is_intact(self):
+        """Semua file kolom ada dan minimal sepanjang jumlah baris di manifest."""
+        for column, spec in self.manifest['columns'].items():
+            path = self._file(column)
+            if not os.path.exists(path) or os.path.getsize(path) < len(self) * np.dtype(spec['dtype']).itemsize:
+                return False
+        return True
+
+    def to_frame(self, columns=None):
+        """
+        DataFrame (salinan di memori) berisi `columns` dengan dtype seperti hasil
+        query asli: kolom teks dikembalikan sebagai string, kolom angka ke dtype aslinya.
+        """
+        data = {}
+        for column in columns or self.columns:
+            spec = self.manifest['columns'][column]
+            values = np.array(self.column(column))
+            if spec['text_width'] is not None:
+                values = pd.Series(values).astype(str).str.zfill(spec['text_width']).to_numpy(dtype=object)
+            else:
+                values = values.astype(spec['frame_dtype'])
+            data[column] = values
+        return pd.DataFrame(data)
+
+    def _encode(self, frame):
+        """Array per kolom sesuai dtype arsip (dan spesifikasi kolom untuk arsip baru)."""
+        arrays, specs = {}, {}
+        for column in frame.columns:
+            values = frame[column]
+            spec = self.manifest['columns'][column] if self.manifest else None
+            text_width = spec['text_width'] if spec else None
+            frame_dtype = spec['frame_dtype'] if spec else values.dtype.name
+            if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+                values = pd.to_numeric(values, errors='raise')
+                if spec is None:
+                    text_width = int(frame[column].str.len().max())
+            elif values.dtype == object:
+                values = pd.to_numeric(values, errors='raise')
+            dtype = np.dtype(spec['dtype'] if spec else COLUMN_DTYPES.get(column, values.dtype))
+            array = values.to_numpy()
+            if dtype.kind in 'iu' and len(array) and (array.min() < np.iinfo(dtype).min or array.max() > np.iinfo(dtype).max):
+                raise ValueError(f"Nilai kolom {column} di luar rentang {dtype}")
+            arrays[column] = array.astype(dtype)
+            specs[column] = {'dtype': dtype.name, 'frame_dtype': frame_dtype, 'text_width': text_width}
+        return arrays, specs
+
+    def _write_manifest(self, manifest):
+        tmp_path = os.path.join(self.path, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_NAME))
+        self.manifest = manifest
+
+    def _updated_manifest(self, manifest, frame):
+        manifest['rows'] += len(frame)
+        if len(frame):
+            if manifest['first_periode'] is None:
+                manifest['first_periode'] = _to_json(frame['Periode'].iloc[0])
+            manifest['last_periode'] = _to_json(frame['Periode'].iloc[-1])
+        return manifest
+
+    def reset(self, frame, **info):
+        """Menulis ulang arsip dari nol dengan isi `frame` (harus memiliki kolom Periode)."""
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = None
+        arrays, specs = self._encode(frame)
+        for column, array in arrays.items():
+            with open(os.path.join(self.path, f"{column}.{specs[column]['dtype']}"), 'wb') as f:
+                f.write(array.tobytes())
+        manifest = dict(info, columns=specs, rows=0, first_periode=None, last_periode=None)
+        self._write_manifest(self._updated_manifest(manifest, frame))
+
+    def append(self, frame):
+        """Menambahkan baris baru di akhir setiap file kolom (Periode harus lebih besar dari yang terakhir)."""
+        if len(frame) == 0:
+            return 0
+        if set(frame.columns) != set(self.columns):
+            raise ValueError("Kolom append tidak sama dengan kolom arsip")
+        periodes = frame['Periode'].to_numpy()
+        if np.any(np.diff(periodes) <= 0) or (len(self) and periodes[0] <= self.manifest['last_periode']):
+            raise ValueError("Periode append harus naik dan lebih besar dari Periode terakhir arsip")
+        arrays, _ = self._encode(frame)
+        for column, array in arrays.items():
+            with open(self._file(column), 'r+b') as f:
+                # Buang sisa append terputus sebelum menulis
+                f.truncate(len(self) * array.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(array.tobytes())
+        self._write_manifest(self._updated_manifest(dict(self.manifest), frame))
+        return len(frame)
@@ -0,0 +1,435 @@
+"""
+Audit massal prediksi tersimpan terhadap hasil aktual LogGame.
+
+Sumber prediksi:
+
+- tabel HasilBenchmarkMix (kolom Hasil format lama "0123,...#" atau HasilBiner
+  `kodek_prediksi`), di-join dengan LogResult aktual per (GameCode, Periode)
+  dalam satu query di database; hari = tanggal TanggalBenchmark.
+- folder PURE_DATA (`{GameCode}_{PeriodeTerakhir}.json` dari NEW_BENCHMARK),
+  memprediksi Periode terakhir + 1; hari = tanggal modifikasi file. Daftarnya
+  terurut naik, jadi hanya hit yang diaudit (rank tidak diketahui).
+
+File txt Data_Result tidak menyimpan Periode sehingga tidak bisa di-join.
+
+Prediksi dibaca per chunk (`fetchmany`) dan diskor sekaligus per chunk:
+
+- format bitmap (HasilBiner, PURE_DATA): bitmap tersimpan langsung menjadi
+  matriks baris x 10.000 bit tanpa unpack; hit = satu bit per baris, dan rank
+  hit = rank[jumlah bit sebelum nomor aktual] (popcount kumulatif).
+- format berbasis urutan (string lama, zlib): semua nomor chunk digabung lalu
+  dibandingkan sekali dengan hasil aktual yang diulang per baris; posisi
+  kecocokan = rank hit. Membangun bitmap dulu untuk format ini lebih mahal
+  (scatter ~9.000 nomor per baris) daripada perbandingan itu sendiri.
+
+Rank hit 0-based: 0 = nomor prioritas tertinggi, sehingga hit pada K teratas = rank < K.
+
+Hasil: tabel hit rate per GameCode dan per hari (CSV + ringkasan di layar).
+
+    python audit_prediksi.py --since 2025-01-01 --top-k 7000 9340
+    python audit_prediksi.py --pure-data NEW_BENCHMARK/PURE_DATA --actual-table LogGameBenchmark
+    python audit_prediksi.py --benchmark --num-games 20 --days 365
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from akses_data import DatabaseError, SqliteBackend, DataAccess, fill_sqlite_sample, get_database
+from histori_massal import load_histories_bulk
+from kodek_prediksi import (BITMAP_BYTES, FORMAT_BITMAP_RANK, FORMAT_ZLIB, NUMBER_SPACE, encode_legacy,
+                            encode_prediction, prediction_parts, read_prediction)
+from muat_bertahap import fetch_chunks
+
+# --- Konfigurasi Koneksi ---
+SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
+DATABASE_NAME = 'GamesMatrix'
+PREDICTION_TABLE = 'HasilBenchmarkMix'
+ACTUAL_TABLE = 'LogGame'
+
+CONNECTION_STRING = (
+    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+    f"SERVER={SERVER_NAME};"
+    f"DATABASE={DATABASE_NAME};"
+    f"Trusted_Connection=yes;"
+)
+
+AUDIT_CHUNK_ROWS = 1000  # ~9 juta nomor (string lama / zlib) per perbandingan
+NO_NUMBER = 0xFFFF  # pengganti hasil aktual yang belum ada; tidak pernah cocok dengan nomor 0000-9999
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+OUTPUT_DIR = "Audit_Result"
+
+ROW_COLUMNS = ['GameCode', 'Periode', 'Tanggal', 'Aktual', 'Ukuran', 'Berurutan', 'Hit', 'RankHit']
+
+
+def score_predictions(values, actuals):
+    """
+    Flag hit dan rank hit (vektor) untuk satu chunk prediksi.
+
+    Args:
+        values: Per baris string format lama, bytes `kodek_prediksi`, array nomor
+            (urutan tidak diketahui), atau None/"" (tidak ada prediksi).
+        actuals: LogResult aktual per baris; negatif = hasil belum ada.
+
+    Returns:
+        (sizes, ordered, hit, hit_rank): jumlah nomor per baris, flag urutan diketahui,
+        flag hit, dan rank hit 0-based (-1 jika miss, belum ada hasil, atau urutan tidak diketahui).
+    """
+    actuals = np.asarray(actuals, dtype=np.int64)
+    has_actual = (actuals >= 0) & (actuals < NUMBER_SPACE)
+    n = len(actuals)
+    sizes = np.zeros(n, dtype=np.int64)
+    ordered = np.zeros(n, dtype=bool)
+    hit = np.zeros(n, dtype=bool)
+    hit_rank = np.full(n, -1, dtype=np.int64)
+
+    order_rows, orders, bitmap_rows, bitmaps, ranks = [], [], [], [], []
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        if isinstance(value, np.ndarray):
+            bitmap, rank, order = _bitmap_of(value), None, None
+        else:
+            bitmap, rank, order = prediction_parts(value)
+        if order is not None:
+            order_rows.append(i)
+            orders.append(order)
+        else:
+            bitmap_rows.append(i)
+            bitmaps.append(bitmap)
+            ranks.append(rank)
+
+    if orders:
+        # Format berbasis urutan: satu perbandingan atas semua nomor chunk yang digabung;
+        # posisi kecocokan pertama per baris = rank hit
+        rows = np.array(order_rows, dtype=np.int64)
+        lengths = np.array([len(order) for order in orders], dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        targets = np.where(has_actual[rows], actuals[rows], NO_NUMBER).astype(np.uint16)
+        matches = np.flatnonzero(np.concatenate(orders) == np.repeat(targets, lengths))
+        owners = np.searchsorted(starts, matches, side='right') - 1
+        owners, first = np.unique(owners, return_index=True)
+        hit[rows[owners]] = True
+        hit_rank[rows[owners]] = matches[first] - starts[owners]
+        sizes[rows] = lengths
+        ordered[rows] = True
+
+    if bitmaps:
+        # Matriks bitmap (baris x 10.000 bit) langsung dari bytes tersimpan, tanpa unpack
+        rows = np.array(bitmap_rows, dtype=np.int64)
+        matrix = np.frombuffer(b"".join(bitmaps), dtype=np.uint8).reshape(-1, BITMAP_BYTES)
+        known = has_actual[rows]
+        number = np.where(known, actuals[rows], 0)
+        byte, bit = number >> 3, number & 7
+        k = np.arange(len(rows))
+        cell = matrix[k, byte].astype(np.uint16)
+        is_hit = known & (((cell >> (7 - bit)) & 1) == 1)
+        counts = POPCOUNT[matrix]
+        cumulative = np.cumsum(counts, axis=1, dtype=np.int64)
+        # Indeks nomor aktual di antara nomor prediksi yang diurutkan naik
+        ascending_index = cumulative[k, byte] - counts[k, byte] + POPCOUNT[cell >> (8 - bit)]
+        has_rank = np.array([rank is not None for rank in ranks], dtype=bool)
+        if has_rank.any():
+            rank_lengths = np.array([len(rank) if rank is not None else 0 for rank in ranks], dtype=np.int64)
+            flat_ranks = np.concatenate([rank for rank in ranks if rank is not None])
+            lookup = is_hit & has_rank
+            offsets = np.cumsum(rank_lengths) - rank_lengths
+            hit_rank[rows[lookup]] = flat_ranks[offsets[lookup] + ascending_index[lookup]]
+        hit[rows] = is_hit
+        sizes[rows] = cumulative[:, -1]
+        ordered[rows] = has_rank
+    return sizes, ordered, hit, hit_rank
+
+
+def _bitmap_of(numbers):
+    mask = np.zeros(NUMBER_SPACE, dtype=bool)
+    mask[numbers] = True
+    return np.packbits(mask).tobytes()
+
+
+class AuditResult:
+    """
+    Hasil audit per baris prediksi.
+
+    Attributes:
+        rows (pd.DataFrame): GameCode, Periode, Tanggal, Aktual (-1 = belum ada),
+            Ukuran, Berurutan, Hit, RankHit (-1 = miss / tidak diketahui).
+        seconds (float): Durasi audit (query + decode + skor).
+    """
+
+    def __init__(self, rows, seconds=0.0):
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def scored(self):
+        """Baris yang hasil aktualnya sudah ada."""
+        return self.rows[self.rows['Aktual'] >= 0]
+
+    def _table(self, key, top_k=()):
+        scored = self.scored
+        grouped = scored.groupby(key)
+        table = pd.DataFrame({
+            'Prediksi': grouped.size(),
+            'Hit': grouped['Hit'].sum(),
+            'RataUkuran': grouped['Ukuran'].mean().round(1),
+        })
+        table['HitRate'] = table['Hit'] / table['Prediksi']
+        known = scored[scored['RankHit'] >= 0].groupby(key)['RankHit']
+        table['MedianRankHit'] = known.median()
+        # Hit rate pada K teratas hanya dihitung dari prediksi yang urutannya tersimpan
+        ordered = scored[scored['Berurutan']]
+        for k in top_k:
+            in_top = (ordered['RankHit'] >= 0) & (ordered['RankHit'] < k)
+            table[f'HitRate@{k}'] = in_top.groupby(ordered[key]).sum() / ordered.groupby(key).size()
+        # Game / hari yang semua prediksinya masih menunggu hasil tetap muncul
+        table = table.reindex(self.rows.groupby(key).size().index)
+        table[['Prediksi', 'Hit']] = table[['Prediksi', 'Hit']].fillna(0).astype(np.int64)
+        table['Menunggu'] = self.rows[self.rows['Aktual'] < 0].groupby(key).size().reindex(table.index, fill_value=0)
+        return table
+
+    def per_game(self, top_k=()):
+        """Tabel hit rate per GameCode."""
+        return self._table('GameCode', top_k)
+
+    def per_day(self, top_k=()):
+        """Tabel hit rate per hari (semua GameCode)."""
+        return self._table('Tanggal', top_k)
+
+    def save(self, output_dir=OUTPUT_DIR, top_k=()):
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        for name, table in (("audit_per_game.csv", self.per_game(top_k)), ("audit_per_hari.csv", self.per_day(top_k))):
+            path = os.path.join(output_dir, name)
+            table.to_csv(path)
+            paths.append(path)
+        return paths
+
+    def print_summary(self, top_k=()):
+        scored = self.scored
+        total, hits = len(scored), int(scored['Hit'].sum())
+        print(f"\nAudit {len(self.rows)} prediksi ({self.rows['GameCode'].nunique()} GameCode) dalam {self.seconds:.2f} s: "
+              f"{total} sudah ada hasil, {len(self.rows) - total} menunggu")
+        if total:
+            print(f"Hit rate total: {hits}/{total} = {hits / total:.2%}")
+        with pd.option_context('display.max_rows', 60, 'display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.4f}'.format):
+            print("\n--- Hit rate per GameCode ---")
+            print(self.per_game(top_k))
+            print("\n--- Hit rate per hari ---")
+            print(self.per_day(top_k).tail(31))
+
+
+def _score_frame(chunk, values):
+    actuals = pd.to_numeric(chunk['LogResult'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    sizes, ordered, hit, hit_rank = score_predictions(values, actuals)
+    return pd.DataFrame({
+        'GameCode': chunk['GameCode'].to_numpy(dtype=object),
+        'Periode': chunk['Periode'].to_numpy(dtype=np.int64),
+        'Tanggal': pd.to_datetime(chunk['TanggalBenchmark']).dt.normalize().to_numpy(),
+        'Aktual': actuals,
+        'Ukuran': sizes,
+        'Berurutan': ordered,
+        'Hit': hit,
+        'RankHit': hit_rank,
+    })
+
+
+def audit_database(db, prediction_table=PREDICTION_TABLE, actual_table=ACTUAL_TABLE, game_codes=None, since=None,
+                   chunk_rows=AUDIT_CHUNK_ROWS):
+    """
+    Audit semua prediksi di `prediction_table` terhadap `actual_table` (LEFT JOIN per GameCode, Periode).
+
+    Args:
+        db (DataAccess): Database (lihat `akses_data.get_database`).
+        game_codes (list): Batasi ke GameCode ini (None = semua).
+        since (datetime.date): Hanya prediksi dengan TanggalBenchmark >= tanggal ini.
+
+    Returns:
+        AuditResult
+    """
+    start = time.perf_counter()
+    binary = "h.HasilBiner" if 'HasilBiner' in db.columns(prediction_table) else "NULL AS HasilBiner"
+    query = (f"SELECT h.GameCode, h.Periode, h.TanggalBenchmark, h.Hasil, {binary}, l.LogResult "
+             f"FROM [{prediction_table}] h LEFT JOIN [{actual_table}] l "
+             "ON l.GameCode = h.GameCode AND l.Periode = h.Periode")
+    conditions, params = [], []
+    if game_codes:
+        conditions.append(f"h.GameCode IN ({', '.join('?' * len(game_codes))})")
+        params.extend(game_codes)
+    if since is not None:
+        conditions.append("h.TanggalBenchmark >= ?")
+        params.append(datetime.datetime.combine(since, datetime.time()))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY h.GameCode, h.Periode"
+
+    frames = []
+    with db.connection() as cnxn:
+        for columns, rows in fetch_chunks(cnxn, query, params, chunk_rows):
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            # Hasil yang tidak kosong menang (sama dengan DataAccess.read_predictions)
+            values = [hasil if hasil and hasil.strip() else biner
+                      for hasil, biner in zip(chunk['Hasil'], chunk['HasilBiner'])]
+            del rows
+            frames.append(_score_frame(chunk, values))
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ROW_COLUMNS)
+    return AuditResult(rows, time.perf_counter() - start)
+
+
+PURE_DATA_PATTERN = re.compile(r"^(?P<game>.+)_(?P<periode>\d+)\.json$")
+
+
+def audit_pure_data(db, directory, actual_table='LogGameBenchmark', chunk_rows=AUDIT_CHUNK_ROWS):
+    """
+    Audit file PURE_DATA (`{GameCode}_{PeriodeTerakhir}.json`, prediksi untuk Periode + 1).
+
+    Returns:
+        AuditResult
+    """
+    start = time.perf_counter()
+    entries = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        match = PURE_DATA_PATTERN.match(os.path.basename(path))
+        if match:
+            entries.append((match['game'], int(match['periode']) + 1, path))
+    if not entries:
+        return AuditResult(pd.DataFrame(columns=ROW_COLUMNS), time.perf_counter() - start)
+
+    with db.connection() as cnxn:
+        histories = load_histories_bulk(cnxn, actual_table, sorted({game for game, _, _ in entries}))
+    frames = []
+    for i in range(0, len(entries), chunk_rows):
+        batch = entries[i:i + chunk_rows]
+        values, actuals = [], []
+        for game_code, periode, path in batch:
+            with open(path) as f:
+                values.append(np.array([int(n) for n in json.load(f)], dtype=np.int64))
+            actual = -1
+            if game_code in histories:
+                periodes, results = histories.get(game_code)
+                j = np.searchsorted(periodes, periode)
+                if j < len(periodes) and periodes[j] == periode:
+                    actual = int(results[j])
+            actuals.append(actual)
+        chunk = pd.DataFrame({
+            'GameCode': [game for game, _, _ in batch],
+            'Periode': [periode for _, periode, _ in batch],
+            'TanggalBenchmark': [datetime.datetime.fromtimestamp(os.path.getmtime(path)) for _, _, path in batch],
+            'LogResult': actuals,
+        })
+        frames.append(_score_frame(chunk, values))
+    return AuditResult(pd.concat(frames, ignore_index=True), time.perf_counter() - start)
+
+
+# --- Benchmark dengan SQLite ---
+
+def _fill_predictions(path, num_games, num_days, per_day, legacy_fraction, count, seed=0):
+    """Prediksi acak (campuran format lama dan biner) untuk periode yang ada di LogGame."""
+    rng = np.random.default_rng(seed)
+    db = DataAccess(SqliteBackend(path))
+    start_day = datetime.datetime(2025, 1, 1)
+    game_codes = db.game_codes(active_only=False)
+    string_rows, binary_rows = [], []
+    for code in game_codes:
+        for periode in range(1, num_days * per_day + 1):
+            numbers = rng.permutation(NUMBER_SPACE)[:count]
+            tanggal = start_day + datetime.timedelta(days=(periode - 1) // per_day)
+            if rng.random() < legacy_fraction:
+                string_rows.append((code, periode, encode_legacy(numbers), tanggal))
+            else:
+                fmt = FORMAT_BITMAP_RANK if rng.random() < 0.5 else FORMAT_ZLIB
+                binary_rows.append((code, periode, encode_prediction(numbers, fmt), tanggal))
+    db.upsert_benchmark_results(PREDICTION_TABLE, string_rows)
+    db.upsert_benchmark_results(PREDICTION_TABLE, binary_rows, binary=True)
+    db.close()
+    return len(string_rows), len(binary_rows)
+
+
+def _audit_per_row(db):
+    """Pola manual: per baris decode string/bytes lalu cari hasil aktual dengan perbandingan linear."""
+    rows = db.read_frame(f"SELECT h.GameCode, h.Periode, h.Hasil, h.HasilBiner, l.LogResult FROM [{PREDICTION_TABLE}] h "
+                         f"LEFT JOIN [{ACTUAL_TABLE}] l ON l.GameCode = h.GameCode AND l.Periode = h.Periode "
+                         "ORDER BY h.GameCode, h.Periode")
+    hits, ranks = [], []
+    for hasil, biner, actual in zip(rows['Hasil'], rows['HasilBiner'], rows['LogResult']):
+        numbers = read_prediction(hasil if hasil else biner)
+        found = np.flatnonzero(numbers == actual) if actual == actual else []
+        hits.append(len(found) > 0)
+        ranks.append(int(found[0]) if len(found) else -1)
+    return np.array(hits), np.array(ranks)
+
+
+def run_benchmark(num_games, num_days, per_day, legacy_fraction, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit.sqlite")
+        # Hasil aktual untuk semua periode kecuali hari terakhir (prediksi "menunggu")
+        fill_sqlite_sample(path, num_games, (num_days - 1) * per_day)
+        start = time.perf_counter()
+        n_string, n_binary = _fill_predictions(path, num_games, num_days, per_day, legacy_fraction, count)
+        print(f"{n_string + n_binary} prediksi x {count} nomor ({n_string} string lama, {n_binary} biner), "
+              f"{num_games} GameCode x {num_days} hari x {per_day}/hari, disiapkan dalam {time.perf_counter() - start:.1f} s "
+              f"(file {os.path.getsize(path) / 1e6:.0f} MB)")
+
+        db = DataAccess(SqliteBackend(path))
+        start = time.perf_counter()
+        hits, ranks = _audit_per_row(db)
+        per_row_s = time.perf_counter() - start
+        result = audit_database(db)
+        db.close()
+
+    rows = result.rows
+    assert np.array_equal(rows['Hit'].to_numpy(), hits)
+    assert np.array_equal(rows['RankHit'].to_numpy(), ranks)
+    print(f"  per baris (decode + pencarian linear): {per_row_s:.2f} s")
+    print(f"  audit_database (per chunk, vektor)   : {result.seconds:.2f} s "
+          f"({len(rows) / result.seconds:,.0f} prediksi/s), {per_row_s / result.seconds:.1f}x")
+    result.print_summary(top_k=(1000, 5000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit hit rate prediksi tersimpan terhadap hasil aktual.")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, help="Hanya prediksi sejak tanggal ini (YYYY-MM-DD)")
+    parser.add_argument("--game", action="append", dest="games", help="Batasi ke GameCode ini (boleh berulang)")
+    parser.add_argument("--prediction-table", default=PREDICTION_TABLE)
+    parser.add_argument("--actual-table", default=None, help=f"Default {ACTUAL_TABLE} (LogGameBenchmark untuk --pure-data)")
+    parser.add_argument("--pure-data", help="Audit folder PURE_DATA (*.json) alih-alih tabel prediksi")
+    parser.add_argument("--top-k", type=int, nargs="*", default=[], help="Tambahkan kolom hit rate pada K nomor teratas")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark dengan database SQLite sintetis")
+    parser.add_argument("--num-games", type=int, default=20, help="[--benchmark] Jumlah GameCode")
+    parser.add_argument("--days", type=int, default=365, help="[--benchmark] Jumlah hari")
+    parser.add_argument("--per-day", type=int, default=1, help="[--benchmark] Prediksi per GameCode per hari")
+    parser.add_argument("--legacy-fraction", type=float, default=0.25, help="[--benchmark] Porsi baris format string lama")
+    parser.add_argument("--count", type=int, default=9340, help="[--benchmark] Nomor per prediksi")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.num_games, args.days, args.per_day, args.legacy_fraction, args.count)
+        return
+    try:
+        db = get_database(CONNECTION_STRING)
+        if args.pure_data:
+            result = audit_pure_data(db, args.pure_data, args.actual_table or 'LogGameBenchmark')
+        else:
+            result = audit_database(db, args.prediction_table, args.actual_table or ACTUAL_TABLE, args.games, args.since)
+    except DatabaseError as ex:
+        print("❌ Error saat audit prediksi.")
+        print(f"Pesan Error: {ex.args[1]}")
+        return
+    if result.rows.empty:
+        print("Tidak ada prediksi untuk diaudit.")
+        return
+    result.print_summary(args.top_k)
+    for path in result.save(args.output_dir, args.top_k):
+        print(f"✅ Tabel audit disimpan ke '{path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
-import pyodbc
-import pandas as pd
+import argparse
 from collections import Counter
-from tqdm import tqdm # Library untuk progress bar, install dengan: pip install tqdm
+from akses_data import DatabaseError, get_database
+from indeks_pola import PatternIndex
+from mesin_backtest import RankResult, WalkForwardBacktest
+from kurva_cakupan import CoverageRecorder
+from backtest_paralel import run_backtest
+from ekspansi_kandidat import expand_single_digit, rank_single_digit
+from keluaran_prediksi import prioritize
+from sumber_kandidat import TAHAP_EKSPANSI, near_log_code, pack_code, pack_codes, pattern_type_of
 
 # --- Konfigurasi Koneksi SQL Server Anda ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
@@ -19,23 +25,24 @@ CONNECTION_STRING = (
 NUM_RESULTS_TO_OUTPUT = 8800 # Target jumlah hasil akhir
 BACKTEST_TARGET_COUNT = 9000 # Jumlah kandidat yang digenerate selama backtesting, sedikit lebih tinggi
 NUM_BENCHMARK_PATTERNS = 15  # Berapa banyak pola teratas yang akan dijadikan benchmark
+COVERAGE_FILENAME = f"{TABLE_NAME}_coverage_curve"  # Kurva hit rate vs K (.npy & .csv)
 
 # --- Fungsi Bantuan & Analisis ---
-def get_log_game_data(server, database, table, conn_str):
+def get_log_game_data(server, database, table, conn_str, refresh_cache=False):
     try:
         print(f"Mencoba mengambil data dari tabel '{table}'...")
-        cnxn = pyodbc.connect(conn_str)
-        query = f"SELECT Periode, LogResult FROM {table} WHERE GameCode='MQ22' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
+        # Koneksi dari pool bersama; histori lewat cache lokal (hanya Periode baru yang diambil dari server)
+        df = get_database(conn_str).history(table, 'MQ22', ["Periode", "LogResult"], force_refresh=refresh_cache)
         df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
         print(f"Data berhasil diambil! Total {len(df)} periode.")
         return df
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         print(f"Terjadi kesalahan saat mengambil data: {ex.args[1]}")
         return None
 
 def extract_pattern_type(source_string):
     """Mengubah sumber detail menjadi tipe pola umum untuk benchmarking."""
+    if isinstance(source_string, int): return pattern_type_of(source_string)  # kode provenance: baca field, tanpa string
     if not isinstance(source_string, str): return "Sumber Tidak Diketahui"
     
     parts = source_string.split()
@@ -49,85 +56,45 @@ def extract_pattern_type(source_string):
         return "Analisis Lompatan Nilai"
     return source_string
 
-def add_near_log_candidates(predictions_dict, df, last_log, search_type, num_digits, window=1):
-    source_prefix = f"dari analisa {num_digits} Digit"
+def add_near_log_candidates(candidates, df, last_log, search_type, num_digits, window=1, pattern_index=None):
     pattern = ""
     if search_type == 'depan':
         pattern = last_log[:num_digits]
-        matching_rows = df[df['LogResult_Str'].str.startswith(pattern)]
-        source_prefix += f" Depan {pattern}"
     elif search_type == 'tengah':
         pattern = last_log[1:1+num_digits]
-        matching_rows = df[df['LogResult_Str'].str[1:1+num_digits] == pattern]
-        source_prefix += f" Tengah {pattern}"
     elif search_type == 'belakang':
         pattern = last_log[4-num_digits:]
-        matching_rows = df[df['LogResult_Str'].str.endswith(pattern)]
-        source_prefix += f" Belakang {pattern}"
     else: return
 
-    for _, row in matching_rows.iterrows():
-        start_idx = max(0, row.name - window)
-        end_idx = min(len(df) - 1, row.name + window)
-        for i in range(start_idx, end_idx + 1):
-            log_result = df.iloc[i]['LogResult_Str']
-            if log_result not in predictions_dict:
-                predictions_dict[log_result] = source_prefix
-
-def expand_candidates_iteratively(base_dict, target_count):
-    final_dict = base_dict.copy()
-    source_keys = list(base_dict.keys())
-    level = 1
-    while len(final_dict) < target_count:
-        newly_gen = {}
-        mod_combs = list(set((i, j) for i in range(1, level + 1) for j in range(1, level + 1)))
-        
-        for num_str in source_keys:
-            if len(final_dict) + len(newly_gen) >= target_count: break
-            num_list = [int(d) for d in num_str]
-            for d_idx in range(4):
-                for mod_up, mod_down in mod_combs:
-                    # Naik
-                    new_d_up = num_list[d_idx] + mod_up
-                    if 0 <= new_d_up <= 9:
-                        new_l = list(num_list); new_l[d_idx] = new_d_up
-                        new_n = "".join(map(str, new_l))
-                        if new_n not in final_dict and new_n not in newly_gen:
-                            newly_gen[new_n] = f"ekspansi level {level} dari {num_str}"
-                    # Turun
-                    new_d_down = num_list[d_idx] - mod_down
-                    if 0 <= new_d_down <= 9:
-                        new_l = list(num_list); new_l[d_idx] = new_d_down
-                        new_n = "".join(map(str, new_l))
-                        if new_n not in final_dict and new_n not in newly_gen:
-                            newly_gen[new_n] = f"ekspansi level {level} dari {num_str}"
-        
-        if not newly_gen: break
-        final_dict.update(newly_gen)
-        level += 1
-    return final_dict
-
-def generate_full_prediction_set(historical_df, last_log_result_str, target_count):
-    """Fungsi utama untuk menghasilkan satu set prediksi lengkap untuk satu periode."""
-    predictions = {}
-    
-    # NearLog Analysis
-    for nd in [2, 3]:
-        for st in ['depan', 'tengah', 'belakang']:
-            add_near_log_candidates(predictions, historical_df, last_log_result_str, st, nd)
-
-    # Anda bisa menambahkan fungsi analisis lompatan/penurunan di sini jika diinginkan
-    # ...
-
-    # Expansion
-    if len(predictions) < target_count:
-        predictions = expand_candidates_iteratively(predictions, target_count)
-        
-    return predictions
+    # Posisi yang cocok dibaca dari indeks pola (biaya = jumlah kecocokan), lalu jendela
+    # NearLog diambil sekaligus dari histori integer. `df` harus prefix dari histori terindeks.
+    if pattern_index is None:
+        pattern_index = PatternIndex.from_results(df['LogResult_Str'])
+    candidates.add_many(pattern_index.near_log_values(search_type, num_digits, pattern, window, limit=len(df)), near_log_code(num_digits, search_type, pattern))
+
+def expand_candidates_iteratively(base_candidates, target_count):
+    final_candidates = base_candidates.copy()
+    source_values = base_candidates.values
+    # Level & sumber pertama untuk seluruh 10.000 nomor dihitung sekaligus di grid digit,
+    # urutan dan pemotongan per sumber sama dengan loop mod_combs lama.
+    new_values, new_levels, new_sources = expand_single_digit(source_values, target_count, truncate='per_source')
+    final_candidates.add_many(new_values, pack_codes(TAHAP_EKSPANSI, source_values[new_sources], new_levels))
+    return final_candidates
+
+def rank_in_expansion(base_candidates, number):
+    """Peringkat & sumber `number` di aliran expand_candidates_iteratively tanpa membangun set (untuk backtest)."""
+    found = rank_single_digit(base_candidates.values, number, truncate='per_source')
+    if found is None: return None
+    rank, admit_rank, level, source = found
+    return RankResult(rank, admit_rank, pack_code(TAHAP_EKSPANSI, base_candidates.values[source], level))
 
 # --- Program Utama ---
 if __name__ == "__main__":
-    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING)
+    parser = argparse.ArgumentParser(description="Backtest pola benchmark lalu buat prediksi final.")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses backtest paralel (1 = serial, 0 = semua core)")
+    parser.add_argument("--refresh-cache", action="store_true", help="Abaikan cache histori lokal dan ambil ulang seluruh histori")
+    args = parser.parse_args()
+    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, refresh_cache=args.refresh_cache)
 
     if df_log is not None and len(df_log) > 1:
         
@@ -136,26 +103,24 @@ if __name__ == "__main__":
         # =================================================================
         print("\n--- FASE 1: Memulai Backtesting untuk Menemukan Pola Benchmark ---")
         pattern_benchmark_counter = Counter()
+        # Mesin walk-forward menyimpan state NearLog dan memperbaruinya per periode,
+        # sehingga histori tidak di-scan ulang dari awal di setiap iterasi.
+        backtest_engine = WalkForwardBacktest(df_log['LogResult_Str'], expand_fn=expand_candidates_iteratively, rank_fn=rank_in_expansion)
         
-        # Kita loop dari periode kedua hingga sebelum periode terakhir
-        for i in tqdm(range(1, len(df_log) - 1), desc="Backtesting"):
-            # Siapkan data untuk iterasi ini
-            previous_period_log = df_log.iloc[i-1]['LogResult_Str']
-            current_period_actual_log = df_log.iloc[i]['LogResult_Str']
-            historical_data_for_test = df_log.iloc[:i]
-            
-            # Hasilkan prediksi seolah-olah kita berada di periode sebelumnya
-            predictions_for_test = generate_full_prediction_set(
-                historical_data_for_test, 
-                previous_period_log, 
-                BACKTEST_TARGET_COUNT
-            )
-            
-            # Periksa apakah hasil aktual ada di dalam prediksi kita
-            if current_period_actual_log in predictions_for_test:
-                winning_source = predictions_for_test[current_period_actual_log]
-                pattern_type = extract_pattern_type(winning_source)
-                pattern_benchmark_counter[pattern_type] += 1
+        # Peringkat hasil aktual per periode -> kurva hit rate untuk semua K sekaligus
+        coverage = CoverageRecorder(TABLE_NAME)
+        
+        # Backtest dari periode kedua hingga sebelum periode terakhir, serial atau
+        # paralel (--workers); hasilnya identik, berisi peringkat per periode
+        backtest_run = run_backtest(backtest_engine, 1, len(df_log) - 1, BACKTEST_TARGET_COUNT, extract_pattern_type,
+                                    workers=args.workers, desc="Backtesting")
+        pattern_benchmark_counter.update(backtest_run.counter)
+        for actual_rank, pattern_type in zip(backtest_run.results, backtest_run.pattern_types):
+            coverage.record(actual_rank, pattern_type)
+        
+        coverage.print_summary()
+        npy_path, csv_path = coverage.save(COVERAGE_FILENAME)
+        print(f"Kurva cakupan disimpan ke '{npy_path}' dan '{csv_path}'.")
         
         print("\n--- Hasil Backtesting ---")
         if not pattern_benchmark_counter:
@@ -178,53 +143,26 @@ if __name__ == "__main__":
         print(f"LogResult terakhir untuk prediksi: {final_last_log} (dari Periode {df_log.iloc[-1]['Periode']})")
 
         # Hasilkan satu set prediksi lengkap menggunakan semua data historis
-        final_predictions_dict = generate_full_prediction_set(
-            df_log, 
-            final_last_log, 
-            NUM_RESULTS_TO_OUTPUT
-        )
-        
-        # Urutkan ulang hasil prediksi berdasarkan benchmark
-        prioritized_results = []
-        other_results = []
-
-        for number, source in final_predictions_dict.items():
-            pattern_type = extract_pattern_type(source)
-            if pattern_type in benchmark_patterns:
-                prioritized_results.append((number, source))
-            else:
-                other_results.append((number, source))
+        final_predictions = backtest_engine.prediction_set(len(df_log), NUM_RESULTS_TO_OUTPUT)
         
-        # Gabungkan daftar, dengan hasil prioritas di paling atas
-        final_sorted_output = prioritized_results + other_results
-        
-        # Potong sesuai jumlah output yang diinginkan
-        final_output_list = final_sorted_output[:NUM_RESULTS_TO_OUTPUT]
+        # Urutkan ulang hasil prediksi berdasarkan benchmark (hasil prioritas di paling atas),
+        # lalu potong sesuai jumlah output; teks sumber dirender hanya saat ditulis
+        final_output = prioritize(final_predictions, benchmark_patterns, NUM_RESULTS_TO_OUTPUT, partition_all=True)
 
         # =================================================================
         # FASE 3: MENYIMPAN HASIL
         # =================================================================
         print(f"\n--- FASE 3: Menyimpan Hasil Akhir ---")
-        print(f"Total {len(final_output_list)} nomor prediksi telah dihasilkan dan diurutkan.")
+        print(f"Total {len(final_output)} nomor prediksi telah dihasilkan dan diurutkan.")
         
-        if final_output_list:
-            output_filename = f'predicted_numbers_benchmarked_MQ22_{len(final_output_list)}.txt'
-            with open(output_filename, 'w') as f:
-                f.write("--- HASIL DENGAN PRIORITAS BENCHMARK ---\n")
-                for number, source in prioritized_results:
-                     if (number, source) in final_output_list:
-                        f.write(f"{number} --> {source} [BENCHMARK]\n")
-                
-                f.write("\n--- HASIL LAINNYA ---\n")
-                for number, source in other_results:
-                    if (number, source) in final_output_list:
-                        f.write(f"{number} --> {source}\n")
-
-            print(f"Semua {len(final_output_list)} nomor telah disimpan ke '{output_filename}'")
+        if len(final_output):
+            output_filename = f'predicted_numbers_benchmarked_MQ22_{len(final_output)}.txt'
+            final_output.write(output_filename)
+
+            print(f"Semua {len(final_output)} nomor telah disimpan ke '{output_filename}'")
             print("\nContoh Hasil Teratas:")
-            for i, (number, source) in enumerate(final_output_list[:15]):
-                 is_benchmark = extract_pattern_type(source) in benchmark_patterns
-                 print(f"{i+1}. {number} --> {source} {'[BENCHMARK]' if is_benchmark else ''}")
+            for i, (number, source) in enumerate(final_output.items()[:15]):
+                 print(f"{i+1}. {number} --> {source} {'[BENCHMARK]' if final_output.is_benchmark(i) else ''}")
 
         else:
             print("Tidak ada nomor yang berhasil diprediksi/dihasilkan.")
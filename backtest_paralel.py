@@ -0,0 +1,145 @@
+"""
+Backtest walk-forward paralel per rentang periode.
+
+Loop backtest berjalan di satu core. Di sini rentang periode dipecah menjadi
+potongan (chunk) berurutan yang dievaluasi di ProcessPoolExecutor:
+- Histori LogResult (int16) ditaruh sekali di `multiprocessing.shared_memory`;
+  worker membangun `PatternIndex` langsung dari buffer tersebut, jadi tidak ada
+  DataFrame yang di-pickle.
+- Setiap worker menjalankan `WalkForwardBacktest.evaluate` untuk potongannya dan
+  mengembalikan peringkat per periode beserta Counter pola miliknya sendiri.
+- Counter digabung sesuai urutan potongan, sehingga urutan penyisipan (dan
+  tie-break `most_common`) sama persis dengan loop serial.
+- Progres tqdm dijumlahkan dari semua worker lewat satu counter bersama.
+
+`workers=1` menjalankan loop serial biasa di proses utama dengan mesin yang sama.
+"""
+import multiprocessing as mp
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+from tqdm import tqdm
+
+from indeks_pola import PatternIndex
+from mesin_backtest import RankResult, WalkForwardBacktest
+
+# Jumlah potongan per worker: lebih dari satu agar beban antar worker seimbang
+CHUNKS_PER_WORKER = 4
+
+_progress = None
+
+
+class BacktestRun:
+    """
+    Hasil backtest untuk periode start..stop-1.
+
+    Attributes:
+        start (int): Indeks periode pertama.
+        results (list): RankResult (atau None) per periode.
+        pattern_types (list): Tipe pola pemenang per periode (None jika tidak ada).
+        counter (Counter): Jumlah hit per tipe pola pada target_count.
+    """
+
+    def __init__(self, start, results, pattern_types, counter):
+        self.start = start
+        self.results = results
+        self.pattern_types = pattern_types
+        self.counter = counter
+
+    def __len__(self):
+        return len(self.results)
+
+
+def _evaluate_range(engine, start, stop, target_count, pattern_type_fn, on_period):
+    results, pattern_types, counter = [], [], Counter()
+    for i in range(start, stop):
+        actual_rank = engine.evaluate(i, int(engine.results[i]))
+        pattern_type = pattern_type_fn(actual_rank.code) if actual_rank is not None else None
+        if actual_rank is not None and actual_rank.is_hit(target_count):
+            counter[pattern_type] += 1
+        results.append(actual_rank)
+        pattern_types.append(pattern_type)
+        on_period()
+    return results, pattern_types, counter
+
+
+def _init_worker(progress):
+    global _progress
+    _progress = progress
+
+
+def _tick():
+    with _progress.get_lock():
+        _progress.value += 1
+
+
+def _run_chunk(shm_name, length, start, stop, window, rank_fn, target_count, pattern_type_fn):
+    """Dijalankan di worker: evaluasi periode start..stop-1 dari histori di shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    history = np.ndarray((length,), dtype=np.int16, buffer=shm.buf)
+    # Periode i hanya melihat histori [:i] dan LogResult aktual ke-i (from_results menyalin)
+    index = PatternIndex.from_results(history[:stop + 1])
+    del history
+    shm.close()
+    engine = WalkForwardBacktest(pattern_index=index, window=window, rank_fn=rank_fn)
+    results, pattern_types, counter = _evaluate_range(engine, start, stop, target_count, pattern_type_fn, _tick)
+    # RankResult dikirim sebagai tuple biasa (lebih ringkas saat di-pickle)
+    return [tuple(r) if r is not None else None for r in results], pattern_types, counter
+
+
+def _chunk_bounds(start, stop, workers):
+    num_chunks = max(1, min(stop - start, workers * CHUNKS_PER_WORKER))
+    edges = np.linspace(start, stop, num_chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def run_backtest(engine, start, stop, target_count, pattern_type_fn, workers=1, desc="Backtesting"):
+    """
+    Menjalankan backtest periode start..stop-1 dengan `engine.evaluate`.
+
+    Args:
+        engine (WalkForwardBacktest): Mesin dengan `rank_fn` milik skrip. Untuk mode
+            paralel, `rank_fn` dan `pattern_type_fn` harus fungsi level modul
+            (bisa di-pickle).
+        target_count (int): BACKTEST_TARGET_COUNT untuk menentukan hit.
+        pattern_type_fn: `extract_pattern_type` milik skrip.
+        workers (int): Jumlah proses. 1 = serial di proses ini; 0/None = semua core.
+
+    Returns:
+        BacktestRun: Identik untuk berapa pun jumlah worker.
+    """
+    workers = workers or os.cpu_count()
+    if workers <= 1 or stop - start < 2:
+        with tqdm(total=max(0, stop - start), desc=desc) as bar:
+            results, pattern_types, counter = _evaluate_range(engine, start, stop, target_count, pattern_type_fn, lambda: bar.update(1))
+        return BacktestRun(start, results, pattern_types, counter)
+
+    history = engine.results
+    shm = shared_memory.SharedMemory(create=True, size=max(1, history.nbytes))
+    try:
+        np.ndarray(history.shape, dtype=np.int16, buffer=shm.buf)[:] = history
+        progress = mp.Value('q', 0)
+        chunks = _chunk_bounds(start, stop, workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(progress,)) as pool, \
+                tqdm(total=stop - start, desc=desc) as bar:
+            futures = [pool.submit(_run_chunk, shm.name, len(history), a, b, engine.window, engine.rank_fn,
+                                   target_count, pattern_type_fn) for a, b in chunks]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                bar.update(progress.value - bar.n)
+            chunk_outputs = [future.result() for future in futures]
+            bar.update(progress.value - bar.n)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results, pattern_types, counter = [], [], Counter()
+    for chunk_results, chunk_types, chunk_counter in chunk_outputs:
+        results.extend(RankResult(*r) if r is not None else None for r in chunk_results)
+        pattern_types.extend(chunk_types)
+        counter.update(chunk_counter)
+    return BacktestRun(start, results, pattern_types, counter)
@@ -0,0 +1,139 @@
+"""
+Buku besar (ledger) backtest per periode untuk satu GameCode, disimpan di SQLite.
+
+Mode "inkremental" lama hanya memuat nama pola dari file JSON benchmark lalu
+mengulang backtest INCREMENTAL_BACKTEST_PERIODS periode terakhir; jumlah hit yang
+sebenarnya hilang di antara run. Buku besar menyimpan setiap periode yang sudah
+di-backtest: LogResult aktual, rank, admit_rank, kode sumber pemenang, dan tipe
+polanya. Setiap run cukup mem-backtest periode yang belum tercatat, lalu ranking
+benchmark (dan kurva cakupan) dibangun ulang dari seluruh isi buku besar.
+
+Karena admit_rank disimpan (bukan status hit), ranking bisa dihitung untuk
+BACKTEST_TARGET_COUNT berapa pun tanpa backtest ulang.
+"""
+import sqlite3
+from collections import Counter
+
+import numpy as np
+
+from kurva_cakupan import CoverageRecorder
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backtest_ledger (
+    periode      INTEGER PRIMARY KEY,
+    actual       INTEGER NOT NULL,
+    rank         INTEGER NOT NULL,  -- -1 = tidak ada di aliran kandidat
+    admit_rank   INTEGER NOT NULL,  -- hit pada target K jika 0 <= admit_rank < K
+    code         INTEGER,           -- kode provenance pemenang (sumber_kandidat)
+    pattern_type TEXT
+);
+"""
+
+
+class BacktestLedger:
+    """
+    Args:
+        path (str): File SQLite, mis. f"{GAME_CODE}_backtest_ledger.sqlite".
+        variant (str): Identitas logika kandidat (mis. "kombinatorial/per_source").
+            Jika berbeda dengan yang tersimpan, isi buku besar dianggap basi dan dikosongkan.
+    """
+
+    def __init__(self, path, variant):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'variant'").fetchone()
+        if row is None or row[0] != variant:
+            if row is not None:
+                print(f"Varian buku besar berubah ('{row[0]}' -> '{variant}'). Buku besar dikosongkan.")
+            with self.conn:
+                self.conn.execute("DELETE FROM backtest_ledger")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('variant', ?)", (variant,))
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM backtest_ledger").fetchone()[0]
+
+    def resume_index(self, periodes, actuals, start, stop):
+        """
+        Indeks periode pertama (di antara start..stop-1) yang harus di-backtest.
+
+        Rank periode i bergantung pada seluruh histori sebelum i, jadi buku besar
+        hanya dipakai sampai periode pertama yang belum tercatat, LogResult-nya
+        berbeda, atau ada Periode tercatat yang sudah tidak ada di histori. Baris
+        sejak titik itu dihapus.
+
+        Args:
+            periodes: Periode terurut naik (sejajar dengan histori backtest).
+            actuals: LogResult (int) sejajar `periodes`.
+        """
+        periodes = np.asarray(periodes, dtype=np.int64)
+        actuals = np.asarray(actuals, dtype=np.int64)
+        rows = self.conn.execute("SELECT periode, actual FROM backtest_ledger ORDER BY periode").fetchall()
+        if not rows:
+            return start
+        stored = np.array(rows, dtype=np.int64)
+        stored_periode, stored_actual = stored[:, 0], stored[:, 1]
+
+        window = periodes[start:stop]
+        pos = np.searchsorted(stored_periode, window)
+        found = pos < len(stored_periode)
+        found[found] = stored_periode[pos[found]] == window[found]
+        valid = found.copy()
+        valid[found] = stored_actual[pos[found]] == actuals[start:stop][found]
+        resume = start + (int(np.argmin(valid)) if not valid.all() else len(valid))
+
+        # Periode tercatat yang tidak ada lagi di histori membuat rank sesudahnya basi
+        in_history = np.isin(stored_periode, periodes[start:stop])
+        if not in_history.all():
+            orphan = stored_periode[~in_history].min()
+            resume = min(resume, start + int(np.searchsorted(window, orphan)))
+
+        cut = periodes[resume] if resume < len(periodes) else periodes[-1] + 1
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM backtest_ledger WHERE periode >= ?", (int(cut),)).rowcount
+        if deleted and resume < stop:
+            print(f"{deleted} baris buku besar mulai Periode {int(cut)} dihapus (histori berubah atau belum lengkap).")
+        return resume
+
+    def record_run(self, periodes, actuals, backtest_run):
+        """Menyimpan hasil `run_backtest` (satu transaksi)."""
+        rows = []
+        for offset, (result, pattern_type) in enumerate(zip(backtest_run.results, backtest_run.pattern_types)):
+            i = backtest_run.start + offset
+            if result is None:
+                rows.append((int(periodes[i]), int(actuals[i]), -1, -1, None, None))
+            else:
+                rows.append((int(periodes[i]), int(actuals[i]), int(result.rank), int(result.admit_rank), int(result.code), pattern_type))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO backtest_ledger VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def pattern_counter(self, target_count):
+        """
+        Counter hit per tipe pola dari seluruh buku besar untuk `target_count`.
+
+        Urutan penyisipan = urutan hit pertama per Periode, sama dengan Counter yang
+        diisi oleh loop backtest penuh (tie-break `most_common` ikut sama).
+        """
+        rows = self.conn.execute(
+            "SELECT pattern_type, COUNT(*) FROM backtest_ledger "
+            "WHERE admit_rank >= 0 AND admit_rank < ? "
+            "GROUP BY pattern_type ORDER BY MIN(periode)", (target_count,)).fetchall()
+        return Counter(dict(rows))
+
+    def coverage(self, game_code):
+        """CoverageRecorder berisi seluruh periode di buku besar (urut Periode)."""
+        recorder = CoverageRecorder(game_code)
+        rows = self.conn.execute("SELECT rank, admit_rank, pattern_type FROM backtest_ledger ORDER BY periode").fetchall()
+        for rank, admit_rank, pattern_type in rows:
+            recorder.ranks.append(rank)
+            recorder.admit_ranks.append(admit_rank)
+            recorder.pattern_types.append(pattern_type)
+        return recorder
@@ -0,0 +1,128 @@
+"""
+Cache histori LogResult lokal per GameCode dengan pengambilan delta.
+
+Setiap skrip dulu menjalankan `SELECT Periode, LogResult ... ORDER BY Periode ASC`
+untuk seluruh histori pada setiap eksekusi (dan untuk setiap GameCode di
+MasterGame). `load_history` menyimpan hasilnya di arsip biner append-only
+(`arsip_histori.HistoryStore`) di `{cache_dir}/{table}/{game_code}/`.
+
+Run berikutnya hanya mengambil `WHERE Periode > ?` (Periode terakhir di cache)
+dan menambahkannya di akhir file arsip. Sebelumnya dilakukan cek konsistensi
+murah di server: COUNT/MIN/MAX Periode sampai Periode terakhir harus sama dengan
+manifest. Jika berbeda (baris lama diubah/dihapus, cache rusak, atau kolom yang
+diminta belum ada di cache), histori diambil ulang penuh. `force_refresh=True`
+selalu mengambil ulang penuh.
+
+Pengambilan penuh maupun delta dibaca per chunk (`muat_bertahap.stream_to_store`)
+dan langsung ditulis ke arsip, jadi memori puncak saat memuat histori panjang
+tetap sebesar satu chunk.
+"""
+import os
+
+import pandas as pd
+
+from arsip_histori import HistoryStore
+from muat_bertahap import stream_to_store
+
+CACHE_DIR = "cache_histori"
+
+
+def history_path(table, game_code, cache_dir=CACHE_DIR):
+    """Direktori arsip untuk satu GameCode (buka dengan `HistoryStore(path)`)."""
+    return os.path.join(cache_dir, table, game_code)
+
+
+def open_history(table, game_code, cache_dir=CACHE_DIR):
+    """Arsip histori yang sudah di-cache, untuk dibaca tanpa salinan (`.results`, `.periodes`)."""
+    return HistoryStore(history_path(table, game_code, cache_dir))
+
+
+def _read_cache(store):
+    """Arsip yang bisa dipakai, atau None jika belum ada/tidak utuh."""
+    if not store.exists:
+        return None
+    try:
+        intact = store.is_intact()
+    except (KeyError, TypeError, AttributeError):
+        intact = False  # manifest format lain
+    if not intact:
+        print(f"Cache '{store.path}' tidak utuh. Histori akan diambil ulang penuh.")
+        return None
+    return store
+
+
+def _select(table, columns, where):
+    column_list = ", ".join(f"[{column}]" for column in columns)
+    return f"SELECT {column_list} FROM [{table}] WHERE {where} ORDER BY Periode ASC"
+
+
+def _is_consistent(cnxn, table, game_code, manifest):
+    """Cek di server: jumlah baris & rentang Periode sampai Periode terakhir cache sama dengan manifest."""
+    if manifest['rows'] == 0:
+        return True
+    cursor = cnxn.cursor()
+    try:
+        count, first, last = cursor.execute(
+            f"SELECT COUNT(*), MIN(Periode), MAX(Periode) FROM [{table}] WHERE GameCode = ? AND Periode <= ?",
+            (game_code, manifest['last_periode'])).fetchone()
+    finally:
+        cursor.close()
+    return (count, first, last) == (manifest['rows'], manifest['first_periode'], manifest['last_periode'])
+
+
+def load_history(cnxn, table, game_code, columns=("Periode", "LogResult"), cache_dir=CACHE_DIR, force_refresh=False):
+    """
+    Histori satu GameCode, terurut naik berdasarkan Periode, lewat cache lokal.
+
+    Args:
+        cnxn: Koneksi pyodbc yang aktif.
+        table (str): Tabel log, mis. 'LogGame' atau 'LogGameBenchmark'.
+        game_code (str): GameCode.
+        columns: Kolom yang diambil (tanpa kurung siku); 'Periode' wajib ada.
+        cache_dir (str): Direktori root cache.
+        force_refresh (bool): Abaikan cache dan ambil ulang seluruh histori.
+
+    Returns:
+        pd.DataFrame: Kolom `columns` dengan isi yang sama seperti SELECT penuh.
+    """
+    columns = list(columns)
+    store = HistoryStore(history_path(table, game_code, cache_dir))
+    cached = None if force_refresh else _read_cache(store)
+
+    if cached is not None and not set(columns) <= set(cached.columns):
+        # Simpan gabungan kolom agar skrip lain yang memakai kolom lama tetap terlayani
+        columns_to_fetch = cached.columns + [c for c in columns if c not in cached.columns]
+        print(f"Cache '{game_code}' belum memiliki semua kolom yang diminta. Mengambil ulang penuh...")
+        cached = None
+    else:
+        columns_to_fetch = cached.columns if cached is not None else columns
+
+    if cached is not None and not _is_consistent(cnxn, table, game_code, cached.manifest):
+        print(f"Cache '{game_code}' tidak konsisten dengan tabel '{table}'. Mengambil ulang penuh...")
+        cached = None
+
+    if cached is None:
+        try:
+            stats = stream_to_store(cnxn, _select(table, columns_to_fetch, "GameCode = ?"), (game_code,), store,
+                                    reset_info={'table': table, 'game_code': game_code})
+        except (ValueError, TypeError) as e:
+            print(f"Histori '{game_code}' tidak bisa di-cache: {e}")
+            return pd.read_sql(_select(table, columns, "GameCode = ?"), cnxn, params=[game_code])
+        print(f"Cache '{game_code}': histori penuh diambil ({stats}).")
+        if stats.rows == 0:
+            return pd.DataFrame(columns=columns)
+        return store.to_frame(columns)
+
+    cached_rows = len(cached)
+    # Baris baru ditambahkan per chunk di akhir file arsip, tanpa menulis ulang histori lama
+    try:
+        stats = stream_to_store(cnxn, _select(table, columns_to_fetch, "GameCode = ? AND Periode > ?"),
+                                (game_code, cached.manifest['last_periode']), cached)
+    except (ValueError, TypeError) as e:
+        # Chunk yang sudah tersimpan tetap sah; sisanya diambil langsung tanpa cache
+        print(f"Gagal menambahkan ke cache '{game_code}': {e}. Cache hanya diperbarui sebagian.")
+        rest = pd.read_sql(_select(table, columns, "GameCode = ? AND Periode > ?"), cnxn,
+                           params=[game_code, cached.manifest['last_periode']])
+        return pd.concat([cached.to_frame(columns), rest], ignore_index=True)
+    print(f"Cache '{game_code}': {cached_rows} baris dari cache, baris baru: {stats}.")
+    return cached.to_frame(columns)
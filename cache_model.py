@@ -0,0 +1,224 @@
+"""
+Cache model digit terlatih per GameCode, diperbarui bertahap dengan `warm_start`.
+
+pemodelan_data.py dulu melatih ulang semua Random Forest dari nol setiap run,
+padahal sejak run sebelumnya biasanya hanya beberapa periode baru yang masuk.
+`ModelStore` menyimpan model (joblib) di
+
+    {model_dir}/{game_code}/{config_key}_p{last_periode}.joblib
+
+dengan `config_key` = hash konfigurasi fitur/model (fitur lag, mode, jumlah
+pohon, ...): konfigurasi berbeda tidak pernah memakai model yang sama, dan
+Periode terakhir histori saat versi itu disimpan ada di nama file. Periode
+sesudahnya saja yang dihitung sebagai periode baru; baris uji (hold-out) latih
+penuh sudah tercakup, jadi run ulang tanpa data baru selalu hanya memuat model.
+
+`load_or_fit` pada run berikutnya:
+
+- model dimuat dan langsung dipakai untuk inferensi selama periode baru
+  < `update_min_periods`;
+- jika sudah >= `update_min_periods`, akurasi model dihitung dulu di periode baru
+  (belum pernah dilihat model), lalu `DigitModel.add_trees` menambah
+  `trees_per_update` pohon yang dilatih di `update_window` baris terakhir
+  (pohon lama tidak disentuh);
+- latih ulang penuh jika belum ada model, `force_retrain=True`, total pohon akan
+  melebihi `max_estimators`, histori lebih pendek dari model tersimpan (data
+  diubah), atau periode baru berisi digit yang belum dikenal model.
+
+Benchmark run pertama (latih penuh), run berikutnya (muat) dan pembaruan:
+
+    python cache_model.py --periods 3000 --new 5
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+MODEL_DIR = "cache_model"
+UPDATE_MIN_PERIODS = 5     # periode baru minimal sebelum pohon baru ditambahkan
+TREES_PER_UPDATE = 10      # pohon baru per forest setiap pembaruan
+UPDATE_WINDOW = 500        # baris terakhir minimal untuk melatih pohon baru
+MAX_ESTIMATORS = 300       # di atas ini model dilatih ulang penuh
+KEEP_VERSIONS = 2          # versi (Periode) yang disimpan per konfigurasi
+
+STATUS_TRAINED = 'dilatih penuh'
+STATUS_LOADED = 'dimuat'
+STATUS_UPDATED = 'diperbarui'
+
+
+def config_key(config):
+    """Hash pendek konfigurasi fitur/model (dict yang bisa di-JSON-kan)."""
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ModelStore:
+    """
+    Args:
+        game_code (str): GameCode.
+        config (dict): Konfigurasi fitur/model; menentukan `key`.
+        model_dir (str): Direktori root cache model.
+    """
+
+    def __init__(self, game_code, config, model_dir=MODEL_DIR):
+        self.game_code = game_code
+        self.config = config
+        self.key = config_key(config)
+        self.path = os.path.join(model_dir, game_code)
+
+    def versions(self):
+        """[(last_periode, file)] untuk konfigurasi ini, urut naik."""
+        pattern = re.compile(re.escape(self.key) + r"_p(-?\d+)\.joblib$")
+        found = []
+        for file in glob.glob(os.path.join(self.path, f"{self.key}_p*.joblib")):
+            match = pattern.search(os.path.basename(file))
+            if match:
+                found.append((int(match.group(1)), file))
+        return sorted(found)
+
+    def load(self, max_periode=None):
+        """
+        Versi terbaru dengan last_periode <= `max_periode`, atau None.
+
+        Returns:
+            dict: {'model', 'config', 'last_periode', 'rows'}.
+        """
+        for periode, file in reversed(self.versions()):
+            if max_periode is not None and periode > max_periode:
+                continue
+            try:
+                payload = joblib.load(file)
+            except Exception as e:  # file terpotong/rusak atau versi library lain
+                print(f"Model '{file}' tidak bisa dimuat ({e}).")
+                continue
+            if payload.get('config') == json.loads(json.dumps(self.config, default=str)):
+                return payload
+        return None
+
+    def save(self, model, last_periode, rows):
+        """Simpan versi baru secara atomik lalu hapus versi lama di luar `KEEP_VERSIONS`."""
+        os.makedirs(self.path, exist_ok=True)
+        last_periode = int(_to_json(last_periode))
+        payload = {
+            'model': model, 'config': json.loads(json.dumps(self.config, default=str)),
+            'last_periode': last_periode, 'rows': int(rows),
+        }
+        file = os.path.join(self.path, f"{self.key}_p{last_periode}.joblib")
+        tmp_file = file + ".tmp"
+        joblib.dump(payload, tmp_file)
+        os.replace(tmp_file, file)
+        for _, old in self.versions()[:-KEEP_VERSIONS]:
+            os.remove(old)
+        return file
+
+
+def _rows(data, rows):
+    return data.iloc[rows] if hasattr(data, 'iloc') else data[rows]
+
+
+def load_or_fit(store, build_model, X, Y, periodes, train_rows=None, force_retrain=False,
+                update_min_periods=UPDATE_MIN_PERIODS, trees_per_update=TREES_PER_UPDATE,
+                update_window=UPDATE_WINDOW, max_estimators=MAX_ESTIMATORS):
+    """
+    Model siap inferensi untuk periode berikutnya: dimuat, diperbarui, atau dilatih penuh.
+
+    Args:
+        store (ModelStore): Cache model GameCode ini.
+        build_model: Fungsi tanpa argumen yang membuat `DigitModel` baru (belum dilatih).
+        X, Y: Fitur dan target seluruh histori, terurut naik per Periode.
+        periodes: Periode per baris `X`.
+        train_rows (int): Jumlah baris pertama untuk latih ulang penuh (mis. 80% untuk
+            evaluasi di sisanya); None = semua baris.
+        force_retrain (bool): Abaikan model tersimpan.
+
+    Returns:
+        (model, status, new_periods, accuracy): status = STATUS_TRAINED, STATUS_LOADED
+        atau STATUS_UPDATED; new_periods = jumlah baris yang dipakai untuk `accuracy`
+        (baris uji latih penuh, atau periode baru sebelum pembaruan); accuracy =
+        `DigitModel.digit_accuracy` di baris tersebut, None jika tidak ada.
+    """
+    periodes = np.asarray(periodes)
+    last_periode = periodes[-1]
+    payload = None if force_retrain else store.load(max_periode=int(last_periode))
+
+    if payload is not None:
+        model = payload['model']
+        start = int(np.searchsorted(periodes, payload['last_periode'], side='right'))
+        new_rows = len(periodes) - start
+        if new_rows < update_min_periods:
+            return model, STATUS_LOADED, new_rows, None
+        if model.n_estimators + trees_per_update > max_estimators:
+            print(f"Model '{store.game_code}' sudah {model.n_estimators} pohon (maks {max_estimators}). Dilatih ulang penuh...")
+        else:
+            # Periode baru belum pernah dilihat model: akurasi hold-out sebelum pohon baru ditambahkan
+            accuracy = model.digit_accuracy(_rows(X, slice(start, None)), _rows(Y, slice(start, None)))
+            if model.add_trees(X, Y, start, trees_per_update, window=update_window):
+                store.save(model, last_periode, len(periodes))
+                return model, STATUS_UPDATED, new_rows, accuracy
+            print(f"Periode baru '{store.game_code}' berisi digit yang belum dikenal model. Dilatih ulang penuh...")
+
+    train_rows = len(periodes) if train_rows is None else train_rows
+    model = build_model().fit(_rows(X, slice(0, train_rows)), _rows(Y, slice(0, train_rows)))
+    held_out = len(periodes) - train_rows
+    accuracy = model.digit_accuracy(_rows(X, slice(train_rows, None)), _rows(Y, slice(train_rows, None))) if held_out else None
+    # Baris uji ikut dicatat sebagai sudah dilihat: run ulang tanpa data baru hanya memuat model
+    store.save(model, last_periode, len(periodes))
+    return model, STATUS_TRAINED, held_out, accuracy
+
+
+# --- Benchmark ---
+
+def run_benchmark(periods, new_periods, num_lags=3, n_estimators=100):
+    from model_digit import MODE_MULTI_OUTPUT, DigitModel, _lag_matrix, _sample_digits
+
+    X, Y = _lag_matrix(_sample_digits(periods + new_periods), num_lags)
+    periodes = np.arange(len(X)) + num_lags + 1
+    old = len(X) - new_periods
+    config = {'features': X.shape[1], 'num_lags': num_lags, 'mode': MODE_MULTI_OUTPUT, 'n_estimators': n_estimators}
+
+    def build_model():
+        return DigitModel(MODE_MULTI_OUTPUT, n_estimators=n_estimators)
+
+    def timed(X_part, Y_part, periodes_part, **kwargs):
+        start = time.perf_counter()
+        model, status, evaluated, accuracy = load_or_fit(store, build_model, X_part, Y_part, periodes_part, **kwargs)
+        model.predict_proba(X_part[-1:])
+        return status, model.n_estimators, time.perf_counter() - start, evaluated, accuracy
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ModelStore("BENCH", config, tmp)
+        # Seperti pemodelan_data.py: latih penuh di 80% pertama, uji di sisanya
+        runs = [
+            ("run pertama (latih 80%)", timed(X[:old], Y[:old], periodes[:old], train_rows=int(old * 0.8))),
+            ("run berikutnya, tanpa periode baru", timed(X[:old], Y[:old], periodes[:old])),
+            (f"+{new_periods} periode baru", timed(X, Y, periodes, update_min_periods=new_periods)),
+            ("force_retrain", timed(X, Y, periodes, force_retrain=True)),
+        ]
+        start = time.perf_counter()
+        ModelStore("BENCH", config, tmp).load()['model'].predict_proba(X[-1:])
+        load_s = time.perf_counter() - start
+    print(f"{old} periode histori (+{new_periods} baru), {X.shape[1]} fitur lag, multi-output {n_estimators} pohon")
+    for label, (status, trees, seconds, evaluated, accuracy) in runs:
+        scores = f", akurasi di {evaluated} baris belum dilihat " + "/".join(f"{a:.3f}" for a in accuracy.values()) if accuracy else ""
+        print(f"  {label:<36}: {seconds:7.2f} s  ({status}, {trees} pohon{scores})")
+    print(f"  {'muat joblib + inferensi saja':<36}: {load_s:7.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cache model digit per GameCode.")
+    parser.add_argument("--periods", type=int, default=3000)
+    parser.add_argument("--new", type=int, default=5)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.periods, args.new, n_estimators=args.trees)
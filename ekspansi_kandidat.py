@@ -0,0 +1,252 @@
+"""
+Mesin ekspansi kandidat di ruang 10.000 nomor (grid 10x10x10x10).
+
+Ekspansi lama membangun kombinasi digit per sumber per level (itertools.product,
+join string, cek dictionary). Di sini level dan sumber pertama dihitung untuk
+seluruh 10.000 nomor sekaligus dengan operasi NumPy di atas grid 4 dimensi:
+
+1. Ekspansi kombinatorial (Bencmark, Benchmark_V2, NEW_BENCHMARK): "level N"
+   adalah jarak Chebyshev N (setiap digit berubah paling banyak N). Dihitung
+   dengan min-filter radius 1 yang separable per sumbu, diulang per level
+   (distance transform).
+2. Ekspansi satu digit +/-mod (back_testing, abresult_definisi, multi_analisa_data):
+   level N = nomor yang berbeda tepat satu digit sejauh N dari sebuah sumber.
+   Dihitung dengan pergeseran grid sejauh N di setiap sumbu.
+
+Label grid berisi indeks sumber terkecil, sehingga sumber pemilik setiap nomor
+sama dengan sumber pertama (urutan dictionary) yang menghasilkannya di loop lama.
+Urutan keluaran dan aturan pemotongan target mengikuti loop lama.
+
+`rank_chebyshev` / `rank_single_digit` menghitung posisi satu nomor di aliran yang
+sama tanpa membentuk aliran (dipakai backtest untuk mengecek hasil aktual).
+"""
+import numpy as np
+
+from indeks_pola import to_int_results
+
+GRID_SHAPE = (10, 10, 10, 10)
+NUM_SPACE = 10000
+MAX_LEVEL = 9
+
+# Digit setiap nomor (ribuan, ratusan, puluhan, satuan)
+DIGITS = np.stack(np.unravel_index(np.arange(NUM_SPACE), GRID_SHAPE), axis=1).astype(np.int8)
+
+_TIDAK_ADA = np.iinfo(np.int32).max
+
+# Mode pemotongan pada level terakhir:
+# 'per_source' -> cek target sebelum setiap sumber (satu blok sumber bisa melewati target)
+# 'exact'      -> berhenti tepat di target
+# 'level'      -> level terakhir diambil utuh
+TRUNCATE_MODES = ('per_source', 'exact', 'level')
+
+
+def _source_grid(source_values):
+    """Grid label berisi indeks sumber (kemunculan pertama), selain itu _TIDAK_ADA."""
+    labels = np.full(NUM_SPACE, _TIDAK_ADA, dtype=np.int32)
+    # Diisi terbalik agar indeks terkecil yang menang untuk nomor sumber duplikat
+    labels[source_values[::-1]] = np.arange(len(source_values) - 1, -1, -1, dtype=np.int32)
+    return labels.reshape(GRID_SHAPE)
+
+
+def _shift_min(grid, axis, shift, out):
+    """out[x] = min(out[x], grid[x - shift]) sepanjang satu sumbu, tanpa wrap-around."""
+    src = [slice(None)] * 4
+    dst = [slice(None)] * 4
+    if shift > 0:
+        dst[axis], src[axis] = slice(shift, None), slice(None, -shift)
+    else:
+        dst[axis], src[axis] = slice(None, shift), slice(-shift, None)
+    view = out[tuple(dst)]
+    np.minimum(view, grid[tuple(src)], out=view)
+
+
+def _init_levels(labels):
+    flat = labels.ravel()
+    level = np.full(NUM_SPACE, -1, dtype=np.int8)
+    owner = np.full(NUM_SPACE, -1, dtype=np.int32)
+    is_source = flat != _TIDAK_ADA
+    level[is_source] = 0
+    owner[is_source] = flat[is_source]
+    return level, owner
+
+
+def _assign_level(level, owner, labels, current_level):
+    flat = labels.ravel()
+    new = (level < 0) & (flat != _TIDAK_ADA)
+    level[new] = current_level
+    owner[new] = flat[new]
+
+
+def chebyshev_levels(source_values):
+    """
+    Level kombinatorial (jarak Chebyshev) dan sumber pemilik untuk semua nomor.
+
+    Args:
+        source_values: Nomor sumber (int) sesuai urutan dictionary.
+
+    Returns:
+        tuple: (level int8 per nomor, 0 = sumber, -1 = tidak terjangkau;
+                owner int32 = indeks sumber pertama yang mencapai level tersebut).
+    """
+    labels = _source_grid(np.asarray(source_values, dtype=np.int64))
+    level, owner = _init_levels(labels)
+    for current_level in range(1, MAX_LEVEL + 1):
+        # Bola Chebyshev radius 1 = produk jendela 1D, jadi min-filter bisa per sumbu
+        for axis in range(4):
+            grown = labels.copy()
+            _shift_min(labels, axis, 1, grown)
+            _shift_min(labels, axis, -1, grown)
+            labels = grown
+        _assign_level(level, owner, labels, current_level)
+    return level, owner
+
+
+def single_digit_levels(source_values):
+    """
+    Level ekspansi satu digit (+/-mod) dan sumber pemilik untuk semua nomor.
+
+    Nomor mencapai level N jika berbeda tepat satu digit sejauh N dari sebuah sumber
+    dan tidak ada sumber yang lebih dekat.
+    """
+    base = _source_grid(np.asarray(source_values, dtype=np.int64))
+    level, owner = _init_levels(base)
+    for current_level in range(1, MAX_LEVEL + 1):
+        labels = np.full(GRID_SHAPE, _TIDAK_ADA, dtype=np.int32)
+        for axis in range(4):
+            _shift_min(base, axis, current_level, labels)
+            _shift_min(base, axis, -current_level, labels)
+        _assign_level(level, owner, labels, current_level)
+    return level, owner
+
+
+def _mod_rank(current_level):
+    """
+    Peringkat +level dan -level di dalam satu digit, sesuai urutan `mod_combs` lama
+    (list(set(...)) dari pasangan (naik, turun); naik dicoba sebelum turun).
+    """
+    mod_combs = list(set((i, j) for i in range(1, current_level + 1) for j in range(1, current_level + 1)))
+    rank_up = next(k for k, (mod_up, _) in enumerate(mod_combs) if mod_up == current_level)
+    rank_down = next(k for k, (_, mod_down) in enumerate(mod_combs) if mod_down == current_level)
+    return 2 * rank_up, 2 * rank_down + 1
+
+
+def _emit(level, owner, target_count, truncate, order_key):
+    """Nomor baru sesuai urutan level -> sumber -> order_key, dipotong sesuai mode."""
+    if truncate not in TRUNCATE_MODES:
+        raise ValueError(f"truncate harus salah satu dari {TRUNCATE_MODES}")
+    count = int(np.count_nonzero(level == 0))
+    selected = []
+    for current_level in range(1, MAX_LEVEL + 1):
+        if count >= target_count:
+            break
+        members = np.flatnonzero(level == current_level)
+        if len(members) == 0:
+            # Loop lama berhenti saat satu level tidak menghasilkan nomor baru
+            break
+        members = members[np.lexsort((order_key(current_level, members), owner[members]))]
+        need = target_count - count
+        if len(members) > need:
+            if truncate == 'exact':
+                members = members[:need]
+            elif truncate == 'per_source':
+                owners = owner[members]
+                is_start = np.r_[True, owners[1:] != owners[:-1]]
+                start_pos = np.maximum.accumulate(np.where(is_start, np.arange(len(members)), 0))
+                members = members[start_pos < need]
+        selected.append(members)
+        count += len(members)
+    values = np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+    return values, level[values], owner[values]
+
+
+def _rank(level, owner, value, truncate, order_key):
+    """
+    Posisi `value` di aliran keluaran `_emit` (tanpa batas target) tanpa membangun aliran.
+
+    Returns:
+        tuple | None: (rank, admit_rank, level, indeks sumber). `rank` dihitung dari awal
+        himpunan (sumber menempati 0..jumlah_sumber-1). `admit_rank` adalah posisi yang
+        menentukan masuk/tidaknya nomor saat dipotong: nomor ada di hasil ekspansi dengan
+        `target_count` T jika dan hanya jika admit_rank < T. None jika nomor tidak pernah
+        dihasilkan (sumber, atau level setelah level kosong).
+    """
+    if truncate not in TRUNCATE_MODES:
+        raise ValueError(f"truncate harus salah satu dari {TRUNCATE_MODES}")
+    target_level = int(level[value])
+    if target_level <= 0:
+        return None
+    count = int(np.count_nonzero(level == 0))
+    for current_level in range(1, target_level):
+        members = int(np.count_nonzero(level == current_level))
+        if members == 0:
+            return None
+        count += members
+    members = np.flatnonzero(level == target_level)
+    owners = owner[members]
+    value_owner = owner[value]
+    before_block = int(np.count_nonzero(owners < value_owner))
+    same_block = members[owners == value_owner]
+    value_key = order_key(target_level, np.array([value]))[0]
+    rank = count + before_block + int(np.count_nonzero(order_key(target_level, same_block) < value_key))
+    if truncate == 'exact':
+        admit_rank = rank
+    elif truncate == 'per_source':
+        admit_rank = count + before_block
+    else:
+        admit_rank = count
+    return rank, admit_rank, target_level, int(value_owner)
+
+
+def expand_chebyshev(source_values, target_count, truncate='per_source'):
+    """
+    Ekspansi kombinatorial sampai total (sumber + baru) mencapai `target_count`.
+
+    Urutan sama dengan loop itertools.product lama: per level, per sumber
+    (urutan dictionary), lalu nilai nomor naik.
+
+    Returns:
+        tuple: (nomor baru int64, level int8, indeks sumber int32).
+    """
+    sources = to_int_results(source_values)
+    level, owner = chebyshev_levels(sources)
+    return _emit(level, owner, target_count, truncate, _value_order)
+
+
+def rank_chebyshev(source_values, value, truncate='per_source'):
+    """Peringkat satu nomor di aliran `expand_chebyshev` (lihat `_rank`)."""
+    level, owner = chebyshev_levels(to_int_results(source_values))
+    return _rank(level, owner, int(value), truncate, _value_order)
+
+
+def _value_order(current_level, members):
+    return members
+
+
+def _single_digit_order(sources, owner):
+    """Urutan di dalam satu sumber: posisi digit, lalu urutan `mod_combs` (naik/turun)."""
+    def order_key(current_level, members):
+        diff = DIGITS[members] - DIGITS[sources[owner[members]]]
+        position = np.argmax(diff != 0, axis=1)
+        rank_up, rank_down = _mod_rank(current_level)
+        rank = np.where(diff[np.arange(len(members)), position] > 0, rank_up, rank_down)
+        return position * (2 * current_level * current_level) + rank
+    return order_key
+
+
+def expand_single_digit(source_values, target_count, truncate='per_source'):
+    """
+    Ekspansi satu digit +/-mod sampai total (sumber + baru) mencapai `target_count`.
+
+    Urutan sama dengan loop lama: per level, per sumber, per posisi digit,
+    lalu urutan `mod_combs` (naik/turun).
+    """
+    sources = to_int_results(source_values)
+    level, owner = single_digit_levels(sources)
+    return _emit(level, owner, target_count, truncate, _single_digit_order(sources, owner))
+
+
+def rank_single_digit(source_values, value, truncate='per_source'):
+    """Peringkat satu nomor di aliran `expand_single_digit` (lihat `_rank`)."""
+    sources = to_int_results(source_values)
+    level, owner = single_digit_levels(sources)
+    return _rank(level, owner, int(value), truncate, _single_digit_order(sources, owner))
@@ -0,0 +1,242 @@
+"""
+Fitur lag digit (As, Kop, Kepala, Ekor) tanpa salinan, dipakai bersama oleh
+analisis_loggame.py dan pemodelan_data.py.
+
+Kedua skrip dulu membuat fitur lag dengan loop `df[col].shift(i)` bersarang,
+lalu `dropna` dan `astype(int)` per kolom: 12+ Series sementara (float64 karena
+NaN dari shift) untuk 3 lag x 4 digit, dan semuanya dibangun ulang setiap run.
+
+`LagFeatureStore` menyimpan digit sekali dalam buffer int8 kontigu (periode x 4,
+-1 = digit kosong) yang tumbuh dengan kapasitas berlipat, sehingga `append`
+periode baru tidak menyalin histori lama. Fitur lag adalah view
+`sliding_window_view` di atas buffer itu:
+
+    windows()[k, d, i-1] = digit d pada periode k + L - i   (lag i = 1..L)
+
+berbentuk (periode, digit, lag) tanpa salinan; model atau analisa lain bisa
+mengiris periode, digit, atau lag (mis. `[..., :2]` untuk 2 lag) tanpa membangun
+ulang. `matrix()` baru membuat array 2D (kolom `{digit}_lag{i}`, urutan sama
+seperti skrip lama) saat memang dibutuhkan, mis. untuk `fit` sklearn.
+
+Benchmark terhadap loop shift/dropna/astype:
+
+    python fitur_lag.py --periods 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from histori_digit import DIGIT_COLUMNS
+
+MISSING_DIGIT = -1
+_INT8 = np.iinfo(np.int8)
+
+
+class LagFeatureStore:
+    """
+    Buffer digit int8 per periode dengan view fitur lag.
+
+    Args:
+        num_lags (int): Jumlah lag L.
+        digit_cols: Nama kolom digit (urutan sumbu digit).
+        capacity (int): Kapasitas awal buffer (periode).
+    """
+
+    def __init__(self, num_lags=3, digit_cols=DIGIT_COLUMNS, capacity=1024):
+        self.num_lags = int(num_lags)
+        self.digit_cols = list(digit_cols)
+        self._digits = np.empty((max(capacity, 1), len(self.digit_cols)), dtype=np.int8)
+        self._periodes = np.empty(max(capacity, 1), dtype=np.int64)
+        self._rows = 0
+        self._windows = None
+
+    @classmethod
+    def from_frame(cls, df, num_lags=3, digit_cols=DIGIT_COLUMNS):
+        store = cls(num_lags, digit_cols, capacity=len(df))
+        store.extend_frame(df)
+        return store
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def periodes(self):
+        return self._periodes[:self._rows]
+
+    @property
+    def digits(self):
+        """Digit (periode x digit) int8, view buffer."""
+        return self._digits[:self._rows]
+
+    @property
+    def last_periode(self):
+        return int(self._periodes[self._rows - 1]) if self._rows else None
+
+    def _reserve(self, rows):
+        if rows <= len(self._digits):
+            return
+        capacity = max(rows, 2 * len(self._digits))
+        digits = np.empty((capacity, self._digits.shape[1]), dtype=np.int8)
+        periodes = np.empty(capacity, dtype=np.int64)
+        digits[:self._rows] = self.digits
+        periodes[:self._rows] = self.periodes
+        self._digits, self._periodes = digits, periodes
+
+    def append(self, periodes, digits):
+        """
+        Menambahkan periode baru di akhir buffer (histori lama tidak disalin kecuali buffer penuh).
+
+        Args:
+            periodes: Periode naik, lebih besar dari `last_periode`.
+            digits: Digit (n x jumlah digit); MISSING_DIGIT untuk digit kosong.
+        """
+        periodes = np.asarray(periodes, dtype=np.int64)
+        digits = np.asarray(digits).reshape(len(periodes), len(self.digit_cols))
+        if len(periodes) == 0:
+            return 0
+        if np.any(np.diff(periodes) <= 0) or (self._rows and periodes[0] <= self.last_periode):
+            raise ValueError("Periode append harus naik dan lebih besar dari Periode terakhir")
+        if digits.min() < _INT8.min or digits.max() > _INT8.max:
+            raise ValueError("Nilai digit di luar rentang int8")
+        self._reserve(self._rows + len(periodes))
+        self._digits[self._rows:self._rows + len(periodes)] = digits
+        self._periodes[self._rows:self._rows + len(periodes)] = periodes
+        self._rows += len(periodes)
+        self._windows = None
+        return len(periodes)
+
+    def extend_frame(self, df):
+        """
+        Menambahkan baris `df` (kolom Periode + digit) dengan Periode > `last_periode`.
+        Digit non-numerik/NaN menjadi MISSING_DIGIT (seperti `fillna(-1)` di pemodelan_data.py).
+        """
+        if self._rows:
+            df = df[df['Periode'].to_numpy() > self.last_periode]
+        if len(df) == 0:
+            return 0
+        digits = np.column_stack([
+            pd.to_numeric(df[col], errors='coerce').fillna(MISSING_DIGIT).to_numpy(dtype=np.int64)
+            for col in self.digit_cols])
+        return self.append(df['Periode'].to_numpy(), digits)
+
+    def windows(self):
+        """
+        View (periode - L + 1, digit, lag) tanpa salinan: baris k = lag 1..L untuk periode ke-(k + L).
+        Baris terakhir = fitur untuk periode berikutnya yang belum keluar.
+        """
+        if self._windows is None:
+            if self._rows < self.num_lags:
+                self._windows = np.empty((0, len(self.digit_cols), self.num_lags), dtype=np.int8)
+            else:
+                self._windows = sliding_window_view(self.digits, self.num_lags, axis=0)[..., ::-1]
+        return self._windows
+
+    def features(self):
+        """Fitur lag sejajar dengan `targets()` (periode dengan L lag lengkap), view (n - L, digit, lag)."""
+        return self.windows()[:len(self) - self.num_lags] if len(self) > self.num_lags else self.windows()[:0]
+
+    def next_features(self):
+        """Fitur lag (digit, lag) untuk periode berikutnya."""
+        return self.windows()[-1]
+
+    def targets(self):
+        """Digit periode ke-L dan seterusnya (view), sejajar dengan `features()`."""
+        return self.digits[self.num_lags:]
+
+    def target_periodes(self):
+        return self.periodes[self.num_lags:]
+
+    def complete_rows(self):
+        """Mask baris `features()` tanpa digit kosong di target maupun lag-nya (seperti `dropna`)."""
+        features = self.features()
+        return (features != MISSING_DIGIT).all(axis=(1, 2)) & (self.targets() != MISSING_DIGIT).all(axis=1)
+
+    def feature_names(self, num_lags=None):
+        num_lags = num_lags or self.num_lags
+        return [f'{col}_lag{i}' for col in self.digit_cols for i in range(1, num_lags + 1)]
+
+    def matrix(self, rows=slice(None), num_lags=None):
+        """
+        Matriks 2D int8 (baris, digit * lag) dengan kolom `feature_names()`; satu-satunya salinan,
+        dibuat hanya untuk konsumen yang butuh array 2D (mis. sklearn).
+        """
+        num_lags = num_lags or self.num_lags
+        features = self.features()[rows][..., :num_lags]
+        # Bentuk eksplisit: tanpa baris (histori <= L periode) tetap (0, digit * lag)
+        return features.reshape(len(features), len(self.digit_cols) * num_lags)
+
+
+# --- Benchmark ---
+
+def _legacy_lags(df, digit_cols, num_lags):
+    """Loop lama pemodelan_data.py: shift bersarang, dropna, astype(int) per kolom."""
+    df = df.copy()
+    for col in digit_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(-1).astype(int)
+    for col in digit_cols:
+        for i in range(1, num_lags + 1):
+            df[f'{col}_lag{i}'] = df[col].shift(i)
+    df.dropna(inplace=True)
+    for col in digit_cols:
+        for i in range(1, num_lags + 1):
+            df[f'{col}_lag{i}'] = df[f'{col}_lag{i}'].astype(int)
+    return df
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def run_benchmark(periods, num_lags=3, new_periods=5, seed=0):
+    rng = np.random.default_rng(seed)
+    digits = rng.integers(0, 10, (periods + new_periods, len(DIGIT_COLUMNS)))
+    df_all = pd.DataFrame(digits, columns=list(DIGIT_COLUMNS))
+    df_all.insert(0, 'Periode', np.arange(1, len(df_all) + 1))
+    df = df_all.iloc[:periods]
+
+    legacy, legacy_s, legacy_mb = _measure(lambda: _legacy_lags(df, DIGIT_COLUMNS, num_lags))
+    store, build_s, build_mb = _measure(lambda: LagFeatureStore.from_frame(df, num_lags))
+    features, view_s, view_mb = _measure(store.features)
+    matrix, matrix_s, matrix_mb = _measure(store.matrix)
+    names = store.feature_names()
+    assert np.array_equal(matrix, legacy[names].to_numpy()) and np.array_equal(store.targets(), legacy[list(DIGIT_COLUMNS)])
+    assert np.shares_memory(features, store.digits)
+
+    # Histori pendek (<= L + 1 periode) dan semua baris berdigit kosong: matriks (0, fitur) seperti loop lama
+    for short in range(num_lags + 2):
+        short_store = LagFeatureStore.from_frame(df.iloc[:short], num_lags)
+        assert np.array_equal(short_store.matrix(), _legacy_lags(df.iloc[:short], DIGIT_COLUMNS, num_lags)[names].to_numpy())
+    blank = df.iloc[:num_lags + 2].assign(**{DIGIT_COLUMNS[0]: ''})
+    blank_store = LagFeatureStore.from_frame(blank, num_lags)
+    assert blank_store.matrix(blank_store.complete_rows()).shape == (0, len(names))
+
+    _, legacy_new_s, _ = _measure(lambda: _legacy_lags(df_all, DIGIT_COLUMNS, num_lags))
+    _, append_s, _ = _measure(lambda: (store.extend_frame(df_all.iloc[-new_periods:]), store.features()))
+    assert np.array_equal(store.matrix(), _legacy_lags(df_all, DIGIT_COLUMNS, num_lags)[names].to_numpy())
+
+    print(f"{periods} periode, {num_lags} lag x {len(DIGIT_COLUMNS)} digit (matriks identik dengan loop lama)")
+    print(f"  {'loop shift/dropna/astype':<30}: {legacy_s * 1e3:8.1f} ms, puncak {legacy_mb:6.1f} MB")
+    print(f"  {'LagFeatureStore.from_frame':<30}: {build_s * 1e3:8.1f} ms, puncak {build_mb:6.1f} MB "
+          f"(buffer int8 {store.digits.nbytes / 1e6:.1f} MB)")
+    print(f"  {'features() view ' + str(features.shape):<30}: {view_s * 1e3:8.3f} ms, puncak {view_mb:6.2f} MB (tanpa salinan)")
+    print(f"  {'matrix() 2D int8':<30}: {matrix_s * 1e3:8.1f} ms, puncak {matrix_mb:6.1f} MB")
+    print(f"  +{new_periods} periode: loop lama dibangun ulang {legacy_new_s * 1e3:.1f} ms, "
+          f"extend_frame + view {append_s * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fitur lag int8 berbasis sliding_window_view.")
+    parser.add_argument("--periods", type=int, default=100000)
+    parser.add_argument("--lags", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.periods, args.lags)
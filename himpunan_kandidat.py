@@ -0,0 +1,226 @@
+"""
+Himpunan kandidat berukuran tetap di ruang 10.000 nomor.
+
+Pipeline lama menyimpan kandidat sebagai dict[str, str] / set[str] sehingga setiap
+cek keanggotaan, union, dan "belum ada di final_dict maupun newly_gen" membuat dan
+meng-hash string. `CandidateSet` menyimpan:
+- `_provenance`: array int64 sepanjang 10.000 (indeks = nomor) berisi kode sumber
+  yang dipadatkan (lihat `sumber_kandidat`), -1 jika nomor bukan anggota. Array ini
+  sekaligus berfungsi sebagai bitmap keanggotaan.
+- `_order`: nomor anggota (int16) sesuai urutan penyisipan.
+- `labels`: tabel teks untuk sumber teks bebas (TAHAP_TEKS); setiap teks unik
+  disimpan sekali.
+
+Operasi per batch (add_many, contains, union, difference) berjalan dengan NumPy.
+Teks sumber hanya dirender di batas output (`to_dict`/`items`/`[nomor]`).
+"""
+import itertools
+
+import numpy as np
+
+from indeks_pola import NOMOR_STR, to_int_results
+from sumber_kandidat import TAHAP_TEKS, pack_codes, render, stage_of, text_code, text_id_of
+
+NUM_SPACE = 10000
+
+# Variasi MIX (urutan tetap): CDAB, BCDA, ABDC, DCAB, BACD
+MIX_PERMUTATIONS = [(2, 3, 0, 1), (1, 2, 3, 0), (0, 1, 3, 2), (3, 2, 0, 1), (1, 0, 2, 3)]
+# Seluruh permutasi posisi 4 digit (urutan itertools.permutations)
+ALL_PERMUTATIONS = list(itertools.permutations(range(4)))
+
+_PLACE = np.array([1000, 100, 10, 1], dtype=np.int64)
+
+
+def _to_number(number):
+    """Nomor int dari string '0123' atau int."""
+    return int(number)
+
+
+def digit_permutations(values, permutations):
+    """
+    Nomor hasil pengacakan posisi digit untuk setiap nilai.
+
+    Returns:
+        np.ndarray: Matriks int64 berukuran (jumlah_nilai, jumlah_permutasi).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    digits = (values[:, None] // _PLACE) % 10
+    perm_idx = np.asarray(permutations, dtype=np.int64)
+    return (digits[:, perm_idx] * _PLACE).sum(axis=2)
+
+
+def add_digit_permutations(candidates, permutations, stage):
+    """
+    Menambahkan variasi posisi digit dari semua anggota `candidates` saat ini,
+    per anggota (urutan penyisipan) lalu per permutasi, dengan sumber tahap
+    `stage` (TAHAP_MIX / TAHAP_PERMUTASI) dari nomor asal. Mengembalikan jumlah
+    nomor baru.
+    """
+    base_values = candidates.values.copy()
+    variations = digit_permutations(base_values, permutations)
+    return candidates.add_many(variations.ravel(), np.repeat(pack_codes(stage, base_values), len(permutations)))
+
+
+class CandidateSet:
+    """
+    Himpunan nomor 4 digit berurutan (urutan penyisipan) beserta sumbernya.
+
+    Mendukung antarmuka dict yang dipakai skrip (`in`, `[nomor]`, `items()`,
+    `keys()`, `len()`), dengan nomor berupa string '0123' atau int. Sumber bisa
+    berupa teks bebas atau kode int64 dari `sumber_kandidat`.
+    """
+
+    def __init__(self):
+        self._provenance = np.full(NUM_SPACE, -1, dtype=np.int64)
+        self._order = np.empty(256, dtype=np.int16)
+        self._size = 0
+        self.labels = []
+        self._label_ids = {}
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """Membangun himpunan dari dict {nomor: sumber} (urutan dict dipertahankan)."""
+        candidates = cls()
+        for number, source in mapping.items():
+            candidates.add(number, source)
+        return candidates
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, number):
+        return self._provenance[_to_number(number)] >= 0
+
+    def __getitem__(self, number):
+        return self.render(self.provenance_of(number))
+
+    @property
+    def values(self):
+        """Nomor anggota (int16) sesuai urutan penyisipan, tanpa salinan."""
+        return self._order[:self._size]
+
+    @property
+    def provenance(self):
+        """Kode sumber (int64) yang sejajar dengan `values`."""
+        return self._provenance[self.values]
+
+    def provenance_of(self, number):
+        """Kode sumber (int) untuk satu nomor anggota."""
+        code = int(self._provenance[_to_number(number)])
+        if code < 0:
+            raise KeyError(number)
+        return code
+
+    def text_code(self, text):
+        """Kode TAHAP_TEKS untuk teks sumber; teks yang sama selalu mendapat kode yang sama."""
+        label = self._label_ids.get(text)
+        if label is None:
+            label = self._label_ids[text] = len(self.labels)
+            self.labels.append(text)
+        return text_code(label)
+
+    def _source_code(self, source):
+        return self.text_code(source) if isinstance(source, str) else int(source)
+
+    def contains(self, values):
+        """Cek keanggotaan vektorisasi untuk array nomor."""
+        return self._provenance[np.asarray(values, dtype=np.int64)] >= 0
+
+    def add(self, number, source):
+        """Menambahkan satu nomor jika belum ada. Mengembalikan True jika ditambahkan."""
+        value = _to_number(number)
+        if self._provenance[value] >= 0:
+            return False
+        self._provenance[value] = self._source_code(source)
+        self._append(np.array([value], dtype=np.int16))
+        return True
+
+    def add_many(self, values, sources):
+        """
+        Menambahkan banyak nomor sekaligus sesuai urutan, melewati yang sudah ada
+        (termasuk duplikat di dalam batch; kemunculan pertama yang dipakai).
+
+        Args:
+            values: Kumpulan nomor (int atau string 4 digit).
+            sources: Satu sumber (teks atau kode), atau array kode sumber sejajar `values`.
+
+        Returns:
+            int: Jumlah nomor yang baru ditambahkan.
+        """
+        values = to_int_results(values)
+        if isinstance(sources, (str, int, np.integer)):
+            codes = np.full(len(values), self._source_code(sources), dtype=np.int64)
+        else:
+            codes = np.asarray(sources, dtype=np.int64)
+        fresh = self._provenance[values] < 0
+        values, codes = values[fresh], codes[fresh]
+        if len(values) == 0:
+            return 0
+        _, first_idx = np.unique(values, return_index=True)
+        first_idx.sort()
+        values, codes = values[first_idx], codes[first_idx]
+        self._provenance[values] = codes
+        self._append(values.astype(np.int16))
+        return len(values)
+
+    def _append(self, values):
+        needed = self._size + len(values)
+        if needed > len(self._order):
+            self._order = np.resize(self._order, max(needed, 2 * len(self._order)))
+        self._order[self._size:needed] = values
+        self._size = needed
+
+    def copy(self):
+        clone = CandidateSet()
+        clone._provenance = self._provenance.copy()
+        clone._order = self._order.copy()
+        clone._size = self._size
+        clone.labels = list(self.labels)
+        clone._label_ids = dict(self._label_ids)
+        return clone
+
+    def update(self, other):
+        """Menambahkan anggota `other` yang belum ada (urutan & sumber `other` dipakai)."""
+        codes = other.provenance
+        if other.labels:
+            # Kode teks menunjuk ke tabel teks `other`, dipetakan ke tabel sendiri
+            remap = np.array([self.text_code(text) for text in other.labels], dtype=np.int64)
+            is_text = stage_of(codes) == TAHAP_TEKS
+            codes = codes.copy()
+            codes[is_text] = remap[text_id_of(codes[is_text])]
+        return self.add_many(other.values, codes)
+
+    def union(self, other):
+        """Himpunan baru: anggota sendiri, lalu anggota `other` yang belum ada."""
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def difference(self, other):
+        """Himpunan baru berisi anggota yang tidak ada di `other` (urutan dipertahankan)."""
+        result = CandidateSet()
+        result.labels = list(self.labels)
+        result._label_ids = dict(self._label_ids)
+        keep = self.values[~other.contains(self.values)]
+        result.add_many(keep, self._provenance[keep])
+        return result
+
+    def keys(self):
+        """Nomor anggota (string 4 digit) sesuai urutan penyisipan."""
+        return [NOMOR_STR[value] for value in self.values.tolist()]
+
+    def render(self, code):
+        """Teks sumber untuk satu kode provenance (dipakai hanya untuk baris output)."""
+        return render(code, self.labels)
+
+    def coded_items(self):
+        """Pasangan (nomor, kode sumber int) sesuai urutan penyisipan, tanpa merender teks."""
+        return list(zip(self.keys(), self.provenance.tolist()))
+
+    def items(self):
+        """Pasangan (nomor, sumber) sesuai urutan penyisipan."""
+        return [(number, self.render(code)) for number, code in self.coded_items()]
+
+    def to_dict(self):
+        """Bentuk dict lama {nomor: sumber}, dipakai di batas output."""
+        return dict(self.items())
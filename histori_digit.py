@@ -0,0 +1,113 @@
+"""
+Histori LogResult sebagai integer: satu kali ingest, tanpa konversi string berulang.
+
+Skrip analisa dulu mengulang `df['LogResult'].astype(str).str.zfill(4)` (plus
+`pd.to_numeric`) di setiap fungsi analisa, lalu mencocokkan pola dengan slicing
+string. `DigitHistory.from_frame` mem-parse LogResult sekali, mengurutkan per
+Periode, dan menyimpan:
+- `periodes` (int64) dan `results` (int16, 0-9999)
+- `digits` (uint8, n x 4): kolom As, Kop, Kepala, Ekor
+
+Pola dicocokkan dengan aritmatika integer (`indeks_pola.pattern_key`):
+depan-2 = x // 100, belakang-2 = x % 100, tengah-2 = (x // 10) % 100, dst.
+String 4 digit hanya dibuat saat output (`indeks_pola.NOMOR_STR`).
+"""
+import numpy as np
+import pandas as pd
+
+from indeks_pola import pattern_key
+
+DIGIT_COLUMNS = ('As', 'Kop', 'Kepala', 'Ekor')
+
+_PLACE = np.array([1000, 100, 10, 1], dtype=np.int16)
+
+
+def split_digits(results):
+    """Matriks digit uint8 (n x 4) dari LogResult integer."""
+    results = np.asarray(results, dtype=np.int16)
+    return ((results[:, None] // _PLACE) % 10).astype(np.uint8)
+
+
+class DigitHistory:
+    """
+    Histori satu GameCode terurut per Periode.
+
+    Args:
+        periodes: Periode terurut naik.
+        results: LogResult integer sejajar `periodes`.
+    """
+
+    def __init__(self, periodes, results):
+        self.periodes = np.asarray(periodes, dtype=np.int64)
+        self.results = np.asarray(results, dtype=np.int16)
+        self.digits = split_digits(self.results)
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Parse kolom LogResult sekali (angka maupun teks '0123') lalu urutkan per Periode.
+        Baris dengan LogResult non-numerik dibuang, sama seperti `pd.to_numeric(..., errors='coerce').dropna()`.
+        """
+        values = pd.to_numeric(df['LogResult'], errors='coerce').to_numpy(dtype=np.float64)
+        periodes = df['Periode'].to_numpy()
+        valid = ~np.isnan(values)
+        order = np.argsort(periodes[valid], kind='stable')
+        return cls(periodes[valid][order], values[valid][order].astype(np.int16))
+
+    def __len__(self):
+        return len(self.results)
+
+    def digit(self, column):
+        """Satu kolom digit ('As', 'Kop', 'Kepala', 'Ekor') sebagai uint8."""
+        return self.digits[:, DIGIT_COLUMNS.index(column)]
+
+    @property
+    def last_result(self):
+        return int(self.results[-1])
+
+    @property
+    def last_periode(self):
+        return self.periodes[-1]
+
+    def before(self, periode):
+        """Histori dengan Periode < `periode` (view, tanpa salinan)."""
+        end = int(np.searchsorted(self.periodes, periode, side='left'))
+        history = DigitHistory.__new__(DigitHistory)
+        history.periodes, history.results, history.digits = self.periodes[:end], self.results[:end], self.digits[:end]
+        return history
+
+    def pattern(self, search_type, num_digits, value=None):
+        """Kunci pola integer dari `value` (default LogResult terakhir)."""
+        return pattern_key(self.last_result if value is None else int(value), search_type, num_digits)
+
+
+def increase_decrease_diffs(results):
+    """Selisih antar periode berurutan, unik sesuai urutan kemunculan pertama (int64)."""
+    diffs = np.diff(np.asarray(results, dtype=np.int64))
+    return pd.unique(diffs)
+
+
+def most_common_jumps(results, num_jumps=3, top=10):
+    """
+    `top` lompatan nilai (results[i] - results[i-j], j = 1..num_jumps, bukan 0)
+    yang paling sering. Seri diurutkan berdasarkan kemunculan pertama (urutan i lalu j),
+    sama dengan `Counter(jumps).most_common(top)` pada loop lama.
+
+    Returns:
+        list: Pasangan (lompatan int, jumlah).
+    """
+    values = np.asarray(results, dtype=np.int64)
+    n = len(values)
+    if n < 2:
+        return []
+    lags = np.arange(1, num_jumps + 1)
+    rows = np.arange(n)[:, None]
+    earlier = rows - lags
+    valid = earlier >= 0
+    jumps = values[:, None] - values[np.clip(earlier, 0, None)]
+    jumps = jumps[valid & (jumps != 0)]  # urutan row-major = urutan loop lama (i, lalu j)
+    if len(jumps) == 0:
+        return []
+    unique, first_idx, counts = np.unique(jumps, return_index=True, return_counts=True)
+    order = np.lexsort((first_idx, -counts))[:top]
+    return list(zip(unique[order].tolist(), counts[order].tolist()))
@@ -0,0 +1,211 @@
+"""
+Pengambilan histori banyak GameCode sekaligus (satu query terurut).
+
+Runner MasterGame (`benchmark_base_gamecode_on_table_to_db.py`, `main()` di
+Benchmark_V2 / NEW_BENCHMARK) dulu menjalankan satu `pd.read_sql` per GameCode
+(dan untuk runner MasterGame juga satu koneksi pyodbc baru per GameCode).
+`load_histories_bulk` mengambil semua game dalam satu query
+`ORDER BY GameCode, Periode`, dibaca per chunk (`muat_bertahap.fetch_chunks`)
+langsung ke array integer, lalu dipecah berdasarkan offset grup: setiap game
+mendapat view array Periode (int64) dan LogResult (int16) tanpa salinan
+DataFrame per grup.
+
+Benchmark terhadap jalur per-game dengan SQLite (skema LogGame/MasterGame sama):
+
+    python histori_massal.py --games 40 --periods 20000 --latency-ms 5
+
+SQLite lokal tidak punya round-trip jaringan, jadi `--latency-ms` menambahkan jeda
+simulasi per koneksi dan per query (SQL Server lewat ODBC biasanya beberapa ms
+per round-trip, lebih untuk membuka koneksi). Dengan `--latency-ms 0` yang
+terukur hanya biaya eksekusi + konversi, di mana kedua jalur hampir sama.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from akses_data import fill_sqlite_sample
+from muat_bertahap import CHUNK_ROWS, GrowableArray, StreamStats, fetch_chunks, to_int_column
+
+# Batas parameter per statement SQL Server adalah 2100
+MAX_IN_PARAMS = 2000
+
+ACTIVE_GAMES_JOIN = ("JOIN [MasterGame] m ON m.GameCode = l.GameCode "
+                     "WHERE m.LastResult <> 'XXXX'")
+
+
+class BulkHistory:
+    """
+    Histori beberapa GameCode dalam tiga array sejajar, dikelompokkan per game.
+
+    Attributes:
+        game_codes (list): GameCode sesuai urutan grup.
+        offsets (np.ndarray): int64 sepanjang len(game_codes) + 1; baris game ke-g
+            berada di [offsets[g], offsets[g + 1]).
+        periodes (np.ndarray): Periode int64, naik di dalam setiap grup.
+        results (np.ndarray): LogResult int16.
+        stats (StreamStats): Throughput pemuatan (baris/s, MB/s).
+    """
+
+    def __init__(self, game_codes, offsets, periodes, results):
+        self.game_codes = list(game_codes)
+        self.offsets = offsets
+        self.periodes = periodes
+        self.results = results
+        self._group = {code: g for g, code in enumerate(self.game_codes)}
+        self.stats = None
+
+    def __len__(self):
+        return len(self.game_codes)
+
+    def __contains__(self, game_code):
+        return game_code in self._group
+
+    @property
+    def total_rows(self):
+        return len(self.results)
+
+    def get(self, game_code):
+        """(periodes, results) satu game sebagai view, tanpa salinan."""
+        g = self._group[game_code]
+        start, end = self.offsets[g], self.offsets[g + 1]
+        return self.periodes[start:end], self.results[start:end]
+
+    def frame(self, game_code):
+        """DataFrame Periode/LogResult untuk skrip yang masih bekerja dengan DataFrame."""
+        periodes, results = self.get(game_code)
+        return pd.DataFrame({'Periode': periodes, 'LogResult': results.astype(np.int64)})
+
+
+def load_histories_bulk(cnxn, table, game_codes=None, chunk_rows=CHUNK_ROWS):
+    """
+    Histori Periode/LogResult untuk banyak GameCode dengan satu query per
+    `MAX_IN_PARAMS` game (biasanya satu query untuk seluruh run).
+
+    Args:
+        cnxn: Koneksi DB-API (pyodbc atau sqlite3).
+        table (str): 'LogGame' atau 'LogGameBenchmark'.
+        game_codes (list): GameCode yang diambil. None = semua game aktif di
+            MasterGame (`LastResult <> 'XXXX'`) lewat join.
+        chunk_rows (int): Baris per `fetchmany`; memori puncak tidak bergantung pada panjang histori.
+
+    Returns:
+        BulkHistory: Game tanpa baris tidak ada di hasil. `stats` berisi throughput pemuatan.
+    """
+    select = f"SELECT l.GameCode, l.Periode, l.LogResult FROM [{table}] l "
+    if game_codes is None:
+        batches = [(select + ACTIVE_GAMES_JOIN + " ORDER BY l.GameCode, l.Periode", [])]
+    else:
+        game_codes = list(dict.fromkeys(game_codes))
+        batches = []
+        for i in range(0, len(game_codes), MAX_IN_PARAMS):
+            chunk = game_codes[i:i + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            batches.append((select + f"WHERE l.GameCode IN ({placeholders}) ORDER BY l.GameCode, l.Periode", chunk))
+
+    # Hasil dibaca per chunk (fetchmany) langsung ke array integer; GameCode hanya
+    # disimpan di batas grup, bukan satu objek string per baris
+    stats = StreamStats()
+    start = time.perf_counter()
+    groups, starts = [], []
+    periodes, results = GrowableArray(np.int64, chunk_rows), GrowableArray(np.int16, chunk_rows)
+    for query, params in batches:
+        for columns, rows in fetch_chunks(cnxn, query, params, chunk_rows):
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            codes = chunk['GameCode'].to_numpy(dtype=object)
+            boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+            if not groups or codes[0] != groups[-1]:
+                boundaries = np.concatenate([[0], boundaries])
+            groups.extend(codes[boundaries].tolist())
+            starts.extend((len(periodes) + boundaries).tolist())
+            periodes.extend(chunk['Periode'].to_numpy(dtype=np.int64))
+            # LogResult bisa angka atau teks ('0123'); di-parse per chunk
+            results.extend(to_int_column(chunk['LogResult'], np.int16))
+            stats.rows += len(rows)
+            stats.chunks += 1
+            del chunk, rows
+    history = BulkHistory(groups, np.array(starts + [len(periodes)], dtype=np.int64), periodes.finish(), results.finish())
+    stats.nbytes = history.periodes.nbytes + history.results.nbytes
+    stats.seconds = time.perf_counter() - start
+    history.stats = stats
+    return history
+
+
+# --- Benchmark dengan SQLite ---
+
+def _round_trip(latency):
+    if latency:
+        time.sleep(latency)
+
+
+def _per_game(path, game_codes, latency):
+    """Jalur lama: satu koneksi + satu read_sql per GameCode."""
+    histories = {}
+    for game_code in game_codes:
+        _round_trip(latency)
+        cnxn = sqlite3.connect(path)
+        _round_trip(latency)
+        df = pd.read_sql("SELECT Periode, LogResult FROM LogGame WHERE GameCode = ? ORDER BY Periode ASC", cnxn, params=[game_code])
+        cnxn.close()
+        histories[game_code] = df
+    return histories
+
+
+def run_benchmark(num_games, num_periods, repeat=3, latency_ms=0.0):
+    latency = latency_ms / 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "standin.sqlite")
+        fill_sqlite_sample(path, num_games, num_periods)
+        cnxn = sqlite3.connect(path)
+        game_codes = [row[0] for row in cnxn.execute("SELECT GameCode FROM MasterGame WHERE LastResult <> 'XXXX'")]
+        cnxn.close()
+
+        timings = {'per-game': [], 'bulk IN (...)': [], 'bulk join MasterGame': []}
+        for _ in range(repeat):
+            t = time.perf_counter()
+            per_game = _per_game(path, game_codes, latency)
+            timings['per-game'].append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            _round_trip(latency)
+            cnxn = sqlite3.connect(path)
+            _round_trip(latency)
+            bulk = load_histories_bulk(cnxn, 'LogGame', game_codes)
+            cnxn.close()
+            timings['bulk IN (...)'].append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            _round_trip(latency)
+            cnxn = sqlite3.connect(path)
+            _round_trip(latency)
+            joined = load_histories_bulk(cnxn, 'LogGame')
+            cnxn.close()
+            timings['bulk join MasterGame'].append(time.perf_counter() - t)
+
+        for game_code in game_codes:
+            periodes, results = bulk.get(game_code)
+            assert np.array_equal(periodes, per_game[game_code]['Periode'].to_numpy())
+            assert np.array_equal(results, per_game[game_code]['LogResult'].to_numpy())
+        assert joined.game_codes == bulk.game_codes
+
+    total_rows = bulk.total_rows
+    print(f"{len(game_codes)} GameCode aktif x {num_periods} periode = {total_rows} baris "
+          f"(SQLite, latensi simulasi {latency_ms:g} ms per round-trip, terbaik dari {repeat}x)")
+    baseline = min(timings['per-game'])
+    for name, values in timings.items():
+        best = min(values)
+        print(f"  {name:<22}: {best:.3f} s  ({total_rows / best:,.0f} baris/s, {baseline / best:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pengambilan histori per-game vs bulk (SQLite).")
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--periods", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Jeda simulasi per koneksi/query (0 = SQLite murni).")
+    args = parser.parse_args()
+    run_benchmark(args.games, args.periods, args.repeat, args.latency_ms)
@@ -0,0 +1,201 @@
+"""
+Indeks posisi pola NearLog per GameCode.
+
+Setiap LogResult dipetakan ke kunci pola 2 dan 3 digit (depan, tengah, belakang).
+Untuk setiap kunci disimpan array int32 terurut berisi posisi baris yang cocok,
+sehingga pencarian NearLog cukup membaca array posisi tersebut (biaya sebanding
+dengan jumlah kecocokan, bukan panjang histori).
+
+Periode baru bisa ditambahkan dengan `append` (O(1) amortized), jadi indeks yang
+sama bisa dipakai bersama oleh backtest dan prediksi live.
+"""
+import numpy as np
+
+# Tabel string 4 digit agar konversi angka -> string tidak perlu zfill berulang
+NOMOR_STR = [f"{i:04d}" for i in range(10000)]
+
+SEARCH_TYPES = ['depan', 'tengah', 'belakang']
+
+
+def to_int_results(log_results):
+    """Mengubah kumpulan LogResult (string '0123' atau angka) menjadi array int16."""
+    if isinstance(log_results, np.ndarray) and log_results.dtype.kind in 'iu':
+        return log_results.astype(np.int16, copy=False)
+    return np.fromiter((int(x) for x in log_results), dtype=np.int16)
+
+
+def pattern_key(value, search_type, num_digits):
+    """
+    Menghitung kunci pola dari LogResult dengan aritmatika integer.
+    Bekerja untuk int tunggal maupun array NumPy.
+    """
+    if search_type == 'depan':
+        return value // 10 ** (4 - num_digits)
+    if search_type == 'tengah':
+        # Definisi lama: str[1:1+num_digits]. Untuk 3 digit sama dengan belakang 3.
+        return (value // 10 ** (3 - num_digits)) % 10 ** num_digits
+    if search_type == 'belakang':
+        return value % 10 ** num_digits
+    raise ValueError("search_type harus 'depan', 'tengah', atau 'belakang'")
+
+
+def key_kind(search_type, num_digits):
+    """Jenis tabel kunci. 'tengah' 3 digit berbagi tabel dengan 'belakang' 3 digit."""
+    if search_type not in SEARCH_TYPES:
+        raise ValueError("search_type harus 'depan', 'tengah', atau 'belakang'")
+    if num_digits not in (2, 3):
+        raise ValueError("num_digits harus 2 atau 3")
+    if search_type == 'tengah' and num_digits == 3:
+        return ('belakang', 3)
+    return (search_type, num_digits)
+
+
+KEY_KINDS = sorted({key_kind(st, nd) for nd in [2, 3] for st in SEARCH_TYPES})
+
+
+def near_log_window_positions(positions, window=1, limit=None):
+    """
+    Memperluas posisi match menjadi jendela [pos - window, pos + window] dengan satu broadcast.
+
+    Returns:
+        tuple: (matriks posisi int64 berukuran (jumlah_match, 2*window+1),
+                mask bool posisi yang berada di dalam histori [0, limit)).
+    """
+    window_idx = np.asarray(positions, dtype=np.int64)[:, None] + np.arange(-window, window + 1)
+    valid = window_idx >= 0
+    if limit is not None:
+        valid &= window_idx < limit
+    return window_idx, valid
+
+
+def gather_near_log(results, positions, window=1, limit=None):
+    """
+    LogResult di sekitar setiap posisi match, diambil dengan satu fancy-index.
+
+    Urutan hasil sama dengan loop lama: per match (posisi naik), lalu per posisi
+    jendela dari yang terkecil. Posisi di luar histori dibuang (clip).
+    """
+    window_idx, valid = near_log_window_positions(positions, window, len(results) if limit is None else limit)
+    return results[window_idx[valid]]
+
+
+def first_seen_unique(values):
+    """Nilai unik dengan urutan kemunculan pertama (provenance first-seen tetap terjaga)."""
+    if len(values) == 0:
+        return values
+    _, first_idx = np.unique(values, return_index=True)
+    return values[np.sort(first_idx)]
+
+
+class PatternIndex:
+    """
+    Indeks posisi untuk kunci pola depan/tengah/belakang 2 & 3 digit.
+
+    Args:
+        game_code (str): GameCode pemilik indeks (informasi saja).
+    """
+
+    def __init__(self, game_code=None):
+        self.game_code = game_code
+        self._results = np.empty(1024, dtype=np.int16)
+        self._length = 0
+        self._buckets = {}
+        self._counts = {}
+        for search_type, num_digits in KEY_KINDS:
+            num_keys = 10 ** num_digits
+            self._buckets[(search_type, num_digits)] = [np.empty(8, dtype=np.int32) for _ in range(num_keys)]
+            self._counts[(search_type, num_digits)] = np.zeros(num_keys, dtype=np.int64)
+
+    @classmethod
+    def from_results(cls, log_results, game_code=None):
+        """Membangun indeks sekaligus (vektorisasi) dari LogResult terurut per Periode."""
+        index = cls(game_code)
+        values = to_int_results(log_results)
+        n = len(values)
+        index._results = np.empty(max(1024, 2 * n), dtype=np.int16)
+        index._results[:n] = values
+        index._length = n
+        for kind in KEY_KINDS:
+            num_keys = 10 ** kind[1]
+            keys = pattern_key(values.astype(np.int32), *kind)
+            order = np.argsort(keys, kind='stable').astype(np.int32)
+            counts = np.bincount(keys, minlength=num_keys)
+            bounds = np.concatenate([[0], np.cumsum(counts)])
+            buckets = index._buckets[kind]
+            for key in np.flatnonzero(counts):
+                count = counts[key]
+                bucket = np.empty(count + count // 4 + 8, dtype=np.int32)
+                bucket[:count] = order[bounds[key]:bounds[key + 1]]
+                buckets[key] = bucket
+            index._counts[kind] = counts.astype(np.int64)
+        return index
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def results(self):
+        """LogResult (int16) terurut per Periode, tanpa salinan."""
+        return self._results[:self._length]
+
+    def append(self, log_result):
+        """Menambahkan satu periode baru di akhir histori (O(1) amortized)."""
+        value = int(log_result)
+        pos = self._length
+        if pos == len(self._results):
+            self._results = np.resize(self._results, 2 * len(self._results))
+        self._results[pos] = value
+        self._length += 1
+        for kind in KEY_KINDS:
+            key = pattern_key(value, *kind)
+            counts = self._counts[kind]
+            bucket = self._buckets[kind][key]
+            count = counts[key]
+            if count == len(bucket):
+                bucket = self._buckets[kind][key] = np.resize(bucket, 2 * len(bucket))
+            bucket[count] = pos
+            counts[key] = count + 1
+
+    def extend(self, log_results):
+        """Menambahkan beberapa periode baru sekaligus."""
+        for value in to_int_results(log_results):
+            self.append(value)
+
+    def lookup(self, search_type, num_digits, pattern, limit=None):
+        """
+        Posisi baris (int32, terurut naik) yang cocok dengan pola.
+
+        Args:
+            search_type (str): 'depan', 'tengah', atau 'belakang'.
+            num_digits (int): 2 atau 3.
+            pattern (str | int): Pola digit, mis. '07' atau kunci integer 7.
+            limit (int): Jika diisi, hanya posisi < limit (histori sepanjang `limit`).
+
+        Returns:
+            np.ndarray: View array posisi (jangan diubah).
+        """
+        kind = key_kind(search_type, num_digits)
+        key = int(pattern)
+        count = self._counts[kind][key]
+        positions = self._buckets[kind][key][:count]
+        if limit is not None and limit < self._length:
+            positions = positions[:np.searchsorted(positions, limit)]
+        return positions
+
+    def lookup_for(self, log_result, search_type, num_digits, limit=None):
+        """Posisi yang cocok dengan pola yang diambil dari sebuah LogResult."""
+        return self.lookup(search_type, num_digits, pattern_key(int(log_result), search_type, num_digits), limit)
+
+    def near_log_values(self, search_type, num_digits, pattern, window=1, limit=None):
+        """
+        LogResult unik (first-seen) dari jendela NearLog untuk satu pola.
+
+        Args:
+            limit (int): Panjang histori yang dipakai (default seluruh indeks).
+
+        Returns:
+            np.ndarray: LogResult int16 sesuai urutan kemunculan pertama.
+        """
+        limit = self._length if limit is None else min(limit, self._length)
+        positions = self.lookup(search_type, num_digits, pattern, limit)
+        return first_seen_unique(gather_near_log(self._results, positions, window, limit))
@@ -0,0 +1,196 @@
+"""
+Tahap output prediksi: urutan prioritas benchmark dan penulisan file Data_Result.
+
+Skrip benchmark dulu membagi kandidat ke `prioritized_results` / `other_results`
+dengan memanggil `extract_pattern_type` per kandidat, lalu saat menulis file
+mengecek `if (number, source) in final_output_list` untuk setiap baris:
+pencarian linear di list ~9.000 tuple per baris, puluhan juta perbandingan per
+game hanya untuk menulis file teks, ditambah satu `f.write` per baris.
+
+`prioritize` membagi kandidat dalam satu pass stabil (urutan penyisipan
+dipertahankan di dalam kedua kelompok) memakai flag benchmark vektor dari
+`sumber_kandidat.benchmark_mask`, dan `PrioritizedOutput.write` merender semua
+baris ke satu string lalu menulisnya dengan satu `write`.
+
+Benchmark terhadap jalur lama (file output dibandingkan byte per byte):
+
+    python keluaran_prediksi.py --count 9340
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from indeks_pola import NOMOR_STR
+from sumber_kandidat import benchmark_mask, render_many
+
+BENCHMARK_HEADER = "--- HASIL DENGAN PRIORITAS BENCHMARK ---\n"
+BENCHMARK_TAG = " [BENCHMARK]"
+
+
+class PrioritizedOutput:
+    """
+    Nomor prediksi final dalam urutan output: semua kandidat benchmark dulu, lalu sisanya.
+
+    Attributes:
+        values (np.ndarray): Nomor (int) sesuai urutan output.
+        codes (np.ndarray): Kode sumber int64 sejajar dengan `values`.
+        benchmark_count (int): Jumlah baris pertama yang termasuk pola benchmark.
+        labels (list): Tabel teks sumber (`CandidateSet.labels`) untuk render.
+    """
+
+    def __init__(self, values, codes, benchmark_count, labels=()):
+        self.values = values
+        self.codes = codes
+        self.benchmark_count = int(benchmark_count)
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def other_count(self):
+        return len(self) - self.benchmark_count
+
+    def numbers(self):
+        """Nomor (string 4 digit) sesuai urutan output."""
+        return [NOMOR_STR[value] for value in self.values.tolist()]
+
+    def sources(self):
+        """Teks sumber per baris (dirender sekali per baris output)."""
+        return render_many(self.codes, self.labels)
+
+    def items(self):
+        """Pasangan (nomor, teks sumber) sesuai urutan output, bentuk `final_output_list` lama."""
+        return list(zip(self.numbers(), self.sources()))
+
+    def is_benchmark(self, i):
+        return i < self.benchmark_count
+
+    def format(self, title=None, count_other=False):
+        """
+        Isi file output: judul opsional, baris benchmark (bertanda [BENCHMARK]),
+        lalu baris lainnya (dengan jumlahnya di header jika `count_other`).
+        """
+        lines = [f"{number} --> {source}" for number, source in zip(self.numbers(), self.sources())]
+        split = self.benchmark_count
+        other_header = f"\n--- HASIL LAINNYA ({self.other_count}) ---\n" if count_other else "\n--- HASIL LAINNYA ---\n"
+        parts = []
+        if title:
+            parts.append(f"{title}\n\n")
+        parts.append(BENCHMARK_HEADER)
+        if split:
+            parts.append((BENCHMARK_TAG + "\n").join(lines[:split]) + BENCHMARK_TAG + "\n")
+        parts.append(other_header)
+        if split < len(lines):
+            parts.append("\n".join(lines[split:]) + "\n")
+        return "".join(parts)
+
+    def write(self, path, title=None, count_other=False):
+        """Menulis file output dengan satu `write` (satu string, satu flush buffer)."""
+        text = self.format(title, count_other)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+
+def prioritize(candidates, benchmark_patterns, limit=None, partition_all=False):
+    """
+    Urutan output final dari `CandidateSet`.
+
+    Args:
+        candidates (CandidateSet): Kandidat dalam urutan penyisipan.
+        benchmark_patterns: Tipe pola benchmark (hasil `extract_pattern_type`).
+        limit (int): Jumlah nomor output (NUM_RESULTS_TO_OUTPUT); None = semua.
+        partition_all (bool): False = ambil `limit` kandidat pertama lalu bagi
+            (skrip Bencmark/); True = bagi semua kandidat lalu ambil `limit`
+            pertama (back_testing*.py).
+
+    Returns:
+        PrioritizedOutput
+    """
+    values, codes = candidates.values, candidates.provenance
+    if limit is not None and not partition_all:
+        values, codes = values[:limit], codes[:limit]
+    mask = benchmark_mask(codes, benchmark_patterns, candidates.labels)
+    # Partisi stabil: indeks benchmark (naik) lalu indeks lainnya (naik)
+    order = np.concatenate([np.flatnonzero(mask), np.flatnonzero(~mask)])
+    benchmark_count = int(mask.sum())
+    if limit is not None and partition_all:
+        order = order[:limit]
+        benchmark_count = min(benchmark_count, len(order))
+    return PrioritizedOutput(values[order].astype(np.int64), codes[order], benchmark_count, list(candidates.labels))
+
+
+# --- Benchmark ---
+
+def _legacy_write(path, candidates, benchmark_patterns, limit, title):
+    """Jalur lama: partisi per kandidat lalu cek keanggotaan di list untuk setiap baris."""
+    from sumber_kandidat import pattern_type_of
+
+    prioritized_results, other_results = [], []
+    for number, code in candidates.coded_items()[:limit]:
+        entry = (number, candidates.render(code))
+        if pattern_type_of(code) in benchmark_patterns:
+            prioritized_results.append(entry)
+        else:
+            other_results.append(entry)
+    final_output_list = prioritized_results + other_results
+    with open(path, 'w') as f:
+        f.write(f"{title}\n\n")
+        f.write(BENCHMARK_HEADER)
+        for number, source in prioritized_results:
+            if (number, source) in final_output_list: f.write(f"{number} --> {source} [BENCHMARK]\n")
+        f.write("\n--- HASIL LAINNYA ---\n")
+        for number, source in other_results:
+            if (number, source) in final_output_list: f.write(f"{number} --> {source}\n")
+
+
+def _sample_candidates(count, seed=0):
+    """Kandidat NearLog + Mix + ekspansi kombinatorial seperti output skrip Bencmark/."""
+    from himpunan_kandidat import CandidateSet
+    from sumber_kandidat import TAHAP_EKSPANSI_KOMBINATORIAL, TAHAP_MIX, near_log_code, pack_codes
+
+    rng = np.random.default_rng(seed)
+    values = rng.permutation(10000)[:count]
+    n_near, n_mix = count // 20, count // 10
+    candidates = CandidateSet()
+    for value in values[:n_near]:
+        candidates.add(int(value), near_log_code(int(rng.integers(2, 4)), 'depan', int(value) % 100))
+    sources = rng.integers(0, 10000, count)
+    candidates.add_many(values[n_near:n_near + n_mix], pack_codes(TAHAP_MIX, sources[:n_mix]))
+    rest = values[n_near + n_mix:]
+    candidates.add_many(rest, pack_codes(TAHAP_EKSPANSI_KOMBINATORIAL, sources[:len(rest)], rng.integers(1, 6, len(rest)), rest))
+    return candidates
+
+
+def run_benchmark(count, repeat=3):
+    candidates = _sample_candidates(count)
+    benchmark_patterns = ["Analisa 2 Digit Digit", "Mix", "Ekspansi Level 3", "Ekspansi Level 1"]
+    title = "--- HASIL PREDIKSI (MIX & BENCHMARKED) UNTUK BENCH ---"
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path, new_path = os.path.join(tmp, "lama.txt"), os.path.join(tmp, "baru.txt")
+        start = time.perf_counter()
+        _legacy_write(legacy_path, candidates, benchmark_patterns, count, title)
+        legacy_s = time.perf_counter() - start
+
+        new_s = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = prioritize(candidates, benchmark_patterns, count)
+            output.write(new_path, title)
+            new_s = min(new_s, time.perf_counter() - start)
+        with open(legacy_path, 'rb') as a, open(new_path, 'rb') as b:
+            assert a.read() == b.read(), "Isi file berbeda"
+    print(f"{count} baris output ({output.benchmark_count} benchmark, {output.other_count} lainnya); file identik")
+    print(f"  lama (cek 'in final_output_list' per baris): {legacy_s * 1e3:.0f} ms")
+    print(f"  prioritize + satu write                    : {new_s * 1e3:.1f} ms ({legacy_s / new_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark penulisan file output prediksi.")
+    parser.add_argument("--count", type=int, default=9340)
+    args = parser.parse_args()
+    run_benchmark(args.count)
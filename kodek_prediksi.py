@@ -0,0 +1,190 @@
+"""
+Format biner ringkas untuk set prediksi (nomor 0000-9999) yang disimpan per game per periode.
+
+Kolom Hasil dulu berisi `",".join(nomor) + "#"`: ~9.340 x 5 karakter (~46 KB
+NVARCHAR, ~93 KB di disk sebagai UTF-16) per baris, dan membaca ulang prediksi
+lama berarti mem-parse string tersebut. Format biner (2 byte header + payload):
+
+    FORMAT_BITMAP       bitmap 10.000 bit = 1.250 byte; hanya himpunan nomor (urutan naik)
+    FORMAT_BITMAP_RANK  bitmap + zlib(uint16 rank): rank[j] = posisi nomor ke-j (urut naik)
+                        dalam urutan prediksi, sehingga urutan prioritas ikut tersimpan
+    FORMAT_ZLIB         zlib(uint16 little-endian) nomor dalam urutan prediksi
+
+`encode_prediction` / `decode_prediction` untuk format biner; `read_prediction`
+membaca keduanya: bytes (format biner) maupun string format lama ("0123,4567,...#").
+
+Benchmark ukuran dan kecepatan encode/decode:
+
+    python kodek_prediksi.py --count 9340
+"""
+import argparse
+import time
+import zlib
+
+import numpy as np
+
+NUMBER_SPACE = 10000
+BITMAP_BYTES = NUMBER_SPACE // 8  # 1.250 byte
+
+MAGIC = 0xB1
+FORMAT_BITMAP = 1
+FORMAT_BITMAP_RANK = 2
+FORMAT_ZLIB = 3
+FORMAT_NAMES = {FORMAT_BITMAP: "bitmap", FORMAT_BITMAP_RANK: "bitmap+rank", FORMAT_ZLIB: "zlib uint16"}
+
+_UINT16_LE = np.dtype('<u2')
+
+
+def to_numbers(numbers):
+    """Nomor (string '0123' atau int) sebagai array uint16, urutan dipertahankan."""
+    if isinstance(numbers, np.ndarray) and numbers.dtype.kind in 'iu':
+        values = numbers.astype(np.int64, copy=False)
+    else:
+        # map(int) jauh lebih cepat daripada np.asarray(list_str).astype(int)
+        values = np.fromiter(map(int, numbers), dtype=np.int64)
+    if len(values) and (values.min() < 0 or values.max() >= NUMBER_SPACE):
+        raise ValueError(f"Nomor prediksi harus 0..{NUMBER_SPACE - 1}")
+    return values.astype(np.uint16)
+
+
+def _bitmap(values):
+    mask = np.zeros(NUMBER_SPACE, dtype=bool)
+    mask[values] = True
+    return np.packbits(mask).tobytes()
+
+
+def encode_prediction(numbers, fmt=FORMAT_BITMAP_RANK, level=6):
+    """
+    Encode set prediksi ke bytes (untuk kolom VARBINARY).
+
+    Args:
+        numbers: Nomor dalam urutan prediksi (string '0123' atau int), tanpa duplikat.
+        fmt: FORMAT_BITMAP (urutan tidak disimpan), FORMAT_BITMAP_RANK, atau FORMAT_ZLIB.
+        level (int): Level kompresi zlib.
+    """
+    values = to_numbers(numbers)
+    header = bytes((MAGIC, fmt))
+    if fmt == FORMAT_ZLIB:
+        return header + zlib.compress(values.astype(_UINT16_LE).tobytes(), level)
+    if len(np.unique(values)) != len(values):
+        raise ValueError("Format bitmap membutuhkan nomor tanpa duplikat")
+    if fmt == FORMAT_BITMAP:
+        return header + _bitmap(values)
+    if fmt == FORMAT_BITMAP_RANK:
+        order = np.argsort(values, kind='stable')
+        ranks = np.empty(len(values), dtype=_UINT16_LE)
+        ranks[:] = order  # nomor ke-j (urut naik) ada di posisi order[j] dalam urutan prediksi
+        return header + _bitmap(values) + zlib.compress(ranks.tobytes(), level)
+    raise ValueError(f"Format prediksi tidak dikenal: {fmt}")
+
+
+def prediction_parts(value):
+    """
+    Bagian mentah prediksi tanpa merekonstruksi urutan, untuk decode massal.
+
+    Returns:
+        (bitmap, ranks, order): `bitmap` = 1.250 byte (None untuk format berbasis
+        urutan), `ranks` = array rank format bitmap+rank (None jika urutan tidak
+        disimpan), `order` = nomor dalam urutan prediksi (format zlib dan string lama).
+    """
+    if isinstance(value, str):
+        return None, None, decode_legacy(value)
+    blob = bytes(value)
+    if len(blob) < 2 or blob[0] != MAGIC:
+        raise ValueError("Bukan data prediksi biner")
+    fmt, payload = blob[1], blob[2:]
+    if fmt == FORMAT_ZLIB:
+        return None, None, np.frombuffer(zlib.decompress(payload), dtype=_UINT16_LE).astype(np.uint16)
+    if fmt == FORMAT_BITMAP:
+        return payload[:BITMAP_BYTES], None, None
+    if fmt == FORMAT_BITMAP_RANK:
+        return payload[:BITMAP_BYTES], np.frombuffer(zlib.decompress(payload[BITMAP_BYTES:]), dtype=_UINT16_LE), None
+    raise ValueError(f"Format prediksi tidak dikenal: {fmt}")
+
+
+def decode_prediction(blob):
+    """Bytes hasil `encode_prediction` -> array uint16 dalam urutan prediksi (urutan naik untuk FORMAT_BITMAP)."""
+    bitmap, ranks, order = prediction_parts(bytes(blob))
+    if order is not None:
+        return order
+    bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8))[:NUMBER_SPACE]
+    ascending = np.flatnonzero(bits).astype(np.uint16)
+    if ranks is None:
+        return ascending
+    ordered = np.empty(len(ascending), dtype=np.uint16)
+    ordered[ranks] = ascending
+    return ordered
+
+
+def encode_legacy(numbers):
+    """Format string lama kolom Hasil: "0123,4567,...#"."""
+    if isinstance(numbers, list) and all(isinstance(n, str) for n in numbers):
+        return ",".join(numbers) + "#"
+    return ",".join(f"{n:04d}" for n in to_numbers(numbers).tolist()) + "#"
+
+
+def decode_legacy(text):
+    """String format lama -> array uint16 dalam urutan prediksi."""
+    body = text.strip().rstrip('#')
+    if not body:
+        return np.empty(0, dtype=np.uint16)
+    # Jalur cepat: semua nomor 4 digit ("0123,4567") -> parse langsung dari byte ASCII
+    if len(body) % 5 == 4:
+        raw = np.frombuffer((body + ',').encode('ascii', 'replace'), dtype=np.uint8).reshape(-1, 5)
+        digits = raw[:, :4] - ord('0')
+        if (raw[:, 4] == ord(',')).all() and (digits < 10).all():
+            return (digits.astype(np.uint16) @ np.array([1000, 100, 10, 1], dtype=np.uint16)).astype(np.uint16)
+    return np.array(body.split(','), dtype=np.int64).astype(np.uint16)
+
+
+def read_prediction(value):
+    """
+    Pembaca kompatibel-mundur: bytes/memoryview (format biner) atau string (format lama).
+    None atau string kosong -> None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return decode_prediction(value)
+    if isinstance(value, str):
+        return decode_legacy(value) if value.strip() else None
+    raise TypeError(f"Tipe data prediksi tidak dikenal: {type(value).__name__}")
+
+
+# --- Benchmark ---
+
+def _time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_benchmark(count, repeat=20, seed=0):
+    rng = np.random.default_rng(seed)
+    # Urutan prediksi acak = kasus terburuk untuk kompresi rank
+    numbers = [f"{n:04d}" for n in rng.permutation(NUMBER_SPACE)[:count]]
+    expected = to_numbers(numbers)
+
+    legacy, encode_s = _time(lambda: encode_legacy(numbers), repeat)
+    decoded, decode_s = _time(lambda: decode_legacy(legacy), repeat)
+    assert np.array_equal(decoded, expected)
+    print(f"{count} nomor per prediksi (urutan acak), terbaik dari {repeat}x")
+    print(f"  {'string lama':<12}: {len(legacy):>6} karakter (~{2 * len(legacy):>6} byte NVARCHAR), "
+          f"encode {encode_s * 1e3:.2f} ms, decode {decode_s * 1e3:.2f} ms")
+    for fmt, name in FORMAT_NAMES.items():
+        blob, encode_s = _time(lambda: encode_prediction(numbers, fmt), repeat)
+        decoded, decode_s = _time(lambda: read_prediction(blob), repeat)
+        assert np.array_equal(decoded, np.sort(expected) if fmt == FORMAT_BITMAP else expected)
+        print(f"  {name:<12}: {len(blob):>6} byte VARBINARY, encode {encode_s * 1e3:.2f} ms, decode {decode_s * 1e3:.2f} ms"
+              + ("  (tanpa urutan)" if fmt == FORMAT_BITMAP else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark format penyimpanan prediksi.")
+    parser.add_argument("--count", type=int, default=9340)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.count, args.repeat)
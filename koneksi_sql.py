@@ -1,5 +1,4 @@
-import pyodbc
-import pandas as pd
+from akses_data import DatabaseError, get_database
 
 # --- Konfigurasi Koneksi SQL Server Anda ---
 # Ganti nilai-nilai di bawah ini dengan informasi SQL Server Anda
@@ -23,23 +22,22 @@ CONNECTION_STRING = (
 # --- Sisanya kode tetap sama ---
 try:
     print("Mencoba membuat koneksi ke SQL Server...")
-    cnxn = pyodbc.connect(CONNECTION_STRING)
-    print("Koneksi berhasil!")
+    # Koneksi dari pool akses_data (atau SQLite jika GAMES_DB_SQLITE diset)
+    db = get_database(CONNECTION_STRING)
+    with db.connection():
+        print("Koneksi berhasil!")
 
-    cursor = cnxn.cursor()
-    print("Cursor berhasil dibuat.")
-
-    query = f"SELECT top 10 * FROM {TABLE_NAME}"
+    query = db.backend.top_query(TABLE_NAME, 10)
     print(f"Menjalankan query: {query}")
     
     # Mengambil hasil query ke dalam DataFrame Pandas
-    df = pd.read_sql(query, cnxn) # Cara yang lebih ringkas dengan Pandas
+    df = db.read_frame(query) # Cara yang lebih ringkas dengan Pandas
 
     print(f"\nData dari tabel '{TABLE_NAME}' berhasil diambil:")
     print(df.head())
     print(f"\nJumlah baris: {len(df)}")
 
-except pyodbc.Error as ex:
+except DatabaseError as ex:
     sqlstate = ex.args[0]
     print(f"Terjadi kesalahan koneksi atau query SQL:")
     print(f"SQLSTATE: {sqlstate}")
@@ -52,6 +50,6 @@ except pyodbc.Error as ex:
     print("5. Mode Autentikasi SQL Server diatur ke 'SQL Server and Windows Authentication mode' dan service sudah di-restart.")
 
 finally:
-    if 'cnxn' in locals() and cnxn:
-        cnxn.close()
+    if 'db' in locals():
+        db.close()
         print("\nKoneksi SQL Server ditutup.")
\ No newline at end of file
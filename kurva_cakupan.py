@@ -0,0 +1,117 @@
+"""
+Kurva cakupan (hit rate vs jumlah kandidat K) dari satu kali backtest.
+
+NUM_RESULTS_TO_OUTPUT / BACKTEST_TARGET_COUNT berbeda antar skrip (7000, 8800,
+8900, 9140, 9200, 9340, 9450). Dulu setiap nilai butuh backtest terpisah. Karena
+`WalkForwardBacktest.evaluate` memberi `admit_rank` hasil aktual per periode
+(nomor masuk prediksi dengan target K jika dan hanya jika admit_rank < K), satu
+kali backtest cukup untuk menghitung hit rate di semua K = 1..10.000:
+
+    hit_rate[K-1] = jumlah periode dengan admit_rank < K / jumlah periode
+
+Kurva disimpan per GameCode sebagai array NumPy (.npy) dan CSV, dengan kolom
+"Total" dan satu kolom per tipe pola pemenang (jumlah kolom pola = kolom Total).
+"""
+import numpy as np
+import pandas as pd
+
+MAX_K = 10000
+
+# Target jumlah kandidat yang dipakai skrip-skrip di repo ini
+COMMON_TARGET_COUNTS = (7000, 8800, 8900, 9000, 9140, 9200, 9340, 9450)
+
+
+def coverage_curve(admit_ranks, total=None, max_k=MAX_K):
+    """
+    Hit rate kumulatif untuk K = 1..max_k.
+
+    Args:
+        admit_ranks: admit_rank per periode; nilai negatif = hasil aktual tidak
+            pernah masuk aliran kandidat.
+        total (int): Pembagi (jumlah periode). Default: len(admit_ranks).
+
+    Returns:
+        np.ndarray: float64 berukuran max_k, elemen ke-(K-1) = hit rate pada K.
+    """
+    admit_ranks = np.asarray(admit_ranks, dtype=np.int64)
+    total = len(admit_ranks) if total is None else total
+    hits = admit_ranks[(admit_ranks >= 0) & (admit_ranks < max_k)]
+    counts = np.cumsum(np.bincount(hits, minlength=max_k))
+    if total == 0:
+        return np.zeros(max_k)
+    return counts / total
+
+
+class CoverageRecorder:
+    """
+    Mencatat peringkat hasil aktual per periode untuk satu GameCode selama backtest.
+
+    Contoh:
+        coverage = CoverageRecorder(GAME_CODE)
+        for i in ...:
+            actual_rank = backtest_engine.evaluate(i, actual)
+            coverage.record(actual_rank, extract_pattern_type(actual_rank.code) if actual_rank else None)
+        coverage.save()
+    """
+
+    def __init__(self, game_code):
+        self.game_code = game_code
+        self.ranks = []
+        self.admit_ranks = []
+        self.pattern_types = []
+
+    def __len__(self):
+        return len(self.admit_ranks)
+
+    def record(self, rank_result, pattern_type=None):
+        """Mencatat satu periode. `rank_result` None = hasil aktual tidak ada di aliran kandidat."""
+        if rank_result is None:
+            self.ranks.append(-1)
+            self.admit_ranks.append(-1)
+            self.pattern_types.append(None)
+        else:
+            self.ranks.append(rank_result.rank)
+            self.admit_ranks.append(rank_result.admit_rank)
+            self.pattern_types.append(pattern_type)
+
+    def curves(self, max_k=MAX_K):
+        """
+        Returns:
+            tuple: (label kolom, matriks float64 (jumlah_label, max_k)). Baris pertama
+            "Total", lalu tipe pola diurutkan dari yang paling sering menang.
+        """
+        admit_ranks = np.asarray(self.admit_ranks, dtype=np.int64)
+        types = pd.Series(self.pattern_types, dtype=object)
+        labels = ["Total"] + types.dropna().value_counts().index.tolist()
+        rows = [coverage_curve(admit_ranks, max_k=max_k)]
+        for label in labels[1:]:
+            rows.append(coverage_curve(admit_ranks[(types == label).to_numpy()], total=len(admit_ranks), max_k=max_k))
+        return labels, np.vstack(rows)
+
+    def to_frame(self, max_k=MAX_K):
+        """DataFrame dengan kolom K, Total, dan satu kolom per tipe pola."""
+        labels, matrix = self.curves(max_k)
+        frame = pd.DataFrame(matrix.T, columns=labels)
+        frame.insert(0, "K", np.arange(1, max_k + 1))
+        return frame
+
+    def save(self, base_filename=None, max_k=MAX_K):
+        """
+        Menyimpan kurva ke '{base}.npy' (baris sesuai urutan kolom CSV tanpa K) dan '{base}.csv'.
+
+        Returns:
+            tuple: (path .npy, path .csv)
+        """
+        if base_filename is None:
+            base_filename = f"{self.game_code}_coverage_curve"
+        frame = self.to_frame(max_k)
+        np.save(f"{base_filename}.npy", frame.drop(columns="K").to_numpy().T)
+        frame.to_csv(f"{base_filename}.csv", index=False)
+        return f"{base_filename}.npy", f"{base_filename}.csv"
+
+    def print_summary(self, target_counts=COMMON_TARGET_COUNTS):
+        """Menampilkan hit rate total pada beberapa target jumlah kandidat."""
+        curve = coverage_curve(self.admit_ranks)
+        print(f"Kurva cakupan '{self.game_code}' ({len(self)} periode):")
+        for k in target_counts:
+            print(f"  K={k}: hit rate {curve[k - 1]:.2%}")
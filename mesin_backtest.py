@@ -0,0 +1,188 @@
+"""
+Mesin backtest walk-forward (inkremental) untuk analisa NearLog.
+
+Loop backtest lama memotong `df_log.iloc[:i]` dan menjalankan ulang
+`generate_full_prediction_set` dari nol untuk setiap periode, sehingga scan
+NearLog mengulang seluruh histori di setiap langkah (O(N^2)).
+
+Mesin di sini menyimpan state-nya sendiri dan hanya memperbaruinya ketika
+periode baru masuk ke histori:
+1. `PatternIndex` (indeks_pola.py): posisi kemunculan setiap kunci pola
+   (depan/tengah/belakang, 2 & 3 digit). Indeks yang sama bisa dipakai prediksi live.
+2. Untuk setiap kunci yang pernah ditanya, urutan LogResult unik (first-seen)
+   dari jendela NearLog yang sudah lengkap.
+
+Hasil prediksi per periode (sebuah `CandidateSet`) identik dengan
+`generate_full_prediction_set` lama (urutan kandidat dan sumbernya), tetapi biaya
+total mendekati linear terhadap panjang histori.
+
+Backtest yang hanya perlu tahu apakah hasil aktual masuk prediksi (dan sumber
+pemenangnya) memakai `evaluate`: peringkat nomor aktual dihitung langsung dari
+kandidat NearLog dan jarak ekspansi ke sumber terdekat, tanpa membangun set
+prediksi 9.000 nomor. Peringkat yang sama menjawab pertanyaan hit untuk target
+jumlah kandidat berapa pun.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from himpunan_kandidat import CandidateSet
+from sumber_kandidat import near_log_code
+from indeks_pola import PatternIndex, first_seen_unique, gather_near_log, key_kind, pattern_key
+
+# Urutan analisa NearLog yang dipakai generate_full_prediction_set lama
+NEAR_LOG_STREAMS = [(nd, st) for nd in [2, 3] for st in ['depan', 'tengah', 'belakang']]
+
+
+class _NearLogStream:
+    """
+    State first-seen untuk satu kunci pola.
+
+    `values` menyimpan LogResult unik sesuai urutan kemunculan pertama di
+    jendela NearLog yang sudah lengkap (tidak terpotong oleh akhir histori).
+    """
+
+    def __init__(self):
+        self.values = np.empty(64, dtype=np.int16)
+        self.size = 0
+        self.seen = set()
+        self.consumed = 0  # jumlah posisi match yang jendelanya sudah diproses
+
+    def push_many(self, values):
+        """Menambahkan nilai (sudah unik, urutan first-seen) yang belum pernah terlihat."""
+        for value in values.tolist():
+            if value in self.seen:
+                continue
+            self.seen.add(value)
+            if self.size == len(self.values):
+                self.values = np.resize(self.values, 2 * len(self.values))
+            self.values[self.size] = value
+            self.size += 1
+
+
+class RankResult(namedtuple('RankResult', ['rank', 'admit_rank', 'code'])):
+    """
+    Posisi satu nomor di aliran kandidat (NearLog lalu ekspansi) sebuah periode.
+
+    - rank: urutan penyisipan di aliran penuh (0 = kandidat pertama).
+    - admit_rank: nomor ada di `prediction_set(n, T)` jika dan hanya jika
+      admit_rank < T (kandidat NearLog selalu 0; ekspansi mengikuti aturan
+      pemotongan skrip).
+    - code: kode provenance sumber pemenang (lihat sumber_kandidat).
+    """
+    __slots__ = ()
+
+    def is_hit(self, target_count):
+        return self.admit_rank < target_count
+
+
+class WalkForwardBacktest:
+    """
+    Backtest walk-forward yang memperbarui state NearLog periode demi periode.
+
+    `prediction_set(i, target_count)` menghasilkan CandidateSet yang sama dengan
+    `generate_full_prediction_set(df_log.iloc[:i], LogResult[i-1], target_count)` lama.
+    Nilai `i` harus tidak menurun antar pemanggilan (walk-forward).
+
+    Args:
+        log_results: LogResult terurut berdasarkan Periode (string 4 digit atau int).
+        expand_fn: Fungsi ekspansi milik skrip (mis. `expand_candidates_iteratively`),
+            menerima dan mengembalikan CandidateSet.
+        rank_fn: Pasangan `expand_fn` untuk `evaluate` (mis. `rank_in_expansion`),
+            menerima (CandidateSet NearLog, nomor) dan mengembalikan RankResult
+            dengan rank dihitung dari awal himpunan, atau None.
+        window (int): Lebar jendela NearLog (sebelum/sesudah), default 1.
+        pattern_index (PatternIndex): Indeks yang sudah dibangun; jika diisi,
+            `log_results` boleh None dan indeks dipakai bersama dengan pemanggil.
+    """
+
+    def __init__(self, log_results=None, expand_fn=None, window=1, pattern_index=None, rank_fn=None):
+        if pattern_index is None:
+            pattern_index = PatternIndex.from_results(log_results)
+        self.index = pattern_index
+        self.expand_fn = expand_fn
+        self.rank_fn = rank_fn
+        self.window = window
+        self.length = 0
+        self._streams = {}
+
+    @property
+    def results(self):
+        return self.index.results
+
+    def append(self, log_result):
+        """Menambahkan satu periode baru di akhir histori (untuk prediksi live)."""
+        self.index.append(log_result)
+        self.advance_to(len(self.index))
+
+    def advance_to(self, n):
+        """Memajukan panjang histori yang terlihat oleh mesin menjadi `n`."""
+        if n < self.length:
+            raise ValueError(f"Walk-forward tidak bisa mundur (panjang {self.length} -> {n}).")
+        if n > len(self.index):
+            raise ValueError(f"Panjang histori {n} melebihi data yang tersedia ({len(self.index)}).")
+        self.length = n
+
+    def _stream_values(self, search_type, num_digits, key):
+        """LogResult unik (first-seen) untuk satu kunci pada panjang histori saat ini."""
+        kind = key_kind(search_type, num_digits)
+        n, w = self.length, self.window
+        positions = self.index.lookup(search_type, num_digits, key, limit=n)
+        results = self.index.results
+        stream = self._streams.get((kind, key))
+        if stream is None:
+            stream = self._streams[(kind, key)] = _NearLogStream()
+
+        # Jendela match yang sudah lengkap tidak akan berubah lagi -> simpan permanen
+        complete = int(np.searchsorted(positions, n - 1 - w, side='right'))
+        if complete > stream.consumed:
+            new_values = gather_near_log(results, positions[stream.consumed:complete], w, n)
+            stream.push_many(first_seen_unique(new_values))
+            stream.consumed = complete
+
+        # Jendela di ujung histori masih terpotong -> dihitung ulang tiap pemanggilan
+        tail = [value for value in first_seen_unique(gather_near_log(results, positions[complete:], w, n)).tolist()
+                if value not in stream.seen]
+        if tail:
+            return np.concatenate([stream.values[:stream.size], np.array(tail, dtype=np.int16)])
+        return stream.values[:stream.size]
+
+    def near_log_candidates(self, n=None):
+        """
+        Kandidat NearLog (2 & 3 digit, depan/tengah/belakang) untuk histori sepanjang `n`,
+        memakai LogResult terakhir histori sebagai pola pencarian.
+        """
+        if n is not None:
+            self.advance_to(n)
+        candidates = CandidateSet()
+        if self.length == 0:
+            return candidates
+        last_value = int(self.index.results[self.length - 1])
+        for num_digits, search_type in NEAR_LOG_STREAMS:
+            key = pattern_key(last_value, search_type, num_digits)
+            candidates.add_many(self._stream_values(search_type, num_digits, key), near_log_code(num_digits, search_type, key))
+        return candidates
+
+    def prediction_set(self, n, target_count):
+        """Set prediksi lengkap (NearLog + ekspansi) untuk histori sepanjang `n`."""
+        candidates = self.near_log_candidates(n)
+        if self.expand_fn is not None and len(candidates) < target_count:
+            candidates = self.expand_fn(candidates, target_count)
+        return candidates
+
+    def evaluate(self, n, number):
+        """
+        Peringkat dan sumber pemenang `number` untuk histori sepanjang `n`, tanpa
+        membangun set prediksi lengkap.
+
+        Returns:
+            RankResult | None: None jika nomor tidak muncul di aliran kandidat.
+        """
+        candidates = self.near_log_candidates(n)
+        value = int(number)
+        if value in candidates:
+            rank = int(np.flatnonzero(candidates.values == value)[0])
+            return RankResult(rank, 0, candidates.provenance_of(value))
+        if self.rank_fn is None:
+            return None
+        return self.rank_fn(candidates, value)
@@ -0,0 +1,227 @@
+"""
+Model probabilitas digit (As, Kop, Kepala, Ekor) dari fitur lag untuk pemodelan_data.py.
+
+pemodelan_data.py dulu melatih empat `RandomForestClassifier(n_estimators=100,
+n_jobs=-1)` terpisah di fitur lag yang sama: konversi/validasi X, bootstrap dan
+start thread pool dibayar empat kali, dan 400 pohon dibangun. `DigitModel`
+membungkus dua mode pelatihan di balik antarmuka yang sama:
+
+    MODE_MULTI_OUTPUT  satu forest multi-output (y = n x 4), satu panggilan fit;
+                       setiap pohon memprediksi keempat digit sekaligus
+    MODE_PER_DIGIT     empat forest terpisah seperti sebelumnya (hasil identik)
+
+`predict_proba` selalu mengembalikan array (n, 4, 10) (kolom = digit 0-9), siap
+untuk `probabilitas_digit.top_k_numbers`. `add_trees` menambah pohon baru dengan
+`warm_start` yang dilatih di jendela periode terakhir (lihat `cache_model.load_or_fit`).
+
+Benchmark waktu, memori puncak dan akurasi per digit kedua mode:
+
+    python model_digit.py --periods 5000
+"""
+import argparse
+import pickle
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+DIGIT_COLS = ['As', 'Kop', 'Kepala', 'Ekor']
+MODE_MULTI_OUTPUT = 'multi_output'
+MODE_PER_DIGIT = 'per_digit'
+TRAINING_MODES = (MODE_MULTI_OUTPUT, MODE_PER_DIGIT)
+
+
+def _class_columns(proba, classes):
+    """Probabilitas per kelas -> kolom digit 0-9 (kelas di luar 0-9, mis. -1 untuk data kosong, dibuang)."""
+    out = np.zeros((len(proba), 10))
+    classes = np.asarray(classes)
+    valid = (classes >= 0) & (classes <= 9)
+    out[:, classes[valid].astype(int)] = proba[:, valid]
+    return out
+
+
+def _take(data, rows):
+    return data.iloc[rows] if hasattr(data, 'iloc') else data[rows]
+
+
+class DigitModel:
+    """
+    Model empat digit dengan satu fit (multi-output) atau empat fit (per digit).
+
+    Attributes:
+        mode (str): MODE_MULTI_OUTPUT atau MODE_PER_DIGIT.
+        forests (list): Satu forest (multi-output) atau satu per digit.
+    """
+
+    def __init__(self, mode=MODE_MULTI_OUTPUT, n_estimators=100, random_state=42, n_jobs=-1, digit_cols=DIGIT_COLS):
+        if mode not in TRAINING_MODES:
+            raise ValueError(f"Mode pelatihan tidak dikenal: {mode} (pilihan: {', '.join(TRAINING_MODES)})")
+        self.mode = mode
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.digit_cols = list(digit_cols)
+        self.forests = []
+
+    def _new_forest(self):
+        return RandomForestClassifier(n_estimators=self.n_estimators, random_state=self.random_state, n_jobs=self.n_jobs)
+
+    def _targets(self, Y):
+        return np.asarray(Y[self.digit_cols] if hasattr(Y, 'columns') else Y)
+
+    def _forest_classes(self):
+        """Kelas per posisi digit, sejajar dengan `digit_cols`."""
+        if self.mode == MODE_MULTI_OUTPUT:
+            return list(self.forests[0].classes_)
+        return [forest.classes_ for forest in self.forests]
+
+    def fit(self, X, Y):
+        """
+        Args:
+            X: Fitur (DataFrame atau array n x fitur).
+            Y: Target digit n x 4 (DataFrame dengan `digit_cols` atau array).
+        """
+        Y = self._targets(Y)
+        if self.mode == MODE_MULTI_OUTPUT:
+            self.forests = [self._new_forest().fit(X, Y)]
+        else:
+            self.forests = [self._new_forest().fit(X, Y[:, i]) for i in range(Y.shape[1])]
+        return self
+
+    def add_trees(self, X, Y, start, n_new, window=0):
+        """
+        Menambah `n_new` pohon per forest dengan `warm_start` tanpa melatih ulang pohon lama.
+
+        Pohon baru dilatih di jendela baris terakhir yang utuh (bukan baris pilihan):
+        max(`window`, irisan baru `start:`) baris, diperpanjang ke belakang sampai setiap
+        kelas yang dikenal pohon lama muncul, sehingga distribusi kelasnya tetap alami dan
+        himpunan kelas pohon baru sama dengan pohon lama.
+
+        Args:
+            X, Y: Seluruh fitur dan target, terurut per Periode.
+            start (int): Baris pertama irisan baru.
+            n_new (int): Jumlah pohon baru per forest.
+            window (int): Jumlah baris terakhir minimal untuk melatih pohon baru.
+
+        Returns:
+            bool: False (model tidak diubah) jika irisan berisi kelas yang belum dikenal
+            model; pemanggil perlu melatih ulang penuh.
+        """
+        Y = self._targets(Y)
+        first = max(min(start, len(Y) - window), 0)
+        for i, known in enumerate(self._forest_classes()):
+            known = set(known.tolist())
+            if not set(Y[start:, i].tolist()) <= known:
+                return False
+            earlier = [np.flatnonzero(Y[:first, i] == cls) for cls in known - set(Y[first:, i].tolist())]
+            if any(len(rows) == 0 for rows in earlier):
+                return False
+            first = min([first] + [int(rows[-1]) for rows in earlier])
+        rows = slice(first, len(Y))
+        X_new, Y_new = _take(X, rows), Y[rows]
+        targets = [Y_new] if self.mode == MODE_MULTI_OUTPUT else [Y_new[:, i] for i in range(Y_new.shape[1])]
+        for forest, y in zip(self.forests, targets):
+            forest.set_params(warm_start=True, n_estimators=forest.n_estimators + n_new)
+            forest.fit(X_new, y)
+            forest.set_params(warm_start=False)
+        self.n_estimators += n_new
+        return True
+
+    def predict_proba(self, X):
+        """Probabilitas (n, 4, 10): baris = sampel, lalu posisi digit, lalu digit 0-9."""
+        if self.mode == MODE_MULTI_OUTPUT:
+            forest = self.forests[0]
+            per_digit = zip(forest.predict_proba(X), forest.classes_)
+        else:
+            per_digit = ((forest.predict_proba(X), forest.classes_) for forest in self.forests)
+        return np.stack([_class_columns(proba, classes) for proba, classes in per_digit], axis=1)
+
+    def predict(self, X):
+        """Digit prediksi (n, 4)."""
+        if self.mode == MODE_MULTI_OUTPUT:
+            return np.asarray(self.forests[0].predict(X)).reshape(-1, len(self.digit_cols))
+        return np.column_stack([forest.predict(X) for forest in self.forests])
+
+    def digit_accuracy(self, X, Y):
+        """Akurasi per posisi digit: {kolom: akurasi}."""
+        Y = self._targets(Y)
+        predicted = self.predict(X)
+        return {col: float((predicted[:, i] == Y[:, i]).mean()) for i, col in enumerate(self.digit_cols)}
+
+
+# --- Benchmark ---
+
+def _sample_digits(periods, seed=0):
+    """Digit sintetis: 40% mengikuti dua periode sebelumnya, sisanya acak (agar akurasi bermakna)."""
+    rng = np.random.default_rng(seed)
+    digits = rng.integers(0, 10, (periods, 4))
+    follow = rng.random((periods, 4)) < 0.4
+    for t in range(2, periods):
+        rule = (digits[t - 1] + digits[t - 2, [1, 2, 3, 0]]) % 10
+        digits[t] = np.where(follow[t], rule, digits[t])
+    return digits
+
+
+def _lag_matrix(digits, num_lags):
+    """Fitur lag seperti pemodelan_data.py: kolom digit x lag 1..num_lags, baris tanpa lag lengkap dibuang."""
+    rows = len(digits) - num_lags
+    lags = [digits[num_lags - i:num_lags - i + rows, col] for col in range(digits.shape[1]) for i in range(1, num_lags + 1)]
+    return np.column_stack(lags), digits[num_lags:]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(mode, X_train, Y_train, X_test, Y_test, n_estimators):
+    """Dijalankan di proses baru per mode agar puncak RSS tidak tercampur."""
+    rss_before = _peak_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = DigitModel(mode, n_estimators=n_estimators).fit(X_train, Y_train)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _peak_rss_mb()
+    if rss_before is not None:
+        # Kenaikan puncak RSS proses (termasuk node pohon yang dialokasikan di luar tracemalloc)
+        peak = max(peak, (rss_after - rss_before) * 1e6)
+    start = time.perf_counter()
+    model.predict_proba(X_test[-1:])
+    predict_s = time.perf_counter() - start
+    return {
+        'seconds': seconds, 'peak_mb': peak / 1e6, 'model_mb': len(pickle.dumps(model)) / 1e6,
+        'predict_ms': predict_s * 1e3, 'accuracy': model.digit_accuracy(X_test, Y_test),
+    }
+
+
+def run_benchmark(periods, num_lags=3, n_estimators=100):
+    X, Y = _lag_matrix(_sample_digits(periods), num_lags)
+    split = int(len(X) * 0.8)
+    print(f"{len(X)} baris fitur lag ({X.shape[1]} fitur), latih {split} / uji {len(X) - split}, {n_estimators} pohon")
+    print(f"  {'mode':<13} {'fit':>8} {'puncak':>9} {'model':>9} {'predict':>9}   akurasi " + " ".join(f"{c:>6}" for c in DIGIT_COLS))
+    results = {}
+    for mode in (MODE_PER_DIGIT, MODE_MULTI_OUTPUT):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            r = results[mode] = pool.submit(_measure, mode, X[:split], Y[:split], X[split:], Y[split:], n_estimators).result()
+        print(f"  {mode:<13} {r['seconds']:>7.2f}s {r['peak_mb']:>7.1f}MB {r['model_mb']:>7.1f}MB {r['predict_ms']:>7.1f}ms"
+              f"           " + " ".join(f"{r['accuracy'][c]:>6.3f}" for c in DIGIT_COLS))
+    old, new = results[MODE_PER_DIGIT], results[MODE_MULTI_OUTPUT]
+    print(f"  multi-output: fit {old['seconds'] / new['seconds']:.1f}x lebih cepat, memori puncak "
+          f"{new['peak_mb'] / old['peak_mb']:.2f}x, ukuran model {new['model_mb'] / old['model_mb']:.2f}x")
+    print("  (memori puncak = kenaikan puncak RSS proses selama fit, tracemalloc jika tidak tersedia; ukuran model = pickle)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model digit multi-output vs empat forest terpisah.")
+    parser.add_argument("--periods", type=int, default=5000)
+    parser.add_argument("--lags", type=int, default=3)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.periods, args.lags, args.trees)
@@ -0,0 +1,251 @@
+"""
+Pemuatan histori secara streaming (per chunk) dengan memori puncak terbatas.
+
+`pd.read_sql` mengambil seluruh hasil query sebagai tuple Python (`fetchall`),
+membangun DataFrame dari situ, lalu skrip membuat kolom string kedua
+(`astype(str).str.zfill(4)`). Untuk histori bertahun-tahun (1440 periode per
+hari) memori puncaknya beberapa kali ukuran data. Di sini hasil query dibaca
+dengan `cursor.fetchmany(chunk_rows)`, dan setiap chunk langsung:
+
+- ditulis ke array integer yang tumbuh (`GrowableArray`, kapasitas digandakan;
+  bisa dialokasikan di depan jika jumlah baris sudah diketahui), lewat
+  `stream_columns`, atau
+- ditambahkan ke arsip histori di disk (`arsip_histori.HistoryStore`) lewat
+  `stream_to_store`,
+
+sehingga objek Python yang hidup bersamaan paling banyak satu chunk, berapa pun
+panjang historinya. `StreamStats` mencatat throughput (baris/s dan MB/s, MB =
+byte array hasil decode).
+
+Benchmark memori puncak (tracemalloc) dan throughput dengan SQLite:
+
+    python muat_bertahap.py --periods 2000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from arsip_histori import HistoryStore
+
+CHUNK_ROWS = 50_000
+
+
+class GrowableArray:
+    """
+    Array 1-D yang bisa ditambah di akhir; kapasitas digandakan saat penuh
+    (amortized O(1) per elemen, tanpa list Python perantara).
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        self._data = np.empty(max(int(capacity), 1), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def values(self):
+        """Bagian yang sudah terisi (view)."""
+        return self._data[:self._size]
+
+    def extend(self, values):
+        values = np.asarray(values)
+        end = self._size + len(values)
+        if end > len(self._data):
+            capacity = len(self._data)
+            while capacity < end:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = values
+        self._size = end
+
+    def finish(self):
+        """Array final sepanjang isi; kapasitas sisa dilepas (di tempat jika memungkinkan)."""
+        try:
+            # refcheck default: gagal (ValueError) jika masih ada view dari `values`, lalu disalin
+            self._data.resize(self._size)
+        except ValueError:
+            self._data = self._data[:self._size].copy()
+        return self._data
+
+
+class StreamStats:
+    """Statistik satu pemuatan streaming."""
+
+    def __init__(self):
+        self.rows = 0
+        self.nbytes = 0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_s(self):
+        return self.nbytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} baris / {self.chunks} chunk, {self.nbytes / 1e6:.1f} MB dalam {self.seconds:.2f} s "
+                f"({self.rows_per_s:,.0f} baris/s, {self.mb_per_s:.1f} MB/s)")
+
+
+def fetch_chunks(cnxn, query, params=(), chunk_rows=CHUNK_ROWS):
+    """
+    Generator (nama kolom, list baris) per `chunk_rows` baris dari `cursor.fetchmany`.
+    Cursor ditutup saat generator selesai atau dibuang.
+    """
+    cursor = cnxn.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        columns = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        cursor.close()
+
+
+def to_int_column(values, dtype):
+    """Satu kolom chunk sebagai array `dtype`; nilai teks ('0123') di-parse sebagai angka."""
+    if values.dtype.kind in 'OUS' or isinstance(values.dtype, pd.StringDtype):
+        values = pd.to_numeric(values)
+    return values.to_numpy(dtype=dtype)
+
+
+def stream_columns(cnxn, query, params=(), dtypes=None, chunk_rows=CHUNK_ROWS, expected_rows=None):
+    """
+    Menjalankan `query` dan menulis setiap chunk langsung ke array integer per kolom.
+
+    Args:
+        dtypes (dict): dtype per nama kolom, mis. {'Periode': np.int64, 'LogResult': np.int16}.
+            Kolom yang tidak disebut memakai int64.
+        expected_rows (int): Jika diketahui (mis. dari COUNT(*) atau manifest cache),
+            array dialokasikan sekali di depan tanpa penggandaan.
+
+    Returns:
+        (dict, StreamStats): Array final per kolom (urutan kolom SELECT) dan statistiknya.
+    """
+    dtypes = dtypes or {}
+    stats = StreamStats()
+    start = time.perf_counter()
+    arrays = None
+    for columns, rows in fetch_chunks(cnxn, query, params, chunk_rows):
+        if arrays is None:
+            arrays = {c: GrowableArray(dtypes.get(c, np.int64), expected_rows or chunk_rows) for c in columns}
+        # from_records memakai jalur C pandas (sama dengan read_sql), hanya untuk satu chunk
+        chunk = pd.DataFrame.from_records(rows, columns=columns)
+        for column in columns:
+            arrays[column].extend(to_int_column(chunk[column], arrays[column].dtype))
+        del chunk
+        stats.rows += len(rows)
+        stats.chunks += 1
+    result = {c: a.finish() for c, a in (arrays or {}).items()}
+    stats.nbytes = sum(a.nbytes for a in result.values())
+    stats.seconds = time.perf_counter() - start
+    return result, stats
+
+
+def stream_to_store(cnxn, query, params, store, chunk_rows=CHUNK_ROWS, reset_info=None):
+    """
+    Menjalankan `query` dan menambahkan setiap chunk langsung ke arsip histori di disk.
+
+    Args:
+        store (HistoryStore): Arsip tujuan.
+        reset_info (dict): Jika diberikan, arsip ditulis ulang dari nol (chunk pertama
+            lewat `store.reset(chunk, **reset_info)`); jika None, semua chunk di-append.
+
+    Returns:
+        StreamStats
+
+    Raises:
+        ValueError/TypeError dari `HistoryStore` jika chunk tidak bisa disimpan biner;
+        chunk sebelumnya tetap tersimpan (prefix histori yang sah).
+    """
+    stats = StreamStats()
+    start = time.perf_counter()
+    for columns, rows in fetch_chunks(cnxn, query, params, chunk_rows):
+        chunk = pd.DataFrame.from_records(rows, columns=columns)
+        if reset_info is not None and stats.chunks == 0:
+            store.reset(chunk, **reset_info)
+        else:
+            store.append(chunk)
+        stats.rows += len(rows)
+        stats.chunks += 1
+    stats.nbytes = sum(np.dtype(spec['dtype']).itemsize for spec in store.manifest['columns'].values()) * stats.rows if store.exists else 0
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+# --- Benchmark dengan SQLite ---
+
+def _legacy_load(cnxn, query, params):
+    """Pola lama: read_sql penuh + kolom string kedua."""
+    df = pd.read_sql(query, cnxn, params=list(params))
+    df['LogResult_Str'] = df['LogResult'].astype(str).str.zfill(4)
+    return df
+
+
+def _measure(fn):
+    """(hasil, detik, memori puncak); waktu diukur tanpa tracemalloc karena tracing memperlambat."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_benchmark(num_periods, chunk_rows):
+    from akses_data import fill_sqlite_sample  # impor lokal: akses_data -> cache_histori -> modul ini
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "standin.sqlite")
+        fill_sqlite_sample(path, 1, num_periods)
+        cnxn = sqlite3.connect(path)
+        query = "SELECT Periode, LogResult FROM [LogGame] WHERE GameCode = ? ORDER BY Periode ASC"
+        params = ('G000',)
+
+        legacy, legacy_s, legacy_peak = _measure(lambda: _legacy_load(cnxn, query, params))
+        (arrays, stats), _, stream_peak = _measure(lambda: stream_columns(
+            cnxn, query, params, {'Periode': np.int64, 'LogResult': np.int16}, chunk_rows))
+        store = HistoryStore(os.path.join(tmp, "arsip"))
+        store_stats, _, store_peak = _measure(lambda: stream_to_store(
+            cnxn, query, params, store, chunk_rows, reset_info={'table': 'LogGame', 'game_code': 'G000'}))
+        cnxn.close()
+
+        assert np.array_equal(arrays['Periode'], legacy['Periode'].to_numpy())
+        assert np.array_equal(arrays['LogResult'], legacy['LogResult'].to_numpy())
+        assert np.array_equal(store.results, legacy['LogResult'].to_numpy())
+        del legacy
+
+    print(f"{num_periods} periode, chunk {chunk_rows} baris (SQLite; waktu tanpa tracing, memori puncak via tracemalloc)")
+    print(f"  read_sql + kolom string   : {legacy_s:.2f} s, puncak {legacy_peak / 1e6:.1f} MB "
+          f"({num_periods / legacy_s:,.0f} baris/s)")
+    print(f"  fetchmany -> array int    : puncak {stream_peak / 1e6:.1f} MB, {stats}")
+    print(f"  fetchmany -> arsip di disk: puncak {store_peak / 1e6:.1f} MB, {store_stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pemuatan histori streaming vs read_sql (SQLite).")
+    parser.add_argument("--periods", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    run_benchmark(args.periods, args.chunk_rows)
@@ -1,8 +1,10 @@
-import pyodbc
-import pandas as pd
 import numpy as np
 import itertools
-from collections import Counter
+from akses_data import DatabaseError, get_database
+from histori_digit import DIGIT_COLUMNS, DigitHistory, increase_decrease_diffs, most_common_jumps
+from indeks_pola import NOMOR_STR, SEARCH_TYPES, PatternIndex, near_log_window_positions, pattern_key
+from ekspansi_kandidat import expand_single_digit
+from himpunan_kandidat import CandidateSet
 
 # --- Konfigurasi Koneksi SQL Server Anda ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
@@ -18,112 +20,71 @@ CONNECTION_STRING = (
 
 # --- Variabel Global untuk Jumlah Hasil Prediksi ---
 NUM_RESULTS_TO_OUTPUT = 8800 # <-- Anda bisa mengubah nilai ini!
+REFRESH_HISTORY_CACHE = False # True = abaikan cache histori lokal dan ambil ulang seluruh histori
 
 # --- Fungsi untuk Mengambil Data ---
-def get_log_game_data(server, database, table, conn_str):
+def get_log_game_data(server, database, table, conn_str, refresh_cache=False):
     try:
         print(f"Mencoba mengambil data dari tabel '{table}'...")
-        cnxn = pyodbc.connect(conn_str)
-        query = f"SELECT Periode, LogResult, [As], Kop, Kepala, Ekor FROM {table} WHERE GameCode='PS' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
+        # Koneksi dari pool bersama; histori lewat cache lokal (hanya Periode baru yang diambil dari server)
+        df = get_database(conn_str).history(table, 'PS', ["Periode", "LogResult", "As", "Kop", "Kepala", "Ekor"], force_refresh=refresh_cache)
         print("Data berhasil diambil!")
         return df
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         sqlstate = ex.args[0]
         print(f"Terjadi kesalahan saat mengambil data:")
         print(f"SQLSTATE: {sqlstate}")
         print(f"Pesan Error: {ex.args[1]}")
         return None
-    finally:
-        if 'cnxn' in locals() and cnxn:
-            cnxn.close()
 
 # --- Fungsi untuk Mendapatkan NearLog ---
-def get_near_logs(df, current_log_result_str, search_type, num_digits, window_size=1):
-    df_temp = df.copy()
-    df_temp['LogResult_Str_Full'] = df_temp['LogResult'].astype(str).str.zfill(4)
-    
-    search_pattern = ""
-    if search_type == 'depan':
-        search_pattern = current_log_result_str[:num_digits]
-        matching_rows = df_temp[df_temp['LogResult_Str_Full'].str.startswith(search_pattern)]
-    elif search_type == 'tengah':
-        if num_digits == 2:
-            search_pattern = current_log_result_str[1:3]
-            matching_rows = df_temp[df_temp['LogResult_Str_Full'].str[1:3] == search_pattern]
-        elif num_digits == 3:
-            search_pattern = current_log_result_str[1:4] 
-            matching_rows = df_temp[df_temp['LogResult_Str_Full'].str[1:4] == search_pattern]
-    elif search_type == 'belakang':
-        search_pattern = current_log_result_str[4-num_digits:]
-        matching_rows = df_temp[df_temp['LogResult_Str_Full'].str.endswith(search_pattern)]
-    else:
+def get_near_logs(history, current_log_result, search_type, num_digits, window_size=1, pattern_index=None):
+    # `history`: DigitHistory; `pattern_index` (opsional): PatternIndex yang dibangun dari `history.results`.
+    # LogResult di hasil berupa integer (string 4 digit dibuat lewat NOMOR_STR saat output).
+    if search_type not in SEARCH_TYPES:
         return []
+    # Pola dihitung dengan aritmatika integer (depan-2 = x // 100, belakang-2 = x % 100, ...)
+    search_pattern = pattern_key(current_log_result, search_type, num_digits)
 
     near_logs_list = []
-    df_sorted = df_temp.sort_values(by='Periode', ascending=True).reset_index(drop=True)
-
-    for idx_original_df in matching_rows.index:
-        idx_in_sorted_df_match = df_sorted[df_sorted['Periode'] == df_temp.loc[idx_original_df, 'Periode']]
-        if idx_in_sorted_df_match.empty:
-            continue
-        idx_in_sorted_df = idx_in_sorted_df_match.index[0]
-        
-        start_idx = max(0, idx_in_sorted_df - window_size)
-        end_idx = min(len(df_sorted) - 1, idx_in_sorted_df + window_size)
-        
-        near_log_data = [{'Periode': df_sorted.loc[i, 'Periode'], 'LogResult': df_sorted.loc[i, 'LogResult_Str_Full']} for i in range(start_idx, end_idx + 1)]
-        
+    if pattern_index is None:
+        pattern_index = PatternIndex.from_results(history.results)
+
+    # Posisi cocok dari indeks pola; jendela NearLog (Periode & LogResult) diambil dengan
+    # satu broadcast + fancy-index, tanpa pencarian Periode per match.
+    matches = pattern_index.lookup(search_type, num_digits, search_pattern, limit=len(history))
+    window_idx, valid = near_log_window_positions(matches, window_size, len(history))
+    safe_idx = np.clip(window_idx, 0, len(history) - 1)
+    periode_win = history.periodes[safe_idx].tolist()
+    log_win = history.results[safe_idx].tolist()
+    for j, valid_row in enumerate(valid.tolist()):
+        near_log_data = [{'Periode': periode_win[j][k], 'LogResult': log_win[j][k]} for k, ok in enumerate(valid_row) if ok]
         near_logs_list.append({
-            'Periode': df_sorted.loc[idx_in_sorted_df, 'Periode'],
-            'LogResult': df_sorted.loc[idx_in_sorted_df, 'LogResult_Str_Full'],
+            'Periode': periode_win[j][window_size],
+            'LogResult': log_win[j][window_size],
             'NearLog': near_log_data
         })
     
     return near_logs_list
 
 # --- Fungsi Analisis (Lompatan, Tren, Digit, dll.) ---
-def analyze_increase_decrease(df, last_log_result_str, window_size=5):
-    df_temp = df.copy()
-    df_temp['LogResult_Numeric'] = pd.to_numeric(df_temp['LogResult'].astype(str).str.zfill(4), errors='coerce').dropna()
-    df_temp.sort_values(by='Periode', ascending=True, inplace=True)
-    df_temp.reset_index(drop=True, inplace=True)
+def analyze_increase_decrease(history, last_log_result, window_size=5):
+    # Nomor kandidat (int) unik sesuai urutan kemunculan pertama
     candidates = []
-    last_num_val = int(last_log_result_str)
-    if len(df_temp) > 1:
-        df_temp['Diff'] = df_temp['LogResult_Numeric'].diff()
-        for diff in df_temp['Diff'].dropna().unique():
-            candidates.append(str(int(last_num_val + diff)).zfill(4))
-    valid_candidates = [c for c in candidates if len(c) == 4 and c.isdigit()]
-    return list(set(valid_candidates))
+    if len(history) > 1:
+        candidates = [last_log_result + diff for diff in increase_decrease_diffs(history.results).tolist()]
+    return list(dict.fromkeys(c for c in candidates if 0 <= c <= 9999))
 
-def analyze_jump_values(df, last_log_result_str, num_jumps_to_consider=3):
-    df_temp = df.copy()
-    df_temp['LogResult_Numeric'] = pd.to_numeric(df_temp['LogResult'].astype(str).str.zfill(4), errors='coerce').dropna()
-    df_temp.sort_values(by='Periode', ascending=True, inplace=True)
-    df_temp.reset_index(drop=True, inplace=True)
-    candidates = []
-    last_num_val = int(last_log_result_str)
-    if not df_temp.empty:
-        jump_diffs = []
-        for i in range(len(df_temp)):
-            for j in range(1, num_jumps_to_consider + 1):
-                if i - j >= 0:
-                    diff = df_temp.loc[i, 'LogResult_Numeric'] - df_temp.loc[i - j, 'LogResult_Numeric']
-                    if diff != 0: jump_diffs.append(diff)
-        if jump_diffs:
-            for jump, _ in Counter(jump_diffs).most_common(10):
-                candidates.append(str(int(last_num_val + jump)).zfill(4))
-    valid_candidates = [c for c in candidates if len(c) == 4 and c.isdigit()]
-    return list(set(valid_candidates))
+def analyze_jump_values(history, last_log_result, num_jumps_to_consider=3):
+    candidates = [last_log_result + jump for jump, _ in most_common_jumps(history.results, num_jumps_to_consider, top=10)]
+    return list(dict.fromkeys(c for c in candidates if 0 <= c <= 9999))
 
-def analyze_most_frequent_digits(df):
-    digit_cols = ['As', 'Kop', 'Kepala', 'Ekor']
+def analyze_most_frequent_digits(history):
     candidates = set()
-    for col in digit_cols:
-        df_col_cleaned = pd.to_numeric(df[col], errors='coerce').dropna().astype(int)
-        if not df_col_cleaned.empty:
-            for mode_digit in df_col_cleaned.mode():
+    for col in DIGIT_COLUMNS:
+        counts = np.bincount(history.digit(col), minlength=10)
+        if counts.any():
+            for mode_digit in np.flatnonzero(counts == counts.max()):
                 # Ini adalah pendekatan sederhana, bisa dikembangkan lebih lanjut
                 # Untuk saat ini, kita tidak membuat kombinasi dari mode digit
                 pass
@@ -133,126 +94,89 @@ def analyze_most_frequent_digits(df):
 ### BARU: Fungsi untuk ekspansi kandidat secara iteratif ###
 def expand_candidates_iteratively(base_candidates, target_count):
     """
-    Mengembangbiakkan kandidat hingga mencapai jumlah target dengan memodifikasi digit
-    secara iteratif berdasarkan level.
+    Mengembangbiakkan kandidat (CandidateSet) hingga mencapai jumlah target dengan
+    memodifikasi digit secara iteratif berdasarkan level.
     """
-    if not base_candidates:
+    if not len(base_candidates):
         print("  Tidak ada kandidat dasar untuk diekspansi.")
-        return []
+        return base_candidates.copy()
 
-    final_set = set(base_candidates)
-    
-    # Gunakan list dari kandidat dasar asli untuk setiap level ekspansi
+    # Gunakan kandidat dasar asli untuk setiap level ekspansi
     # agar tidak terjadi ledakan kombinasi dari angka yang baru dibuat.
-    source_candidates = list(base_candidates)
-    
-    level = 1
-    while len(final_set) < target_count:
-        print(f"  Jumlah kandidat ({len(final_set)}) belum cukup. Memulai ekspansi level {level}...")
-        
-        newly_generated_in_level = set()
-        
-        # Buat kombinasi modifikasi untuk level saat ini
-        # Level 1: (+1,-1)
-        # Level 2: (+1,-1), (+1,-2), (+2,-1), (+2,-2)
-        # Level 3: dst...
-        mod_combinations = []
-        for i in range(1, level + 1):
-            for j in range(1, level + 1):
-                mod_combinations.append((i, j))
-        
-        mod_combinations = list(set(mod_combinations)) # Hapus duplikat
+    # Level 1: (+1,-1), Level 2: (+2,-2), dst. pada satu digit; level dan sumber
+    # untuk seluruh 10.000 nomor dihitung sekaligus oleh `expand_single_digit`.
+    final_candidates = base_candidates.copy()
 
-        for number_str in source_candidates:
-            num_list = [int(d) for d in number_str]
-            for digit_idx in range(4): # 0=As, 1=Kop, 2=Kepala, 3=Ekor
-                original_digit = num_list[digit_idx]
-                
-                for mod_up, mod_down in mod_combinations:
-                    # Coba Naik
-                    new_digit_up = original_digit + mod_up
-                    if 0 <= new_digit_up <= 9:
-                        temp_list = list(num_list)
-                        temp_list[digit_idx] = new_digit_up
-                        newly_generated_in_level.add("".join(map(str, temp_list)))
+    new_values, new_levels, _ = expand_single_digit(base_candidates.values, target_count, truncate='level')
+    for level in np.unique(new_levels).tolist():
+        print(f"  Jumlah kandidat ({len(final_candidates)}) belum cukup. Memulai ekspansi level {level}...")
+        final_candidates.add_many(new_values[new_levels == level], f"ekspansi level {level}")
 
-                    # Coba Turun
-                    new_digit_down = original_digit - mod_down
-                    if 0 <= new_digit_down <= 9:
-                        temp_list = list(num_list)
-                        temp_list[digit_idx] = new_digit_down
-                        newly_generated_in_level.add("".join(map(str, temp_list)))
+    if len(final_candidates) < target_count:
+        print("  Ekspansi level ini tidak menghasilkan kandidat baru yang unik. Menghentikan proses.")
 
-        previous_count = len(final_set)
-        final_set.update(newly_generated_in_level)
-        
-        if len(final_set) == previous_count:
-            print("  Ekspansi level ini tidak menghasilkan kandidat baru yang unik. Menghentikan proses.")
-            break
-            
-        level += 1
-
-    return list(final_set)
+    return final_candidates
 
 
 # --- Main Program ---
 if __name__ == "__main__":
-    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING)
+    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, refresh_cache=REFRESH_HISTORY_CACHE)
 
     if df_log is not None and not df_log.empty:
-        df_log['LogResult_Str'] = df_log['LogResult'].astype(str).str.zfill(4)
-        last_log_result_data = df_log.sort_values(by='Periode', ascending=False).iloc[0]
-        last_log_result_str = last_log_result_data['LogResult_Str']
-        last_periode = last_log_result_data['Periode']
-        print(f"\nLogResult terakhir (Periode {last_periode}): {last_log_result_str}")
+        # LogResult di-parse sekali menjadi integer + digit; string hanya dibuat saat output
+        history = DigitHistory.from_frame(df_log)
+        last_log_result = history.last_result
+        last_periode = history.last_periode
+        print(f"\nLogResult terakhir (Periode {last_periode}): {NOMOR_STR[last_log_result]}")
         
-        df_search_historical = df_log[df_log['Periode'] < last_periode].copy()
+        history_search = history.before(last_periode)
+
+        # Inisialisasi himpunan kandidat (10.000 nomor) untuk semua nomor unik dari berbagai metode
+        all_predicted_numbers = CandidateSet()
 
-        # Inisialisasi set untuk menyimpan semua nomor unik dari berbagai metode
-        all_predicted_numbers = set()
+        # Indeks pola dibangun sekali (histori terurut per Periode) dan dipakai semua analisa NearLog
+        pattern_index = PatternIndex.from_results(history_search.results)
 
         # --- Tahap 1: Pengumpulan Kandidat Awal ---
         print("\n--- Tahap 1: Mengumpulkan Kandidat Awal dari Analisis Historis ---")
 
         # Analisis NearLog
-        near_logs_2d = get_near_logs(df_search_historical, last_log_result_str, 'depan', 2) + \
-                       get_near_logs(df_search_historical, last_log_result_str, 'tengah', 2) + \
-                       get_near_logs(df_search_historical, last_log_result_str, 'belakang', 2)
+        near_logs_2d = get_near_logs(history_search, last_log_result, 'depan', 2, pattern_index=pattern_index) + \
+                       get_near_logs(history_search, last_log_result, 'tengah', 2, pattern_index=pattern_index) + \
+                       get_near_logs(history_search, last_log_result, 'belakang', 2, pattern_index=pattern_index)
         if near_logs_2d:
             for entry in near_logs_2d:
-                for log in entry['NearLog']:
-                    all_predicted_numbers.add(log['LogResult'])
+                all_predicted_numbers.add_many([log['LogResult'] for log in entry['NearLog']], "analisa NearLog 2 Digit")
 
-        near_logs_3d = get_near_logs(df_search_historical, last_log_result_str, 'depan', 3) + \
-                       get_near_logs(df_search_historical, last_log_result_str, 'tengah', 3) + \
-                       get_near_logs(df_search_historical, last_log_result_str, 'belakang', 3)
+        near_logs_3d = get_near_logs(history_search, last_log_result, 'depan', 3, pattern_index=pattern_index) + \
+                       get_near_logs(history_search, last_log_result, 'tengah', 3, pattern_index=pattern_index) + \
+                       get_near_logs(history_search, last_log_result, 'belakang', 3, pattern_index=pattern_index)
         if near_logs_3d:
             for entry in near_logs_3d:
-                for log in entry['NearLog']:
-                    all_predicted_numbers.add(log['LogResult'])
+                all_predicted_numbers.add_many([log['LogResult'] for log in entry['NearLog']], "analisa NearLog 3 Digit")
         print(f"Kandidat setelah Analisis NearLog: {len(all_predicted_numbers)}")
 
         # Analisis Pola Lompatan
-        all_predicted_numbers.update(analyze_increase_decrease(df_search_historical, last_log_result_str))
+        all_predicted_numbers.add_many(analyze_increase_decrease(history_search, last_log_result), "Analisis Kenaikan/Penurunan")
         print(f"Kandidat setelah Analisis Kenaikan/Penurunan: {len(all_predicted_numbers)}")
         
-        all_predicted_numbers.update(analyze_jump_values(df_search_historical, last_log_result_str))
+        all_predicted_numbers.add_many(analyze_jump_values(history_search, last_log_result), "Analisis Lompatan Nilai")
         print(f"Kandidat setelah Analisis Lompatan Nilai: {len(all_predicted_numbers)}")
 
         # --- Tahap 2: Ekspansi Kandidat Secara Iteratif ---
         print(f"\n--- Tahap 2: Memeriksa dan Mengekspansi Kandidat ---")
         
-        final_list_for_output = list(all_predicted_numbers)
+        final_candidates = all_predicted_numbers
         
-        if len(final_list_for_output) < NUM_RESULTS_TO_OUTPUT:
-            print(f"Jumlah kandidat awal ({len(final_list_for_output)}) kurang dari target ({NUM_RESULTS_TO_OUTPUT}).")
-            final_list_for_output = expand_candidates_iteratively(
-                base_candidates=final_list_for_output,
+        if len(final_candidates) < NUM_RESULTS_TO_OUTPUT:
+            print(f"Jumlah kandidat awal ({len(final_candidates)}) kurang dari target ({NUM_RESULTS_TO_OUTPUT}).")
+            final_candidates = expand_candidates_iteratively(
+                base_candidates=final_candidates,
                 target_count=NUM_RESULTS_TO_OUTPUT
             )
         
-        # Pastikan jumlah akhir sesuai target dengan memotong jika berlebih
-        final_list_for_output = final_list_for_output[:NUM_RESULTS_TO_OUTPUT]
+        # Pastikan jumlah akhir sesuai target dengan memotong jika berlebih (string hanya di batas output)
+        final_list_for_output = final_candidates.keys()[:NUM_RESULTS_TO_OUTPUT]
 
         # --- Tahap 3: Menampilkan Hasil Akhir ---
         print(f"\n--- Hasil Akhir ---")
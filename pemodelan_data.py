@@ -1,15 +1,18 @@
-import pyodbc
 import pandas as pd
 import numpy as np
-import itertools
 from collections import Counter
-from sklearn.ensemble import RandomForestClassifier # Import kembali untuk pendekatan kedua
-from sklearn.metrics import accuracy_score, classification_report # Untuk evaluasi RF
+from akses_data import DatabaseError, get_database
+from indeks_pola import NOMOR_STR, PatternIndex, near_log_window_positions
+from probabilitas_digit import top_k_candidates
+from model_digit import MODE_MULTI_OUTPUT, MODE_PER_DIGIT, DigitModel
+from cache_model import STATUS_LOADED, STATUS_TRAINED, ModelStore, load_or_fit
+from fitur_lag import LagFeatureStore
 
 # --- Konfigurasi Koneksi SQL Server Anda ---
 SERVER_NAME = 'MS-DL7390-DSFB7\SQLEXPRESS'
 DATABASE_NAME = 'GamesMatrix'
 TABLE_NAME = 'LogGame'
+GAME_CODE = 'MQ20'
 
 CONNECTION_STRING = (
     f"DRIVER={{ODBC Driver 17 for SQL Server}};"
@@ -20,72 +23,66 @@ CONNECTION_STRING = (
 
 # --- Variabel Global untuk Jumlah Hasil Prediksi ---
 NUM_RESULTS_TO_OUTPUT = 7000 # <-- Anda bisa mengubah nilai ini!
+REFRESH_HISTORY_CACHE = False # True = abaikan cache histori lokal dan ambil ulang seluruh histori
+# MODE_PER_DIGIT = empat Random Forest terpisah (As, Kop, Kepala, Ekor);
+# MODE_MULTI_OUTPUT = satu forest multi-output, satu kali fit (~3x lebih cepat, lihat `python model_digit.py`)
+RF_TRAINING_MODE = MODE_PER_DIGIT
+# Model RF disimpan per GameCode di cache_model/ dan hanya ditambah pohon baru untuk periode baru;
+# True = abaikan model tersimpan dan latih ulang penuh
+FORCE_FULL_RETRAIN = False
 
 # --- Fungsi untuk Mengambil Data ---
-def get_log_game_data(server, database, table, conn_str):
+def get_log_game_data(server, database, table, conn_str, refresh_cache=False):
     try:
         print(f"Mencoba mengambil data dari tabel '{table}'...")
-        cnxn = pyodbc.connect(conn_str)
         # Ambil semua kolom yang relevan, LogResult sebagai string (nvarchar)
-        query = f"SELECT Periode, LogResult, [As], Kop, Kepala, Ekor FROM {table} WHERE GameCode='MQ20' ORDER BY Periode ASC"
-        df = pd.read_sql(query, cnxn)
+        # Koneksi dari pool bersama; histori lewat cache lokal (hanya Periode baru yang diambil dari server)
+        df = get_database(conn_str).history(table, GAME_CODE, ["Periode", "LogResult", "As", "Kop", "Kepala", "Ekor"], force_refresh=refresh_cache)
         print("Data berhasil diambil!")
         return df
-    except pyodbc.Error as ex:
+    except DatabaseError as ex:
         sqlstate = ex.args[0]
         print(f"Terjadi kesalahan saat mengambil data:")
         print(f"SQLSTATE: {sqlstate}")
         print(f"Pesan Error: {ex.args[1]}")
         return None
-    finally:
-        if 'cnxn' in locals() and cnxn:
-            cnxn.close()
 
 # --- Fungsi untuk Mendapatkan NearLog ---
-def get_near_logs(df, current_log_result_str, search_type, window_size=1):
+def get_near_logs(df, current_log_result_str, search_type, window_size=1, pattern_index=None):
     """
     Mencari LogResult yang cocok dengan pola 2 digit tertentu dan mengambil near logs.
     search_type: 'depan', 'tengah', 'belakang'
     window_size: berapa periode sebelum/sesudah yang diambil. Default 1 (sebelum, current, sesudah).
+    pattern_index: PatternIndex (opsional) yang dibangun dari `df` terurut per Periode.
     """
-    df_temp = df.copy() # Hindari SettingWithCopyWarning
-    df_temp['LogResult_Str_Full'] = df_temp['LogResult'].astype(str).str.zfill(4) # Kolom sementara
-    
     search_pattern = ""
     if search_type == 'depan':
         search_pattern = current_log_result_str[:2]
-        matching_rows = df_temp[df_temp['LogResult_Str_Full'].str.startswith(search_pattern)]
     elif search_type == 'tengah':
         search_pattern = current_log_result_str[1:3]
-        matching_rows = df_temp[df_temp['LogResult_Str_Full'].str[1:3] == search_pattern]
     elif search_type == 'belakang':
         search_pattern = current_log_result_str[2:4]
-        matching_rows = df_temp[df_temp['LogResult_Str_Full'].str.endswith(search_pattern)]
     else:
         raise ValueError("search_type harus 'depan', 'tengah', atau 'belakang'")
 
     near_logs_list = []
     
-    df_sorted = df_temp.sort_values(by='Periode', ascending=True).reset_index(drop=True)
-
-    for idx in matching_rows.index:
-        original_idx_in_df_sorted = df_sorted[df_sorted['Periode'] == df_temp.loc[idx, 'Periode']].index[0]
-
-        start_idx = max(0, original_idx_in_df_sorted - window_size)
-        end_idx = min(len(df_sorted) - 1, original_idx_in_df_sorted + window_size)
-        
-        near_log_data = []
-        for i in range(start_idx, end_idx + 1):
-            # Pastikan tidak melampaui batas DataFrame
-            if i >= 0 and i < len(df_sorted):
-                near_log_data.append({
-                    'Periode': df_sorted.loc[i, 'Periode'],
-                    'LogResult': df_sorted.loc[i, 'LogResult_Str_Full']
-                })
-        
+    df_sorted = df.sort_values(by='Periode', ascending=True).reset_index(drop=True)
+    if pattern_index is None:
+        pattern_index = PatternIndex.from_results(df_sorted['LogResult'])
+
+    # Posisi cocok dari indeks pola; jendela NearLog (Periode & LogResult) diambil dengan
+    # satu broadcast + fancy-index. Posisi di luar batas DataFrame dibuang lewat mask `valid`.
+    matches = pattern_index.lookup(search_type, 2, search_pattern, limit=len(df_sorted))
+    window_idx, valid = near_log_window_positions(matches, window_size, len(df_sorted))
+    safe_idx = np.clip(window_idx, 0, len(df_sorted) - 1)
+    periode_win = df_sorted['Periode'].to_numpy()[safe_idx].tolist()
+    log_win = pattern_index.results[safe_idx].tolist()
+    for j, valid_row in enumerate(valid.tolist()):
+        near_log_data = [{'Periode': periode_win[j][k], 'LogResult': NOMOR_STR[log_win[j][k]]} for k, ok in enumerate(valid_row) if ok]
         near_logs_list.append({
-            'Periode': df_sorted.loc[original_idx_in_df_sorted, 'Periode'],
-            'LogResult': df_sorted.loc[original_idx_in_df_sorted, 'LogResult_Str_Full'],
+            'Periode': periode_win[j][window_size],
+            'LogResult': NOMOR_STR[log_win[j][window_size]],
             'NearLog': near_log_data
         })
     
@@ -118,31 +115,10 @@ def generate_candidates_from_near_logs(near_logs_data, include_modified=True):
                         
     return candidates
 
-# --- Fungsi untuk Menggenerasi Kandidat dari Probabilitas RF ---
-def generate_candidates_from_rf_probs(predicted_probs, num_to_generate):
-    all_combinations = list(itertools.product(range(10), repeat=4))
-    
-    combined_probabilities = []
-    for combo in all_combinations:
-        prob_As = predicted_probs['As'].get(combo[0], 0.0)
-        prob_Kop = predicted_probs['Kop'].get(combo[1], 0.0)
-        prob_Kepala = predicted_probs['Kepala'].get(combo[2], 0.0)
-        prob_Ekor = predicted_probs['Ekor'].get(combo[3], 0.0)
-        
-        total_prob = prob_As * prob_Kop * prob_Kepala * prob_Ekor
-        
-        formatted_number = "".join(map(str, combo))
-        combined_probabilities.append((formatted_number, total_prob))
-
-    combined_probabilities.sort(key=lambda x: x[1], reverse=True)
-    
-    # Ambil sejumlah nomor sesuai permintaan, atau semua jika kurang
-    return combined_probabilities[:num_to_generate]
-
 
 # --- Main Program ---
 if __name__ == "__main__":
-    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING)
+    df_log = get_log_game_data(SERVER_NAME, DATABASE_NAME, TABLE_NAME, CONNECTION_STRING, refresh_cache=REFRESH_HISTORY_CACHE)
 
     if df_log is not None:
         # Pastikan LogResult di df_log sudah dalam format string 4 digit sejak awal
@@ -162,17 +138,19 @@ if __name__ == "__main__":
         print("\n--- Pendekatan 1: Mencari LogResult NearLog Berdasarkan Pola 2 Digit ---")
         
         df_search_nearlog = df_log[df_log['Periode'] < last_periode].copy()
+        # Indeks pola dibangun sekali (histori terurut per Periode) dan dipakai ketiga pencarian
+        pattern_index = PatternIndex.from_results(df_search_nearlog.sort_values(by='Periode')['LogResult_Str'])
 
         print(f"Mencari pattern 2 digit depan ({last_log_result_str[:2]}XX)...")
-        near_logs_depan = get_near_logs(df_search_nearlog, last_log_result_str, 'depan')
+        near_logs_depan = get_near_logs(df_search_nearlog, last_log_result_str, 'depan', pattern_index=pattern_index)
         print(f"Ditemukan {len(near_logs_depan)} kecocokan untuk 2 digit depan.")
 
         print(f"Mencari pattern 2 digit tengah (X{last_log_result_str[1:3]}X)...")
-        near_logs_tengah = get_near_logs(df_search_nearlog, last_log_result_str, 'tengah')
+        near_logs_tengah = get_near_logs(df_search_nearlog, last_log_result_str, 'tengah', pattern_index=pattern_index)
         print(f"Ditemukan {len(near_logs_tengah)} kecocokan untuk 2 digit tengah.")
 
         print(f"Mencari pattern 2 digit belakang (XX{last_log_result_str[2:4]})...")
-        near_logs_belakang = get_near_logs(df_search_nearlog, last_log_result_str, 'belakang')
+        near_logs_belakang = get_near_logs(df_search_nearlog, last_log_result_str, 'belakang', pattern_index=pattern_index)
         print(f"Ditemukan {len(near_logs_belakang)} kecocokan untuk 2 digit belakang.")
 
         all_near_logs_data = near_logs_depan + near_logs_tengah + near_logs_belakang
@@ -194,29 +172,17 @@ if __name__ == "__main__":
         # --- Pendekatan 2: Probabilitas Digit dengan Random Forest ---
         print("\n--- Pendekatan 2: Pemodelan Probabilitas Digit dengan Random Forest ---")
 
-        # Pra-pemrosesan Data dan Pembuatan Fitur Lag untuk RF
-        df_rf = df_log.copy() # Gunakan salinan DataFrame untuk RF agar tidak mengganggu df_log asli
-
-        # Pastikan kolom As, Kop, Kepala, Ekor adalah integer
+        # Fitur lag untuk RF: buffer digit int8 + view sliding window (fitur_lag.py), df_log tidak diubah
+        # Digit non-numerik/NaN menjadi -1
         digit_cols = ['As', 'Kop', 'Kepala', 'Ekor']
-        for col in digit_cols:
-            df_rf[col] = pd.to_numeric(df_rf[col], errors='coerce').fillna(-1).astype(int) # Handle potensial NaN jika ada
-
         num_lags = 3
-        for col in digit_cols:
-            for i in range(1, num_lags + 1):
-                df_rf[f'{col}_lag{i}'] = df_rf[col].shift(i)
-        
-        df_rf.dropna(inplace=True)
-        
-        for col in digit_cols:
-            for i in range(1, num_lags + 1):
-                df_rf[f'{col}_lag{i}'] = df_rf[f'{col}_lag{i}'].astype(int)
+        lag_store_rf = LagFeatureStore.from_frame(df_log, num_lags=num_lags, digit_cols=digit_cols)
 
-        print(f"Data untuk model Random Forest setelah fitur lag: {df_rf.shape}")
+        features_rf = lag_store_rf.feature_names()
+        X_rf = pd.DataFrame(lag_store_rf.matrix(), columns=features_rf)
+        Y_rf = pd.DataFrame(lag_store_rf.targets(), columns=digit_cols)
 
-        features_rf = [f'{col}_lag{i}' for col in digit_cols for i in range(1, num_lags + 1)]
-        X_rf = df_rf[features_rf]
+        print(f"Data untuk model Random Forest setelah fitur lag: {X_rf.shape[0]} baris x {X_rf.shape[1]} fitur lag (int8)")
         
         # Ambil baris terakhir dari data yang sudah di-preprocess untuk RF sebagai input untuk prediksi angka berikutnya
         # Pastikan X_rf tidak kosong
@@ -224,39 +190,40 @@ if __name__ == "__main__":
             print("Data untuk model Random Forest terlalu sedikit setelah dropna. Tidak dapat melatih model RF.")
             rf_generated_numbers = [] # Set kosong jika RF tidak bisa jalan
         else:
-            split_point_rf = int(len(df_rf) * 0.8)
-            X_train_rf, X_test_rf = X_rf.iloc[:split_point_rf], X_rf.iloc[split_point_rf:]
+            split_point_rf = int(len(X_rf) * 0.8)
             
-            models_rf = {}
             latest_data_for_prediction_rf = X_rf.iloc[-1:].copy() 
 
-            predicted_probs_rf = {}
-            for digit_col in digit_cols:
-                y_rf = df_rf[digit_col]
-                y_train_rf, y_test_rf = y_rf.iloc[:split_point_rf], y_rf.iloc[split_point_rf:]
-
-                print(f"  Melatih model Random Forest untuk digit {digit_col}...")
-                model_rf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-                model_rf.fit(X_train_rf, y_train_rf)
-                models_rf[digit_col] = model_rf
-
-                y_pred_rf = model_rf.predict(X_test_rf)
-                print(f"  Akurasi RF {digit_col} pada data uji: {accuracy_score(y_test_rf, y_pred_rf):.4f}")
-                # print(f"  Classification Report untuk {digit_col}:\n{classification_report(y_test_rf, y_pred_rf, zero_division=0)}")
-            
-            print("Semua model Random Forest dilatih.")
+            if RF_TRAINING_MODE == MODE_MULTI_OUTPUT:
+                print("  Menyiapkan satu model Random Forest multi-output untuk digit As, Kop, Kepala, Ekor...")
+            else:
+                print(f"  Menyiapkan model Random Forest per digit ({', '.join(digit_cols)})...")
+            # Versi model ditentukan oleh konfigurasi fitur/model; Periode terakhir ada di nama file
+            model_config_rf = {'features': features_rf, 'num_lags': num_lags, 'mode': RF_TRAINING_MODE,
+                               'n_estimators': 100, 'random_state': 42, 'train_fraction': 0.8}
+            model_rf, model_status_rf, evaluated_rows_rf, accuracy_rf = load_or_fit(
+                ModelStore(GAME_CODE, model_config_rf),
+                lambda: DigitModel(RF_TRAINING_MODE, n_estimators=100, random_state=42, n_jobs=-1, digit_cols=digit_cols),
+                X_rf, Y_rf, lag_store_rf.target_periodes(), train_rows=split_point_rf, force_retrain=FORCE_FULL_RETRAIN)
+
+            if model_status_rf == STATUS_TRAINED:
+                for digit_col, accuracy in (accuracy_rf or {}).items():
+                    print(f"  Akurasi RF {digit_col} pada data uji: {accuracy:.4f}")
+                print("Semua model Random Forest dilatih.")
+            elif model_status_rf == STATUS_LOADED:
+                print(f"  Model Random Forest dimuat dari cache ({evaluated_rows_rf} periode baru belum dilatih, {model_rf.n_estimators} pohon).")
+            else:
+                # Diukur sebelum pohon baru ditambahkan, di periode yang belum pernah dilihat model
+                for digit_col, accuracy in accuracy_rf.items():
+                    print(f"  Akurasi RF {digit_col} pada {evaluated_rows_rf} periode baru: {accuracy:.4f}")
+                print(f"  Model Random Forest diperbarui dengan pohon baru sampai Periode {lag_store_rf.periodes[-1]} ({model_rf.n_estimators} pohon).")
 
             print("\n  Memprediksi Probabilitas dengan Random Forest...")
-            for digit_col in digit_cols:
-                model_rf = models_rf[digit_col]
-                probs_rf = model_rf.predict_proba(latest_data_for_prediction_rf)[0] 
-                
-                digit_to_prob_map_rf = {model_rf.classes_[i]: prob for i, prob in enumerate(probs_rf)}
-                full_digit_probs_rf = {i: digit_to_prob_map_rf.get(i, 0.0) for i in range(10)}
-                predicted_probs_rf[digit_col] = full_digit_probs_rf
+            probs_rf = model_rf.predict_proba(latest_data_for_prediction_rf)[0] # (4, 10): digit As, Kop, Kepala, Ekor x 0-9
             
             # Generasi kandidat dari RF
-            rf_generated_numbers_with_probs = generate_candidates_from_rf_probs(predicted_probs_rf, 10000) # Ambil semua 10000 kombinasi
+            # Outer product 10x10x10x10 (probabilitas_digit.py): urut probabilitas turun, nomor naik untuk nilai seri
+            rf_generated_numbers_with_probs = top_k_candidates(probs_rf, 10000) # Ambil semua 10000 kombinasi
             # Convert to a set of numbers to easily check for uniqueness later
             rf_generated_numbers = {num for num, _ in rf_generated_numbers_with_probs}
 
@@ -0,0 +1,196 @@
+"""
+Penampung (sink) hasil prediksi untuk HasilBenchmarkMix dengan upsert per batch.
+
+`insert_results_to_db` dulu menjalankan `SELECT COUNT(*)` lalu `UPDATE` atau
+`INSERT` untuk setiap GameCode, masing-masing dengan koneksi baru dan commit
+sendiri: 3 round-trip + 1 commit per game. `ResultSink` mengumpulkan baris
+(GameCode, Periode, Hasil, TanggalBenchmark) lalu mengirimnya sekaligus lewat
+`DataAccess.upsert_benchmark_results`: satu `MERGE` (SQL Server, dengan
+`fast_executemany`) atau `INSERT ... ON CONFLICT` (SQLite) untuk seluruh batch,
+dalam satu transaksi.
+
+Baris di-flush otomatis setiap `batch_size` baris, dan sisanya saat `flush()`
+atau keluar dari blok `with`. Jika flush gagal, error dicetak dan baris tetap
+menunggu di sink untuk flush berikutnya.
+
+Nomor prediksi disimpan sebagai string lama "0123,4567,...#" di kolom Hasil,
+atau dengan `binary=True` sebagai bytes `kodek_prediksi` (bitmap + rank, ~18 KB
+alih-alih ~93 KB NVARCHAR untuk 9.340 nomor) di kolom HasilBiner. Di SQL Server
+kolom itu perlu ditambahkan sekali:
+
+    ALTER TABLE [HasilBenchmarkMix] ADD HasilBiner VARBINARY(MAX) NULL
+
+Benchmark terhadap jalur lama per baris (SQLite, latensi round-trip disimulasikan):
+
+    python penampung_hasil.py --games 200 --latency-ms 2
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from akses_data import DataAccess, DatabaseError, SqliteBackend
+from kodek_prediksi import encode_legacy, encode_prediction
+
+DEFAULT_BATCH_SIZE = 50
+
+
+class ResultSink:
+    """
+    Args:
+        db (DataAccess): Database tujuan.
+        table (str): Tabel hasil, mis. 'HasilBenchmarkMix'.
+        batch_size (int): Flush otomatis setiap sekian baris.
+        binary (bool): Simpan ke kolom HasilBiner (format biner) alih-alih string Hasil.
+    """
+
+    def __init__(self, db, table, batch_size=DEFAULT_BATCH_SIZE, binary=False):
+        self.db = db
+        self.table = table
+        self.batch_size = max(int(batch_size), 1)
+        self.binary = binary
+        self._pending = []
+        self._lock = threading.Lock()  # tahap tulis pipeline bisa memanggil dari beberapa thread
+        self.rows_written = 0
+        self.flushes = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, game_code, periode, numbers, tanggal=None):
+        """Menampung prediksi satu game; `numbers` = nomor ('0123' atau int) dalam urutan prediksi."""
+        hasil = encode_prediction(numbers) if self.binary else encode_legacy(numbers)
+        with self._lock:
+            self._pending.append((game_code, int(periode), hasil, tanggal or datetime.datetime.now()))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Upsert semua baris yang menunggu dalam satu transaksi; mengembalikan jumlah baris."""
+        # Lock hanya untuk menukar antrean: upsert beberapa thread tulis bisa berjalan bersamaan
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        try:
+            written = self.db.upsert_benchmark_results(self.table, rows, self.binary)
+        except DatabaseError as ex:
+            with self._lock:
+                self._pending = rows + self._pending
+            print(f"❌ Gagal menyimpan {len(rows)} baris ke '{self.table}' (akan dicoba lagi saat flush berikutnya).")
+            print(f"Pesan Error: {ex.args[1]}")
+            return 0
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.rows_written += written
+            self.flushes += 1
+            self.seconds += elapsed
+        games = ", ".join(sorted({row[0] for row in rows}))
+        print(f"✅ {written} baris hasil prediksi di-upsert ke '{self.table}' dalam satu transaksi ({elapsed:.3f} s): {games}")
+        return written
+
+
+# --- Benchmark dengan SQLite ---
+
+def _legacy_save(path, table, rows, latency):
+    """Jalur lama: per baris koneksi baru, SELECT COUNT(*), lalu UPDATE atau INSERT, commit sendiri."""
+    for game_code, periode, numbers, tanggal in rows:
+        hasil = encode_legacy(numbers)
+        time.sleep(latency)  # handshake koneksi
+        cnxn = sqlite3.connect(path)
+        cursor = cnxn.cursor()
+        time.sleep(latency)
+        exists = cursor.execute(f"SELECT COUNT(*) FROM [{table}] WHERE GameCode = ? AND Periode = ?", (game_code, periode)).fetchone()[0] > 0
+        time.sleep(latency)
+        if exists:
+            cursor.execute(f"UPDATE [{table}] SET Hasil = ?, TanggalBenchmark = ? WHERE GameCode = ? AND Periode = ?",
+                           (hasil, tanggal, game_code, periode))
+        else:
+            cursor.execute(f"INSERT INTO [{table}] (GameCode, Periode, Hasil, TanggalBenchmark) VALUES (?, ?, ?, ?)",
+                           (game_code, periode, hasil, tanggal))
+        time.sleep(latency)  # commit
+        cnxn.commit()
+        cnxn.close()
+
+
+class _LatencyBackend(SqliteBackend):
+    """SQLite dengan jeda simulasi per handshake koneksi dan per round-trip executemany/commit."""
+
+    def __init__(self, path, latency):
+        super().__init__(path)
+        self.latency = latency
+
+    def connect(self):
+        time.sleep(self.latency)
+        return super().connect()
+
+
+class _LatencyDataAccess(DataAccess):
+    def upsert_benchmark_results(self, table, rows, binary=False):
+        # Satu round-trip untuk array parameter (fast_executemany) + satu untuk commit
+        time.sleep(2 * self.backend.latency)
+        return super().upsert_benchmark_results(table, rows, binary)
+
+
+def _sample_rows(num_games, periode, hasil_len):
+    numbers = [f"{n:04d}" for n in range(hasil_len)]
+    now = datetime.datetime.now()
+    return [(f"G{g:03d}", periode, numbers, now) for g in range(num_games)]
+
+
+def run_benchmark(num_games, latency_ms, batch_size, hasil_len):
+    latency = latency_ms / 1000
+    table = 'HasilBenchmarkMix'
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.sqlite")
+        sink_path = os.path.join(tmp, "sink.sqlite")
+        SqliteBackend(legacy_path)
+        db = _LatencyDataAccess(_LatencyBackend(sink_path, latency))
+
+        timings = {}
+        for label, periode in (("INSERT", 1), ("UPDATE", 1)):
+            rows = _sample_rows(num_games, periode, hasil_len)
+            start = time.perf_counter()
+            _legacy_save(legacy_path, table, rows, latency)
+            legacy_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ResultSink(db, table, batch_size) as sink:
+                for row in rows:
+                    sink.add(*row)
+            sink_s = time.perf_counter() - start
+            timings[label] = (legacy_s, sink_s, sink.flushes)
+
+        query = f"SELECT GameCode, Periode, Hasil FROM [{table}] ORDER BY GameCode, Periode"
+        legacy_rows = sqlite3.connect(legacy_path).execute(query).fetchall()
+        sink_rows = sqlite3.connect(sink_path).execute(query).fetchall()
+        assert legacy_rows == sink_rows
+        db.close()
+
+    print(f"{num_games} baris HasilBenchmarkMix (Hasil {hasil_len} nomor), batch {batch_size}, "
+          f"latensi simulasi {latency_ms:g} ms per round-trip (SQLite)")
+    for label, (legacy_s, sink_s, flushes) in timings.items():
+        print(f"  {label}: per baris {legacy_s:.3f} s ({num_games} commit), "
+              f"ResultSink {sink_s:.3f} s ({flushes} commit), {legacy_s / sink_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark upsert per baris vs ResultSink (SQLite).")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Jeda simulasi per round-trip (0 = SQLite murni).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--hasil-len", type=int, default=9340, help="Jumlah nomor dalam kolom Hasil")
+    args = parser.parse_args()
+    run_benchmark(args.games, args.latency_ms, args.batch_size, args.hasil_len)
@@ -0,0 +1,225 @@
+"""
+Pipeline asyncio tiga tahap lintas GameCode: ambil -> hitung -> tulis.
+
+Runner multi-game memproses game satu per satu (ambil histori, backtest, tulis
+txt, simpan ke DB), sehingga CPU menganggur selama I/O database dan database
+menganggur selama komputasi. `run_pipeline` menjalankan ketiga tahap bersamaan
+dengan antrean terbatas di antaranya:
+
+- ambil : `fetch_fn(item)` di ThreadPoolExecutor (I/O DB), `fetch_concurrency` sekaligus
+- hitung: `compute_fn(item, data)` di ProcessPoolExecutor, `compute_workers` proses
+- tulis : `write_fn([(item, hasil), ...])` di ThreadPoolExecutor, hasil dikumpulkan
+  per batch (`write_batch` item atau `flush_seconds` tanpa item baru)
+
+Antrean terbatas (`queue_size`) menahan tahap ambil agar tidak jauh mendahului
+tahap hitung (memori tetap terbatas). Error pada satu item dicetak dan dihitung,
+item lain tetap diproses. `PipelineReport` berisi utilisasi per tahap:
+waktu sibuk / (waktu total x konkurensi).
+
+`compute_fn` harus fungsi level modul (di-pickle ke proses worker).
+
+Benchmark dengan beban sintetis (sleep untuk I/O, loop CPU untuk komputasi):
+
+    python pipa_proses.py --games 12 --fetch-ms 150 --compute-ms 300 --write-ms 100
+"""
+import argparse
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_DONE = object()
+
+
+class StageStats:
+    """Statistik satu tahap pipeline."""
+
+    def __init__(self, name, concurrency):
+        self.name = name
+        self.concurrency = concurrency
+        self.busy = 0.0
+        self.items = 0
+        self.calls = 0
+        self.failed = 0
+
+    def utilization(self, wall_seconds):
+        return self.busy / (wall_seconds * self.concurrency) if wall_seconds else 0.0
+
+
+class PipelineReport:
+    """
+    Attributes:
+        stages (list): StageStats untuk ambil, hitung, tulis.
+        wall_seconds (float): Durasi total pipeline.
+    """
+
+    def __init__(self, stages, wall_seconds):
+        self.stages = stages
+        self.wall_seconds = wall_seconds
+
+    def print_summary(self):
+        busy_total = sum(stage.busy for stage in self.stages)
+        print(f"\nPipeline selesai dalam {self.wall_seconds:.2f} s "
+              f"(jumlah waktu sibuk semua tahap {busy_total:.2f} s, tumpang-tindih {busy_total / self.wall_seconds:.2f}x)")
+        for stage in self.stages:
+            per_call = stage.busy / stage.calls if stage.calls else 0.0
+            print(f"  {stage.name:<6}: konkurensi {stage.concurrency}, {stage.items} item / {stage.calls} panggilan, "
+                  f"{stage.failed} gagal, sibuk {stage.busy:.2f} s ({per_call:.3f} s/panggilan), "
+                  f"utilisasi {stage.utilization(self.wall_seconds):.0%}")
+
+
+async def _call(stats, executor, fn, *args):
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        stats.busy += time.perf_counter() - start
+        stats.calls += 1
+
+
+async def _stage_worker(stats, executor, fn, inbox, outbox):
+    """Ambil/hitung: satu item per panggilan; hasil None (mis. game tanpa data) tidak diteruskan."""
+    while True:
+        entry = await inbox.get()
+        if entry is _DONE:
+            return
+        item = entry[0]
+        try:
+            result = await _call(stats, executor, fn, *entry)
+        except Exception as e:
+            stats.failed += 1
+            print(f"❌ Tahap {stats.name} gagal untuk '{item}': {e!r}")
+            continue
+        stats.items += 1
+        if result is not None:
+            await outbox.put((item, result))
+
+
+async def _write_worker(stats, executor, write_fn, inbox, batch_size, flush_seconds):
+    """Tulis: hasil dikumpulkan per batch lalu ditulis dengan satu panggilan `write_fn`."""
+    batch, done = [], False
+    while not done:
+        try:
+            if batch:
+                entry = await asyncio.wait_for(inbox.get(), timeout=flush_seconds)
+            else:
+                entry = await inbox.get()
+        except asyncio.TimeoutError:
+            entry = None
+        if entry is _DONE:
+            done = True
+        elif entry is not None:
+            batch.append(entry)
+        if batch and (done or entry is None or len(batch) >= batch_size):
+            try:
+                await _call(stats, executor, write_fn, batch)
+                stats.items += len(batch)
+            except Exception as e:
+                stats.failed += len(batch)
+                print(f"❌ Tahap {stats.name} gagal untuk {[item for item, _ in batch]}: {e!r}")
+            batch = []
+
+
+async def _run(items, fetch_fn, compute_fn, write_fn, executors, concurrency, queue_size, write_batch, flush_seconds):
+    fetch_pool, compute_pool, write_pool = executors
+    fetch_n, compute_n, write_n = concurrency
+    stages = [StageStats("ambil", fetch_n), StageStats("hitung", compute_n), StageStats("tulis", write_n)]
+
+    fetch_queue = asyncio.Queue()
+    compute_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    for item in items:
+        fetch_queue.put_nowait((item,))
+    for _ in range(fetch_n):
+        fetch_queue.put_nowait(_DONE)
+
+    start = time.perf_counter()
+    fetchers = [asyncio.create_task(_stage_worker(stages[0], fetch_pool, fetch_fn, fetch_queue, compute_queue)) for _ in range(fetch_n)]
+    computers = [asyncio.create_task(_stage_worker(stages[1], compute_pool, compute_fn, compute_queue, write_queue)) for _ in range(compute_n)]
+    writers = [asyncio.create_task(_write_worker(stages[2], write_pool, write_fn, write_queue, write_batch, flush_seconds)) for _ in range(write_n)]
+
+    await asyncio.gather(*fetchers)
+    for _ in range(compute_n):
+        await compute_queue.put(_DONE)
+    await asyncio.gather(*computers)
+    for _ in range(write_n):
+        await write_queue.put(_DONE)
+    await asyncio.gather(*writers)
+    return PipelineReport(stages, time.perf_counter() - start)
+
+
+def run_pipeline(items, fetch_fn, compute_fn, write_fn, fetch_concurrency=2, compute_workers=1, write_concurrency=1,
+                 write_batch=8, queue_size=2, flush_seconds=1.0):
+    """
+    Menjalankan pipeline untuk semua `items` (mis. GameCode).
+
+    Args:
+        fetch_fn: fetch_fn(item) -> data (None = lewati item).
+        compute_fn: compute_fn(item, data) -> hasil (None = tidak ada yang ditulis). Level modul.
+        write_fn: write_fn([(item, hasil), ...]).
+        compute_workers (int): Jumlah proses tahap hitung (0 = semua core).
+        queue_size (int): Kapasitas antrean ambil->hitung dan hitung->tulis.
+
+    Returns:
+        PipelineReport
+    """
+    compute_workers = compute_workers or os.cpu_count()
+    with ThreadPoolExecutor(fetch_concurrency, thread_name_prefix="ambil") as fetch_pool, \
+            ProcessPoolExecutor(compute_workers) as compute_pool, \
+            ThreadPoolExecutor(write_concurrency, thread_name_prefix="tulis") as write_pool:
+        return asyncio.run(_run(items, fetch_fn, compute_fn, write_fn, (fetch_pool, compute_pool, write_pool),
+                                (fetch_concurrency, compute_workers, write_concurrency), queue_size, write_batch, flush_seconds))
+
+
+# --- Benchmark dengan beban sintetis ---
+
+def _synthetic_fetch(seconds, item):
+    time.sleep(seconds)
+    return item
+
+
+def _synthetic_compute(seconds, item, data):
+    end = time.process_time() + seconds
+    total = 0
+    while time.process_time() < end:
+        total += 1
+    return total
+
+
+def _synthetic_write(seconds_per_batch, seconds_per_item, batch):
+    time.sleep(seconds_per_batch + seconds_per_item * len(batch))
+
+
+def run_benchmark(num_games, fetch_ms, compute_ms, write_ms, write_item_ms, fetch_concurrency, compute_workers, write_batch):
+    fetch = functools.partial(_synthetic_fetch, fetch_ms / 1000)
+    compute = functools.partial(_synthetic_compute, compute_ms / 1000)
+    write = functools.partial(_synthetic_write, write_ms / 1000, write_item_ms / 1000)
+
+    start = time.perf_counter()
+    for game in range(num_games):
+        write([(game, compute(game, fetch(game)))])
+    sequential = time.perf_counter() - start
+
+    report = run_pipeline(range(num_games), fetch, compute, write, fetch_concurrency=fetch_concurrency,
+                          compute_workers=compute_workers, write_batch=write_batch)
+    print(f"{num_games} game sintetis: ambil {fetch_ms:g} ms, hitung {compute_ms:g} ms CPU, "
+          f"tulis {write_ms:g} ms/batch + {write_item_ms:g} ms/item ({os.cpu_count()} core)")
+    print(f"  berurutan: {sequential:.2f} s")
+    print(f"  pipeline : {report.wall_seconds:.2f} s ({sequential / report.wall_seconds:.2f}x)")
+    report.print_summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline ambil/hitung/tulis dengan beban sintetis.")
+    parser.add_argument("--games", type=int, default=12)
+    parser.add_argument("--fetch-ms", type=float, default=150)
+    parser.add_argument("--compute-ms", type=float, default=300)
+    parser.add_argument("--write-ms", type=float, default=100, help="Biaya tetap per batch tulis (commit DB, buka file)")
+    parser.add_argument("--write-item-ms", type=float, default=10)
+    parser.add_argument("--fetch-concurrency", type=int, default=2)
+    parser.add_argument("--compute-workers", type=int, default=0, help="0 = semua core")
+    parser.add_argument("--write-batch", type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.games, args.fetch_ms, args.compute_ms, args.write_ms, args.write_item_ms,
+                  args.fetch_concurrency, args.compute_workers, args.write_batch)
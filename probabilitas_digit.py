@@ -0,0 +1,154 @@
+"""
+Kandidat top-K dari probabilitas per posisi digit (As, Kop, Kepala, Ekor).
+
+`generate_candidates_from_rf_probs` lama membangun 10.000 kombinasi dengan
+`itertools.product`, mengalikan empat lookup dict per kombinasi di loop Python,
+memformat 10.000 string, lalu mengurutkan seluruh list. Di sini:
+
+- probabilitas gabungan = outer product 10x10x10x10 dari empat vektor digit
+  (urutan perkalian sama: ((As * Kop) * Kepala) * Ekor, hasilnya identik bit per bit),
+  indeks datar = nomor 0000-9999;
+- K teratas dipilih dengan `np.argpartition` lalu hanya K itu yang diurutkan;
+- bisa untuk banyak periode sekaligus: probabilitas (periode, 4, 10) -> matriks
+  nomor K x periode.
+
+Urutan sama dengan versi lama (sort stabil): probabilitas turun, lalu nomor naik
+untuk probabilitas yang sama, termasuk saat nilai seri jatuh tepat di batas K.
+
+    python probabilitas_digit.py --k 7000 --periods 1000
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from indeks_pola import NOMOR_STR
+
+DIGIT_COLS = ['As', 'Kop', 'Kepala', 'Ekor']
+NUMBER_SPACE = 10000
+
+
+def joint_probabilities(probs):
+    """
+    Probabilitas gabungan semua nomor 0000-9999.
+
+    Args:
+        probs: Array (4, 10) atau (periode, 4, 10).
+
+    Returns:
+        np.ndarray: (10000,) atau (periode, 10000); indeks = nomor.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    batch = probs.reshape(-1, 4, 10)
+    a, b, c, d = (batch[:, i] for i in range(4))
+    joint = (a[:, :, None, None, None] * b[:, None, :, None, None]) * c[:, None, None, :, None]
+    joint = (joint * d[:, None, None, None, :]).reshape(len(batch), NUMBER_SPACE)
+    return joint[0] if probs.ndim == 2 else joint
+
+
+def _top_k_row(joint, k):
+    """Top-K satu baris: probabilitas turun, nomor naik untuk nilai seri (termasuk di batas K)."""
+    if k >= NUMBER_SPACE:
+        return np.lexsort((np.arange(NUMBER_SPACE), -joint))
+    threshold = -np.partition(-joint, k - 1)[k - 1]
+    above = np.flatnonzero(joint > threshold)
+    ties = np.flatnonzero(joint == threshold)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.lexsort((selected, -joint[selected]))]
+
+
+def top_k_numbers(probs, k):
+    """
+    Nomor dengan probabilitas gabungan tertinggi.
+
+    Args:
+        probs: Array (4, 10) untuk satu periode, atau (periode, 4, 10).
+        k (int): Jumlah nomor (maks 10.000).
+
+    Returns:
+        (numbers, joint_probs): Untuk satu periode array (k,); untuk banyak periode
+        matriks (k, periode), kolom ke-p = periode ke-p.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    joint = joint_probabilities(probs).reshape(-1, NUMBER_SPACE)
+    k = min(int(k), NUMBER_SPACE)
+    periods = len(joint)
+    if k < NUMBER_SPACE:
+        # Satu argpartition untuk semua periode; hanya K terpilih yang diurutkan
+        part = np.argpartition(-joint, k - 1, axis=1)[:, :k]
+        part_probs = np.take_along_axis(joint, part, axis=1)
+        order = np.lexsort((part, -part_probs), axis=1)
+        numbers = np.take_along_axis(part, order, axis=1)
+        # Nilai seri di batas K: argpartition memilih sembarang; baris itu diulang persis
+        boundary = np.take_along_axis(part_probs, order[:, -1:], axis=1)
+        tied_outside = (joint == boundary).sum(axis=1) > (np.take_along_axis(part_probs, order, axis=1) == boundary).sum(axis=1)
+        for row in np.flatnonzero(tied_outside):
+            numbers[row] = _top_k_row(joint[row], k)
+    else:
+        numbers = np.stack([_top_k_row(row, k) for row in joint]) if periods else np.empty((0, k), dtype=np.int64)
+    numbers_probs = np.take_along_axis(joint, numbers, axis=1)
+    if probs.ndim == 2:
+        return numbers[0], numbers_probs[0]
+    return numbers.T, numbers_probs.T
+
+
+def top_k_candidates(probs, k):
+    """Bentuk keluaran lama untuk satu periode: list (nomor 4 digit, probabilitas), hanya K yang diformat."""
+    numbers, joint = top_k_numbers(probs, k)
+    return list(zip([NOMOR_STR[n] for n in numbers.tolist()], joint.tolist()))
+
+
+# --- Benchmark ---
+
+def _legacy_candidates(predicted_probs, num_to_generate):
+    """Versi lama: itertools.product + empat lookup dict + sort penuh."""
+    combined_probabilities = []
+    for combo in itertools.product(range(10), repeat=4):
+        total_prob = (predicted_probs['As'].get(combo[0], 0.0) * predicted_probs['Kop'].get(combo[1], 0.0)
+                      * predicted_probs['Kepala'].get(combo[2], 0.0) * predicted_probs['Ekor'].get(combo[3], 0.0))
+        combined_probabilities.append(("".join(map(str, combo)), total_prob))
+    combined_probabilities.sort(key=lambda x: x[1], reverse=True)
+    return combined_probabilities[:num_to_generate]
+
+
+def _random_probs(rng, periods, zero_fraction=0.3):
+    """Probabilitas mirip predict_proba RF: sebagian digit 0, kelipatan 1/n_estimators."""
+    raw = rng.integers(0, 30, size=(periods, 4, 10)).astype(np.float64)
+    raw[rng.random(raw.shape) < zero_fraction] = 0
+    raw[raw.sum(axis=2) == 0] = 1
+    return raw / raw.sum(axis=2, keepdims=True)
+
+
+def run_benchmark(k, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    probs = _random_probs(rng, periods)
+    checks = min(periods, 20)
+
+    start = time.perf_counter()
+    legacy = [_legacy_candidates({col: dict(enumerate(p[i])) for i, col in enumerate(DIGIT_COLS)}, k) for p in probs[:checks]]
+    legacy_s = (time.perf_counter() - start) / checks
+
+    start = time.perf_counter()
+    single = [top_k_candidates(p, k) for p in probs[:checks]]
+    single_s = (time.perf_counter() - start) / checks
+    assert single == legacy, "Hasil berbeda dari versi lama"
+
+    start = time.perf_counter()
+    numbers, _ = top_k_numbers(probs, k)
+    batch_s = time.perf_counter() - start
+    assert all(np.array_equal(numbers[:, p], [int(n) for n, _ in legacy[p]]) for p in range(checks))
+
+    print(f"Top-{k} dari probabilitas 4 digit (hasil identik dengan versi lama)")
+    print(f"  lama (itertools + dict + sort penuh): {legacy_s * 1e3:.1f} ms per periode")
+    print(f"  top_k_candidates (satu periode)     : {single_s * 1e3:.2f} ms per periode ({legacy_s / single_s:.0f}x)")
+    print(f"  top_k_numbers ({periods} periode)     : {batch_s:.3f} s total, {batch_s / periods * 1e3:.3f} ms per periode "
+          f"({legacy_s * periods / batch_s:.0f}x), matriks {numbers.shape}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark kandidat top-K dari probabilitas digit.")
+    parser.add_argument("--k", type=int, default=7000)
+    parser.add_argument("--periods", type=int, default=1000)
+    args = parser.parse_args()
+    run_benchmark(args.k, args.periods)
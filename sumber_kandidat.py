@@ -0,0 +1,192 @@
+"""
+Provenance kandidat sebagai kode int64 yang dipadatkan (packed).
+
+Sebelumnya setiap kandidat membawa string sumber seperti
+"ekspansi kombinatorial level 3 dari 1234 (+1,-2,+0,+3)" yang dibuat untuk setiap
+nomor, termasuk saat backtest di mana string itu hanya dipakai untuk
+`extract_pattern_type` lalu dibuang. Di sini sumber disimpan sebagai field:
+
+    bit  0-3   : tahap (TAHAP_*)
+    bit  4-7   : level ekspansi, atau jumlah digit untuk NearLog
+    bit  8-21  : nomor sumber / pola NearLog (0-9999)
+    bit 22-41  : vektor modifikasi per digit (4 x 5 bit, disimpan +9)
+    bit 42-43  : indeks search_type NearLog (depan/tengah/belakang)
+    bit 44     : tampilkan vektor modifikasi saat dirender
+
+Untuk TAHAP_TEKS (sumber teks bebas), bit 8 ke atas berisi indeks tabel teks.
+Teks hanya dirender (`render`) untuk baris yang benar-benar ditulis ke output,
+dan tipe pola benchmark (`pattern_type_of`) cukup dibaca dari field kode.
+"""
+import numpy as np
+
+from indeks_pola import NOMOR_STR, SEARCH_TYPES
+
+TAHAP_TEKS = 0
+TAHAP_NEARLOG = 1
+TAHAP_MIX = 2
+TAHAP_PERMUTASI = 3
+TAHAP_EKSPANSI = 4
+TAHAP_EKSPANSI_KOMBINATORIAL = 5
+
+_LEVEL_SHIFT = 4
+_SOURCE_SHIFT = 8
+_MODS_SHIFT = 22
+_SEARCH_SHIFT = 42
+_SHOW_MODS = 1 << 44
+
+_MOD_SHIFTS = np.array([_MODS_SHIFT + 5 * (3 - i) for i in range(4)], dtype=np.int64)
+_PLACE = np.array([1000, 100, 10, 1], dtype=np.int64)
+
+
+def text_code(text_id):
+    """Kode untuk sumber teks bebas (indeks di tabel teks milik pemanggil)."""
+    return TAHAP_TEKS | (int(text_id) << _SOURCE_SHIFT)
+
+
+def near_log_code(num_digits, search_type, pattern):
+    """Kode sumber NearLog, mis. 'dari analisa 2 Digit Depan 07'."""
+    return (TAHAP_NEARLOG | (int(num_digits) << _LEVEL_SHIFT) | (int(pattern) << _SOURCE_SHIFT)
+            | (SEARCH_TYPES.index(search_type) << _SEARCH_SHIFT))
+
+
+def pack_codes(stage, sources, levels=0, values=None):
+    """
+    Kode provenance untuk banyak kandidat sekaligus (vektorisasi).
+
+    Args:
+        stage (int): TAHAP_MIX, TAHAP_PERMUTASI, TAHAP_EKSPANSI, ...
+        sources: Nomor sumber (int) per kandidat.
+        levels: Level ekspansi per kandidat (atau satu nilai).
+        values: Jika diisi, nomor kandidat; vektor modifikasi (values - sources per
+            digit) ikut disimpan dan ditampilkan saat dirender.
+
+    Returns:
+        np.ndarray: Kode int64.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    codes = stage | (np.asarray(levels, dtype=np.int64) << _LEVEL_SHIFT) | (sources << _SOURCE_SHIFT)
+    if values is not None:
+        values = np.asarray(values, dtype=np.int64)
+        mods = (values[:, None] // _PLACE) % 10 - (sources[:, None] // _PLACE) % 10
+        codes = codes | ((mods + 9) << _MOD_SHIFTS).sum(axis=1) | _SHOW_MODS
+    return codes
+
+
+def text_id_of(code):
+    return code >> _SOURCE_SHIFT
+
+
+def pack_code(stage, source, level=0, value=None):
+    """Satu kode provenance (int), lihat `pack_codes`."""
+    values = None if value is None else [value]
+    return int(pack_codes(stage, [source], [level], values)[0])
+
+
+def stage_of(code):
+    return code & 0xF
+
+
+def level_of(code):
+    return (code >> _LEVEL_SHIFT) & 0xF
+
+
+def source_of(code):
+    return (code >> _SOURCE_SHIFT) & 0x3FFF
+
+
+def mods_of(code):
+    """Vektor modifikasi per digit (list 4 int)."""
+    return [((code >> int(shift)) & 0x1F) - 9 for shift in _MOD_SHIFTS]
+
+
+def render(code, texts=()):
+    """Teks sumber yang bisa dibaca manusia (format sama dengan string sumber lama)."""
+    stage = stage_of(code)
+    if stage == TAHAP_TEKS:
+        return texts[text_id_of(code)]
+    level, source = level_of(code), source_of(code)
+    if stage == TAHAP_NEARLOG:
+        search_type = SEARCH_TYPES[(code >> _SEARCH_SHIFT) & 0x3]
+        return f"dari analisa {level} Digit {search_type.capitalize()} {source:0{level}d}"
+    if stage == TAHAP_MIX:
+        return f"mix dari {NOMOR_STR[source]}"
+    if stage == TAHAP_PERMUTASI:
+        return f"permutasi dari {NOMOR_STR[source]}"
+    if stage == TAHAP_EKSPANSI:
+        return f"ekspansi level {level} dari {NOMOR_STR[source]}"
+    if stage == TAHAP_EKSPANSI_KOMBINATORIAL:
+        text = f"ekspansi kombinatorial level {level} dari {NOMOR_STR[source]}"
+        if code & _SHOW_MODS:
+            text += " (" + ",".join(f"{m:+d}" for m in mods_of(code)) + ")"
+        return text
+    raise ValueError(f"Tahap provenance tidak dikenal: {stage}")
+
+
+# Teks "+d" per nilai field modifikasi 5 bit (nilai tersimpan = modifikasi + 9)
+_MOD_TEXT = [f"{field - 9:+d}" for field in range(32)]
+
+
+def render_many(codes, texts=()):
+    """
+    `render` untuk banyak kode sekaligus (baris output). Field kode ekspansi
+    kombinatorial dengan vektor modifikasi, yang menjadi mayoritas baris output,
+    diekstrak dengan NumPy; tahap lain lewat `render` biasa.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    rendered = [None] * len(codes)
+    combinatorial = (codes & 0xF == TAHAP_EKSPANSI_KOMBINATORIAL) & (codes & _SHOW_MODS != 0)
+    rows = np.flatnonzero(combinatorial)
+    if len(rows):
+        selected = codes[rows]
+        fields = ((selected[:, None] >> _MOD_SHIFTS) & 0x1F).tolist()
+        for i, level, source, (a, b, c, d) in zip(rows.tolist(), level_of(selected).tolist(),
+                                                  source_of(selected).tolist(), fields):
+            rendered[i] = (f"ekspansi kombinatorial level {level} dari {NOMOR_STR[source]} "
+                           f"({_MOD_TEXT[a]},{_MOD_TEXT[b]},{_MOD_TEXT[c]},{_MOD_TEXT[d]})")
+    for i in np.flatnonzero(~combinatorial).tolist():
+        rendered[i] = render(int(codes[i]), texts)
+    return rendered
+
+
+def pattern_type_of(code, texts=()):
+    """
+    Tipe pola benchmark langsung dari field kode (tanpa split/startswith).
+
+    Hasilnya sama dengan `extract_pattern_type` lama pada string yang dirender,
+    termasuk bentuk "Analisa 2 Digit Digit" yang sudah tersimpan di file benchmark.
+    """
+    stage = stage_of(code)
+    if stage == TAHAP_NEARLOG:
+        return f"Analisa {level_of(code)} Digit Digit"
+    if stage in (TAHAP_EKSPANSI, TAHAP_EKSPANSI_KOMBINATORIAL):
+        return f"Ekspansi Level {level_of(code)}"
+    if stage == TAHAP_MIX:
+        return "Mix"
+    return render(code, texts)
+
+
+def pattern_type_keys(codes):
+    """
+    Kunci int64 per kode dengan tipe pola yang sama jika dan hanya jika kuncinya sama
+    (NearLog per jumlah digit, ekspansi per level, Mix); tahap lain memakai kode utuh.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    stage, level = codes & 0xF, (codes >> _LEVEL_SHIFT) & 0xF
+    expansion = (stage == TAHAP_EKSPANSI) | (stage == TAHAP_EKSPANSI_KOMBINATORIAL)
+    keys = np.where(stage == TAHAP_NEARLOG, TAHAP_NEARLOG | (level << _LEVEL_SHIFT), codes)
+    keys = np.where(expansion, TAHAP_EKSPANSI | (level << _LEVEL_SHIFT), keys)
+    return np.where(stage == TAHAP_MIX, TAHAP_MIX, keys)
+
+
+def benchmark_mask(codes, benchmark_patterns, texts=()):
+    """
+    Flag per kode: apakah tipe polanya termasuk `benchmark_patterns` (vektorisasi).
+
+    `pattern_type_of` hanya dipanggil sekali per kunci tipe pola yang berbeda,
+    bukan per kandidat.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    _, first, inverse = np.unique(pattern_type_keys(codes), return_index=True, return_inverse=True)
+    patterns = set(benchmark_patterns)
+    flags = np.array([pattern_type_of(int(codes[i]), texts) in patterns for i in first], dtype=bool)
+    return flags[inverse.ravel()]